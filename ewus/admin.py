@@ -1,4 +1,10 @@
 from django.contrib import admin
-from .models import EwusAccount
+from .models import EwusAccount, InsuranceCheckRecord
 
-admin.site.register(EwusAccount)
\ No newline at end of file
+admin.site.register(EwusAccount)
+
+@admin.register(InsuranceCheckRecord)
+class InsuranceCheckRecordAdmin(admin.ModelAdmin):
+    list_display = ['pesel_hash', 'insurance_status', 'status_symbol', 'checked_at', 'expires_at']
+    list_filter = ['insurance_status', 'checked_at']
+    readonly_fields = ['pesel_hash', 'checked_at', 'expires_at']
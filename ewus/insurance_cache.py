@@ -0,0 +1,228 @@
+"""
+Pamięć podręczna wyników sprawdzeń ubezpieczenia w eWUS.
+
+Status ubezpieczenia w eWUS zmienia się najwyżej raz na dobę, więc wynik
+sprawdzenia zapisujemy w tabeli tenanta (InsuranceCheckRecord) pod hashem
+PESEL i domyślnie uznajemy za aktualny do końca dnia. Po wygaśnięciu wynik
+może być jeszcze przez chwilę zwracany, a w tle pobierany jest nowy
+(stale-while-revalidate) - w wątku (check_insurance_cached) albo przez
+kolejkę zadań (enqueue_refresh, widoki async).
+"""
+import threading
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import enqueue
+from .models import InsuranceCheckRecord
+from .utils.ewus_client import InsuranceCheckResult, InsuranceStatus, PatientInfo
+
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def get_expiry(checked_at):
+    """Koniec ważności wyniku: TTL z ustawień albo koniec bieżącego dnia"""
+    ttl = getattr(settings, 'EWUS_INSURANCE_CACHE_TTL', None)
+    if ttl:
+        return checked_at + timedelta(seconds=ttl)
+    local = timezone.localtime(checked_at)
+    end_of_day = datetime.combine(local.date() + timedelta(days=1), time.min)
+    return timezone.make_aware(end_of_day, local.tzinfo)
+
+
+def get_stale_ttl():
+    """Jak długo po wygaśnięciu wynik może być zwracany podczas odświeżania w tle"""
+    return timedelta(seconds=getattr(settings, 'EWUS_INSURANCE_STALE_TTL', 0))
+
+
+def can_serve_stale(record):
+    """Czy przeterminowany wynik można jeszcze zwrócić, odświeżając go w tle"""
+    now = timezone.now()
+    return record.expires_at <= now < record.expires_at + get_stale_ttl()
+
+
+def get_record(pesel_hash):
+    """Zapisany wynik dla hasha PESEL albo None"""
+    if not pesel_hash:
+        return None
+    return InsuranceCheckRecord.objects.filter(pesel_hash=pesel_hash).first()
+
+
+def store_result(pesel_hash, result):
+    """Zapisuje (nadpisuje) wynik sprawdzenia dla hasha PESEL"""
+    checked_at = timezone.now()
+    patient = result.patient
+    record, _ = InsuranceCheckRecord.objects.update_or_create(
+        pesel_hash=pesel_hash,
+        defaults={
+            'insurance_status': patient.insurance_status.value if patient.insurance_status else None,
+            'is_valid': result.is_valid,
+            'status_symbol': patient.status_symbol or '',
+            'expiration_date': _aware(patient.expiration_date),
+            'first_name': patient.first_name,
+            'last_name': patient.last_name,
+            'additional_info': patient.additional_info or [],
+            'notes': result.notes or [],
+            'operation_id': result.operation_id or '',
+            'operation_date': _aware(result.operation_date),
+            'operator_id': result.operator_id or '',
+            'ow_code': result.ow_code or '',
+            'checked_at': checked_at,
+            'expires_at': get_expiry(checked_at),
+        }
+    )
+    return record
+
+
+def record_to_result(record, pesel):
+    """Odtwarza InsuranceCheckResult z zapisanego wyniku"""
+    return InsuranceCheckResult(
+        operation_id=record.operation_id,
+        operation_date=record.operation_date,
+        patient=PatientInfo(
+            pesel=pesel,
+            first_name=record.first_name,
+            last_name=record.last_name,
+            insurance_status=(
+                InsuranceStatus(record.insurance_status)
+                if record.insurance_status is not None else None
+            ),
+            status_symbol=record.status_symbol or None,
+            expiration_date=record.expiration_date,
+            additional_info=record.additional_info or None,
+        ),
+        operator_id=record.operator_id,
+        ow_code=record.ow_code,
+        is_valid=record.is_valid,
+        notes=record.notes or None,
+    )
+
+
+def check_insurance_cached(client, pesel, pesel_hash, force=False):
+    """
+    Sprawdza ubezpieczenie, korzystając z zapisanego wyniku jeśli to możliwe
+
+    Args:
+        client: Zalogowany EWUSClient
+        pesel: Numer PESEL pacjenta
+        pesel_hash: Hash PESEL (Patient.pesel_hash)
+        force: Pomija pamięć podręczną i zawsze pyta eWUS
+
+    Returns:
+        Tuple (InsuranceCheckResult, zapisany rekord, czy wynik pochodzi z pamięci podręcznej)
+    """
+    record = None if force else get_record(pesel_hash)
+    now = timezone.now()
+
+    if record is not None:
+        if record.expires_at > now:
+            return record_to_result(record, pesel), record, True
+        if record.expires_at + get_stale_ttl() > now:
+            refresh_in_background(client, pesel, pesel_hash)
+            return record_to_result(record, pesel), record, True
+
+    result = client.check_insurance(pesel)
+    record = store_result(pesel_hash, result)
+    return result, record, False
+
+
+async def acheck_insurance_cached(client, pesel, pesel_hash, force=False):
+    """
+    Asynchroniczny odpowiednik check_insurance_cached - bez odświeżania w tle
+
+    Widok async pod WSGI działa w pętli zdarzeń async_to_sync, zamykanej po
+    odpowiedzi, więc zadanie odświeżające w tej pętli zostałoby przerwane.
+    Przeterminowany wynik trzeba odświeżać przez enqueue_refresh.
+
+    Args:
+        client: Zalogowany AsyncEWUSClient
+        pesel: Numer PESEL pacjenta
+        pesel_hash: Hash PESEL (Patient.pesel_hash)
+        force: Pomija pamięć podręczną i zawsze pyta eWUS
+
+    Returns:
+        Tuple (InsuranceCheckResult, zapisany rekord, czy wynik pochodzi z pamięci podręcznej)
+    """
+    record = None if force else await sync_to_async(get_record)(pesel_hash)
+    if record is not None and record.is_fresh:
+        return record_to_result(record, pesel), record, True
+
+    result = await client.check_insurance(pesel)
+    record = await sync_to_async(store_result)(pesel_hash, result)
+    return result, record, False
+
+
+def enqueue_refresh(patient_id, user):
+    """
+    Zleca odświeżenie wyniku pacjenta kolejce zadań
+
+    Zwraca oczekujące lub wykonywane zadanie użytkownika dla tego pacjenta,
+    a dopiero gdy go nie ma - zleca nowe (wymuszone, z pominięciem zapisanego wyniku).
+    """
+    job = Job.objects.filter(
+        name='ewus.check_insurance',
+        status__in=[Job.PENDING, Job.RUNNING],
+        payload__patient_id=patient_id,
+        created_by=user,
+    ).first()
+    if job is None:
+        job = enqueue(
+            'ewus.check_insurance', {'patient_id': patient_id, 'user_id': user.pk, 'force': True}, user=user
+        )
+    return job
+
+
+def refresh_in_background(client, pesel, pesel_hash):
+    """Odświeża wynik w osobnym wątku (najwyżej jedno odświeżanie na pacjenta)"""
+    tenant = getattr(connection, 'tenant', None)
+    key = _start_refresh(tenant, pesel_hash)
+    if key is None:
+        return
+
+    def refresh():
+        try:
+            _store_for_tenant(tenant, pesel_hash, client.check_insurance(pesel))
+        except Exception:
+            # Zostaje stary wynik - kolejne żądanie spróbuje ponownie
+            pass
+        finally:
+            _finish_refresh(key)
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+def _start_refresh(tenant, pesel_hash):
+    """Klucz odświeżania albo None, jeśli ten pacjent jest już odświeżany"""
+    key = (getattr(tenant, 'schema_name', None), pesel_hash)
+    with _refreshing_lock:
+        if key in _refreshing:
+            return None
+        _refreshing.add(key)
+    return key
+
+
+def _finish_refresh(key):
+    with _refreshing_lock:
+        _refreshing.discard(key)
+
+
+def _store_for_tenant(tenant, pesel_hash, result):
+    """store_result w osobnym wątku - z własnym połączeniem ustawionym na schemat tenanta"""
+    try:
+        if tenant is not None:
+            connection.set_tenant(tenant)
+        store_result(pesel_hash, result)
+    finally:
+        connection.close()
+
+
+def _aware(value):
+    if value is not None and timezone.is_naive(value):
+        return timezone.make_aware(value)
+    return value
@@ -0,0 +1,32 @@
+"""Zadania w tle aplikacji eWUS"""
+from jobs.queue import task
+from patients.models import Patient
+
+from . import insurance_cache
+from .models import EwusAccount
+from .session_broker import get_broker
+
+
+@task('ewus.check_insurance')
+def check_insurance(patient_id, user_id, force=False):
+    """Sprawdza ubezpieczenie pacjenta w sesji konta eWUS użytkownika"""
+    patient = Patient.objects.get(pk=patient_id)
+    account = EwusAccount.objects.get(userId_id=user_id)
+    result, record, from_cache = get_broker().call(
+        account,
+        lambda client: insurance_cache.check_insurance_cached(
+            client, patient.get_decrypted_pesel(), patient.pesel_hash, force=force
+        )
+    )
+    return {
+        'record_id': record.pk,
+        'insurance_status': record.insurance_status,
+        'from_cache': from_cache,
+    }
+
+
+@task('ewus.open_session')
+def open_session(user_id):
+    """Loguje konto eWUS użytkownika do puli sesji brokera (po zalogowaniu do aplikacji)"""
+    session = get_broker().get_session(EwusAccount.objects.get(userId_id=user_id))
+    return {'expires_at': session.expires_at.isoformat()}
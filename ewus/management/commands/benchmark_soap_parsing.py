@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from ewus.utils.ewus_client import EWUSClient, EWUSException, SessionInfo
+from ewus.utils import soap_samples
+from datetime import datetime, timedelta
+import statistics
+import time
+
+
+class Command(BaseCommand):
+    help = 'Mierzy czas parsowania przykładowych odpowiedzi SOAP środowiska testowego eWUS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=2000,
+            help='Liczba parsowań każdej odpowiedzi w jednej próbie (domyślnie: 2000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Liczba prób, z których brana jest mediana (domyślnie: 5)'
+        )
+
+    def handle(self, *args, **options):
+        self.iterations = options['iterations']
+        self.repeat = options['repeat']
+
+        client = EWUSClient(test_environment=True)
+        client.session = SessionInfo(
+            session_id='B8C5D0A0A1E4F4C7B6F5E4D3C2B1A0F9',
+            auth_token='sWPCBo3e0zvJ8aNLydc1k7',
+            login_time=datetime.now(),
+            operator_id='TEST1',
+            ow_code='15',
+            expires_at=datetime.now() + timedelta(hours=8)
+        )
+
+        cases = [
+            ('login', lambda: client._parse_login(soap_samples.LOGIN_RESPONSE)),
+            ('login [001]', lambda: client._parse_login(soap_samples.LOGIN_PASSWORD_EXPIRES_RESPONSE)),
+            ('fault', lambda: self._expect_fault(client)),
+        ]
+        for name, response in soap_samples.CHECK_CWU_RESPONSES.items():
+            cases.append((
+                f'checkCWU {name}',
+                lambda response=response: client._parse_check_cwu_response(response, '00092497177')
+            ))
+
+        self.stdout.write(f'{"Odpowiedź":<24} {"µs / odpowiedź":>15} {"odpowiedzi / s":>15}')
+        self.stdout.write('-' * 56)
+
+        for name, func in cases:
+            per_response = self._measure(func)
+            self.stdout.write(
+                f'{name:<24} {per_response:>15.1f} {1_000_000 / per_response:>15.0f}'
+            )
+
+    def _measure(self, func):
+        """Mediana czasu jednego parsowania w mikrosekundach"""
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            for _ in range(self.iterations):
+                func()
+            timings.append((time.perf_counter() - start) * 1_000_000 / self.iterations)
+        return statistics.median(timings)
+
+    def _expect_fault(self, client):
+        try:
+            client._parse_soap_fault(soap_samples.AUTHENTICATION_FAULT_RESPONSE)
+        except EWUSException:
+            return
@@ -0,0 +1,141 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from ewus import insurance_cache
+from ewus.models import EwusAccount, InsuranceCheckRecord
+from ewus.session_broker import get_broker
+from ewus.utils.ewus_client import EWUSException, InsuranceStatus
+from patients.models import Patient
+from visits.models import VisitCard
+from tenants.models import Tenant
+from django_tenants.utils import connection
+from collections import Counter
+import time
+
+
+class Command(BaseCommand):
+    help = 'Sprawdza w eWUS ubezpieczenie wszystkich pacjentów z otwartymi kartami wizyt w wybranym tenancie'
+
+    CLOSED_STATUSES = ['zakończone', 'odwołane']
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tenant_schema',
+            type=str,
+            help='Schema name tenanta (np. "tenant1", "przychodnia_a")'
+        )
+        parser.add_argument(
+            'username',
+            type=str,
+            help='Użytkownik, którego konto eWUS zostanie użyte do logowania'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Maksymalna liczba jednoczesnych zapytań do eWUS (domyślnie: 8)'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=10.0,
+            help='Maksymalna liczba zapytań na sekundę (domyślnie: 10, 0 = bez limitu)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Sprawdź także pacjentów z aktualnym zapisanym wynikiem'
+        )
+        parser.add_argument(
+            '--production',
+            action='store_true',
+            help='Użyj produkcyjnego serwera eWUS zamiast testowego'
+        )
+
+    def handle(self, *args, **options):
+        tenant_schema = options['tenant_schema']
+
+        try:
+            tenant = Tenant.objects.get(schema_name=tenant_schema)
+        except Tenant.DoesNotExist:
+            self.stdout.write(
+                self.style.ERROR(f'Tenant "{tenant_schema}" nie istnieje!')
+            )
+            return
+
+        connection.set_tenant(tenant)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'🏥 Pracuję z tenant: {tenant.name} (schema: {tenant_schema})')
+        )
+
+        try:
+            account = EwusAccount.objects.get(userId__username=options['username'])
+        except EwusAccount.DoesNotExist:
+            self.stdout.write(
+                self.style.ERROR(f'Użytkownik "{options["username"]}" nie ma konta eWUS!')
+            )
+            return
+
+        open_cards = (
+            VisitCard.objects
+            .filter(is_cancelled=False)
+            .exclude(visit_status__in=self.CLOSED_STATUSES)
+            .values('patient_id')
+        )
+        patients = Patient.objects.filter(pk__in=open_cards)
+        if not options['force']:
+            fresh_checks = InsuranceCheckRecord.objects.filter(expires_at__gt=timezone.now())
+            patients = patients.exclude(pesel_hash__in=fresh_checks.values('pesel_hash'))
+
+        pesel_hashes = {
+            patient.pesel_encrypted: patient.pesel_hash
+            for patient in patients.with_decrypted()
+            if patient.pesel_encrypted
+        }
+        pesels = list(pesel_hashes)
+
+        if not pesels:
+            self.stdout.write(self.style.WARNING('⚠️ Brak pacjentów z otwartymi kartami wizyt do sprawdzenia'))
+            return
+
+        # Sesja z puli brokera - nie wylogowujemy jej, może być dalej używana przez widoki
+        try:
+            client = get_broker(test_environment=not options['production']).client(account)
+        except EWUSException as e:
+            self.stdout.write(self.style.ERROR(f'Nie udało się zalogować do eWUS: {e}'))
+            return
+
+        self.stdout.write(f'⏳ Sprawdzanie {len(pesels)} pacjentów...')
+
+        summary = Counter()
+        start = time.perf_counter()
+        for done, outcome in enumerate(client.check_insurance_many(
+            pesels,
+            max_workers=options['concurrency'],
+            rate_limit=options['rate'] or None
+        ), start=1):
+            if not outcome.ok:
+                summary['błąd'] += 1
+                self.stdout.write(
+                    self.style.ERROR(f'❌ {outcome.pesel[:6]}*****: {outcome.error}')
+                )
+                continue
+
+            insurance_cache.store_result(pesel_hashes[outcome.pesel], outcome.result)
+            if outcome.result.patient.insurance_status == InsuranceStatus.AKTYWNY:
+                summary['aktywne'] += 1
+            elif outcome.result.patient.insurance_status == InsuranceStatus.NIEAKTYWNY:
+                summary['nieaktywne'] += 1
+            else:
+                summary['nieznane'] += 1
+
+            if done % 50 == 0:
+                self.stdout.write(f'✅ Sprawdzono {done}/{len(pesels)} pacjentów...')
+
+        elapsed = time.perf_counter() - start
+        details = ', '.join(f'{name}: {count}' for name, count in summary.items())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'🎉 Sprawdzono {sum(summary.values())} pacjentów w {elapsed:.1f} s ({details})'
+            )
+        )
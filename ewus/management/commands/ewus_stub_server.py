@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from ewus.utils.stub_server import EwusStubServer, StubConfig
+
+
+class Command(BaseCommand):
+    help = 'Uruchamia lokalny serwer zaślepkowy eWUS (Auth i ServiceBroker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Adres nasłuchiwania (domyślnie: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=8099, help='Port (domyślnie: 8099)')
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.0,
+            help='Stałe opóźnienie odpowiedzi w sekundach (domyślnie: 0)'
+        )
+        parser.add_argument(
+            '--jitter',
+            type=float,
+            default=0.0,
+            help='Dodatkowe losowe opóźnienie 0..jitter sekund (domyślnie: 0)'
+        )
+        parser.add_argument(
+            '--fault-rate',
+            type=float,
+            default=0.0,
+            help='Odsetek zapytań checkCWU kończonych błędem serwera, 0-1 (domyślnie: 0)'
+        )
+        parser.add_argument(
+            '--session-ttl',
+            type=float,
+            default=8 * 60 * 60,
+            help='Czas życia sesji w sekundach (domyślnie: 8 h)'
+        )
+        parser.add_argument(
+            '--password',
+            help='Jedyne akceptowane hasło (domyślnie: każde)'
+        )
+
+    def handle(self, *args, **options):
+        server = EwusStubServer(
+            (options['host'], options['port']),
+            StubConfig(
+                latency=options['latency'],
+                jitter=options['jitter'],
+                fault_rate=options['fault_rate'],
+                session_ttl=options['session_ttl'],
+                password=options['password'],
+            )
+        )
+
+        self.stdout.write(self.style.SUCCESS(f'🏥 Serwer zaślepkowy eWUS: {server.url}'))
+        self.stdout.write(f'   Ustaw EWUS_TEST_BASE_URL={server.url}, aby aplikacja z niego korzystała')
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            details = ', '.join(f'{name}: {count}' for name, count in server.stats.items())
+            self.stdout.write(self.style.WARNING(f'⚠️ Serwer zatrzymany ({details or "brak zapytań"})'))
@@ -0,0 +1,216 @@
+from django.core.management.base import BaseCommand
+from ewus.utils.async_client import AsyncEWUSClient, close_http_client
+from ewus.utils.ewus_client import EWUSClient, EWUSException, RateLimiter
+from ewus.utils.stub_server import EwusStubServer, StubConfig
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+import asyncio
+import statistics
+import time
+
+
+def make_pesel(number):
+    """PESEL z poprawną cyfrą kontrolną"""
+    digits = f'{number:010d}'
+    weights = [1, 3, 7, 9, 1, 3, 7, 9, 1, 3]
+    checksum = sum(int(d) * w for d, w in zip(digits, weights)) % 10
+    return digits + str((10 - checksum) % 10)
+
+
+class Command(BaseCommand):
+    help = 'Test obciążeniowy klienta eWUS (login, checkCWU) na lokalnym serwerze zaślepkowym'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='URL bazowy działającego serwera (domyślnie: wbudowany serwer zaślepkowy)'
+        )
+        parser.add_argument(
+            '--mode',
+            choices=['threads', 'async'],
+            default='threads',
+            help='threads - EWUSClient w puli wątków, async - AsyncEWUSClient (domyślnie: threads)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Liczba jednoczesnych zapytań (domyślnie: 8)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Liczba zapytań checkCWU (domyślnie: 200)'
+        )
+        parser.add_argument(
+            '--logins',
+            type=int,
+            default=20,
+            help='Liczba logowań w fazie login (domyślnie: 20)'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=0.0,
+            help='Limit zapytań checkCWU na sekundę, jak w check_insurance_bulk (domyślnie: 0 = bez limitu)'
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.05,
+            help='Opóźnienie wbudowanego serwera w sekundach (domyślnie: 0.05)'
+        )
+        parser.add_argument(
+            '--jitter',
+            type=float,
+            default=0.0,
+            help='Losowe opóźnienie wbudowanego serwera 0..jitter sekund (domyślnie: 0)'
+        )
+        parser.add_argument(
+            '--fault-rate',
+            type=float,
+            default=0.0,
+            help='Odsetek błędów serwera wbudowanego, 0-1 (domyślnie: 0)'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        server = None
+        base_url = options['url']
+        if not base_url:
+            server = EwusStubServer(config=StubConfig(
+                latency=options['latency'],
+                jitter=options['jitter'],
+                fault_rate=options['fault_rate'],
+            )).start()
+            base_url = server.url
+
+        self.base_url = base_url
+        self.stdout.write(self.style.SUCCESS(
+            f'🏥 eWUS: {base_url} (tryb: {options["mode"]}, współbieżność: {options["concurrency"]})'
+        ))
+
+        pesels = [make_pesel(8001010000 + i) for i in range(options['requests'])]
+        try:
+            if options['mode'] == 'async':
+                login_stats, check_stats = asyncio.run(self._run_async(pesels))
+            else:
+                login_stats, check_stats = self._run_threads(pesels)
+        finally:
+            if server is not None:
+                server.stop()
+
+        self.stdout.write(f'{"Operacja":<10} {"n":>6} {"błędy":>6} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"req/s":>8}')
+        self.stdout.write('-' * 60)
+        self._report('login', *login_stats)
+        self._report('checkCWU', *check_stats)
+
+        if options['mode'] == 'threads':
+            metrics = EWUSClient.get_transport_metrics()
+            self.stdout.write(
+                f'🔌 Połączenia: otwarte {metrics.connections_opened}, '
+                f'ponownie użyte {metrics.connections_reused} ({metrics.reuse_ratio:.0%})'
+            )
+        if server is not None:
+            details = ', '.join(f'{name}: {count}' for name, count in server.stats.items())
+            self.stdout.write(f'📊 Serwer: {details}')
+
+    def _run_threads(self, pesels):
+        credentials = self._credentials()
+
+        def login():
+            return EWUSClient(base_url=self.base_url).login(credentials)
+
+        login_stats = self._measure_threads([login] * self.options['logins'])
+
+        client = EWUSClient(base_url=self.base_url)
+        client.login(credentials)
+        limiter = RateLimiter(self.options['rate']) if self.options['rate'] else None
+
+        def check(pesel):
+            if limiter is not None:
+                limiter.wait()
+            return client.check_insurance(pesel)
+
+        check_stats = self._measure_threads([lambda pesel=pesel: check(pesel) for pesel in pesels])
+        return login_stats, check_stats
+
+    def _measure_threads(self, calls):
+        timings, errors = [], Counter()
+
+        def timed(call):
+            start = time.perf_counter()
+            try:
+                call()
+            except EWUSException as e:
+                errors[e.__class__.__name__] += 1
+                return
+            timings.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, self.options['concurrency'])) as executor:
+            list(executor.map(timed, calls))
+        return timings, errors, time.perf_counter() - start
+
+    async def _run_async(self, pesels):
+        credentials = self._credentials()
+        semaphore = asyncio.Semaphore(max(1, self.options['concurrency']))
+
+        async def login():
+            return await AsyncEWUSClient(base_url=self.base_url).login(credentials)
+
+        try:
+            login_stats = await self._measure_async([login] * self.options['logins'], semaphore)
+
+            client = AsyncEWUSClient(base_url=self.base_url)
+            await client.login(credentials)
+            interval = 1.0 / self.options['rate'] if self.options['rate'] else 0
+
+            async def check(pesel, index):
+                if interval:
+                    await asyncio.sleep(index * interval)
+                return await client.check_insurance(pesel)
+
+            check_stats = await self._measure_async(
+                [lambda pesel=pesel, index=index: check(pesel, index) for index, pesel in enumerate(pesels)],
+                semaphore
+            )
+        finally:
+            await close_http_client()
+        return login_stats, check_stats
+
+    async def _measure_async(self, calls, semaphore):
+        timings, errors = [], Counter()
+
+        async def timed(call):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await call()
+                except EWUSException as e:
+                    errors[e.__class__.__name__] += 1
+                    return
+                timings.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(timed(call) for call in calls))
+        return timings, errors, time.perf_counter() - start
+
+    def _credentials(self):
+        return EWUSClient.create_doctor_credentials(domain='15', login='TEST1', password='qwerty!@#')
+
+    def _report(self, name, timings, errors, elapsed):
+        total = len(timings) + sum(errors.values())
+        if len(timings) >= 2:
+            cuts = statistics.quantiles(timings, n=100, method='inclusive')
+            p50, p95, p99 = (cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000)
+        else:
+            p50 = p95 = p99 = timings[0] * 1000 if timings else 0.0
+        throughput = total / elapsed if elapsed else 0.0
+        self.stdout.write(
+            f'{name:<10} {total:>6} {sum(errors.values()):>6} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {throughput:>8.1f}'
+        )
+        if errors:
+            details = ', '.join(f'{error}: {count}' for error, count in errors.items())
+            self.stdout.write(self.style.WARNING(f'⚠️ Błędy {name}: {details}'))
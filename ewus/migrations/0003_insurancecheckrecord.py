@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-17 03:33
+
+import zrowie.decryption
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ewus', '0002_alter_ewusaccount_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InsuranceCheckRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pesel_hash', models.CharField(max_length=64, unique=True, verbose_name='Hash PESEL')),
+                ('insurance_status', models.SmallIntegerField(blank=True, choices=[(1, 'Aktywne'), (0, 'Nieaktywne'), (-1, 'PESEL nieaktualny')], null=True, verbose_name='Status ubezpieczenia')),
+                ('is_valid', models.BooleanField(default=False, verbose_name='Ubezpieczenie ważne')),
+                ('status_symbol', models.CharField(blank=True, max_length=10, verbose_name='Symbol statusu')),
+                ('expiration_date', models.DateTimeField(blank=True, null=True, verbose_name='Ważne do (eWUS)')),
+                ('first_name', zrowie.decryption.CachedEncryptedCharField(blank=True, null=True, verbose_name='Imię wg eWUS')),
+                ('last_name', zrowie.decryption.CachedEncryptedCharField(blank=True, null=True, verbose_name='Nazwisko wg eWUS')),
+                ('additional_info', models.JSONField(blank=True, default=list, verbose_name='Informacje dodatkowe')),
+                ('notes', models.JSONField(blank=True, default=list, verbose_name='Uwagi')),
+                ('operation_id', models.CharField(blank=True, max_length=64, verbose_name='Identyfikator operacji')),
+                ('operation_date', models.DateTimeField(blank=True, null=True, verbose_name='Data operacji')),
+                ('operator_id', models.CharField(blank=True, max_length=64, verbose_name='Operator')),
+                ('ow_code', models.CharField(blank=True, max_length=2, verbose_name='Kod OW NFZ')),
+                ('checked_at', models.DateTimeField(verbose_name='Data sprawdzenia')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Ważne w pamięci podręcznej do')),
+            ],
+            options={
+                'verbose_name': 'Wynik sprawdzenia eWUS',
+                'verbose_name_plural': 'Wyniki sprawdzeń eWUS',
+                'db_table': 'tenant_schema_insurancecheckrecords',
+            },
+        ),
+    ]
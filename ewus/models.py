@@ -1,7 +1,9 @@
 from django.db import models
 from users.models import User
 import uuid
+from django.utils import timezone
 from encrypted_model_fields.fields import EncryptedCharField
+from zrowie.decryption import CachedEncryptedCharField
 
 class EwusAccount(models.Model):
     id = models.UUIDField(default=uuid.uuid4(), editable=False, primary_key=True)
@@ -39,4 +41,53 @@ class EwusAccount(models.Model):
             return False
         
     def __str__(self):
-        return self.userId.username
\ No newline at end of file
+        return self.userId.username
+
+class InsuranceCheckRecord(models.Model):
+    """
+    Ostatni wynik sprawdzenia ubezpieczenia w eWUS dla pacjenta.
+    Kluczem jest hash PESEL - numer PESEL nie jest tu przechowywany.
+    """
+    
+    STATUS_CHOICES = [
+        (1, 'Aktywne'),
+        (0, 'Nieaktywne'),
+        (-1, 'PESEL nieaktualny'),
+    ]
+    
+    pesel_hash = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='Hash PESEL'
+    )
+    insurance_status = models.SmallIntegerField(
+        choices=STATUS_CHOICES,
+        null=True,
+        blank=True,
+        verbose_name='Status ubezpieczenia'
+    )
+    is_valid = models.BooleanField(default=False, verbose_name='Ubezpieczenie ważne')
+    status_symbol = models.CharField(max_length=10, blank=True, verbose_name='Symbol statusu')
+    expiration_date = models.DateTimeField(null=True, blank=True, verbose_name='Ważne do (eWUS)')
+    first_name = CachedEncryptedCharField(null=True, blank=True, verbose_name='Imię wg eWUS')
+    last_name = CachedEncryptedCharField(null=True, blank=True, verbose_name='Nazwisko wg eWUS')
+    additional_info = models.JSONField(default=list, blank=True, verbose_name='Informacje dodatkowe')
+    notes = models.JSONField(default=list, blank=True, verbose_name='Uwagi')
+    operation_id = models.CharField(max_length=64, blank=True, verbose_name='Identyfikator operacji')
+    operation_date = models.DateTimeField(null=True, blank=True, verbose_name='Data operacji')
+    operator_id = models.CharField(max_length=64, blank=True, verbose_name='Operator')
+    ow_code = models.CharField(max_length=2, blank=True, verbose_name='Kod OW NFZ')
+    checked_at = models.DateTimeField(verbose_name='Data sprawdzenia')
+    expires_at = models.DateTimeField(db_index=True, verbose_name='Ważne w pamięci podręcznej do')
+    
+    class Meta:
+        db_table = 'tenant_schema_insurancecheckrecords'
+        verbose_name = 'Wynik sprawdzenia eWUS'
+        verbose_name_plural = 'Wyniki sprawdzeń eWUS'
+    
+    def __str__(self):
+        return f"{self.get_insurance_status_display() or 'Brak statusu'} ({self.checked_at:%Y-%m-%d %H:%M})"
+    
+    @property
+    def is_fresh(self):
+        return self.expires_at > timezone.now()
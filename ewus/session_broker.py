@@ -0,0 +1,234 @@
+"""
+Wspólne sesje eWUS na poziomie tenanta.
+
+Zamiast logować każdego użytkownika osobno i trzymać sesję w sesji
+przeglądarki, broker utrzymuje pulę żywych sesji eWUS kluczowaną kontem
+EwusAccount. Sesja jest odnawiana przed upływem expires_at, a po błędzie
+sesji lub tokenu (SessionException / AuthTokenException) broker loguje się
+ponownie i powtarza operację - widoki i zadania wsadowe nie obsługują
+logowania same.
+
+Sesje trzymamy w pamięci procesu i dodatkowo w cache Django, żeby kolejne
+workery nie logowały się tym samym kontem. Po nieudanym logowaniu
+(błędne hasło) kolejne próby są wstrzymywane na EWUS_LOGIN_BACKOFF sekund,
+żeby nie zablokować konta w NFZ.
+"""
+import threading
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .models import EwusAccount
+from .utils.async_client import AsyncEWUSClient
+from .utils.ewus_client import (
+    AuthenticationException,
+    AuthTokenException,
+    EWUSClient,
+    PassExpiredException,
+    SessionException,
+    SessionInfo,
+)
+
+
+# Sesja jest odnawiana, gdy do wygaśnięcia zostało mniej niż tyle
+REFRESH_MARGIN = timedelta(minutes=10)
+
+SESSION_ERRORS = (SessionException, AuthTokenException)
+
+
+class SessionBroker:
+    """Pula zalogowanych sesji eWUS dla kont EwusAccount"""
+
+    def __init__(self, test_environment: bool = True, base_url: str = None):
+        self.test_environment = test_environment
+        self.base_url = base_url
+        self._sessions = {}
+        self._failures = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def get_session(self, account, force: bool = False) -> SessionInfo:
+        """
+        Zwraca żywą sesję dla konta, logując się tylko gdy to konieczne
+
+        Args:
+            account: EwusAccount
+            force: Wymusza nowe logowanie (np. po odrzuceniu sesji przez eWUS)
+
+        Returns:
+            Informacje o sesji
+        """
+        key = self._key(account)
+        session = None if force else self._cached_session(key)
+        if session is not None:
+            return session
+
+        # Najwyżej jedno logowanie naraz na konto - pozostałe wątki czekają na jego wynik
+        with self._lock(key):
+            session = None if force else self._cached_session(key)
+            if session is not None:
+                return session
+            return self._login(key, account)
+
+    def client(self, account) -> EWUSClient:
+        """Klient EWUSClient z przypisaną sesją konta"""
+        client = EWUSClient(test_environment=self.test_environment, debug=False, base_url=self.base_url)
+        client.session = self.get_session(account)
+        return client
+
+    def call(self, account, operation):
+        """
+        Wykonuje operation(client), a po wygaśnięciu sesji loguje się ponownie
+        i powtarza ją raz
+
+        Args:
+            account: EwusAccount
+            operation: Funkcja przyjmująca zalogowany EWUSClient
+
+        Returns:
+            Wynik operation
+        """
+        client = self.client(account)
+        try:
+            return operation(client)
+        except SESSION_ERRORS:
+            self.invalidate(account, client.session)
+            client.session = self.get_session(account, force=True)
+            return operation(client)
+
+    async def acall(self, account, operation):
+        """Asynchroniczny odpowiednik call - operation przyjmuje AsyncEWUSClient i zwraca korutynę"""
+        client = AsyncEWUSClient(test_environment=self.test_environment, debug=False, base_url=self.base_url)
+        client.session = await sync_to_async(self.get_session)(account)
+        try:
+            return await operation(client)
+        except SESSION_ERRORS:
+            self.invalidate(account, client.session)
+            client.session = await sync_to_async(self.get_session)(account, force=True)
+            return await operation(client)
+
+    def check_insurance(self, account, pesel):
+        """Sprawdza ubezpieczenie w sesji konta"""
+        return self.call(account, lambda client: client.check_insurance(pesel))
+
+    def invalidate(self, account, session: SessionInfo = None) -> None:
+        """
+        Usuwa sesję konta z puli
+
+        Args:
+            account: EwusAccount
+            session: Jeśli podana - usuwa tylko wtedy, gdy w puli jest wciąż ta sama
+                sesja (inny wątek mógł już zalogować się ponownie)
+        """
+        key = self._key(account)
+        current = self._sessions.get(key)
+        if session is not None and current is not None and current.session_id != session.session_id:
+            return
+        self._sessions.pop(key, None)
+        cache.delete(self._cache_key(key))
+
+    def logout(self, account) -> bool:
+        """Wylogowuje sesję konta z eWUS i usuwa ją z puli"""
+        session = self._sessions.get(self._key(account))
+        self.invalidate(account)
+        if session is None:
+            return True
+        client = EWUSClient(test_environment=self.test_environment, debug=False, base_url=self.base_url)
+        client.session = session
+        return client.logout()
+
+    def _login(self, key, account) -> SessionInfo:
+        failed_at = self._failures.get(key)
+        if failed_at is not None and datetime.now() - failed_at < get_login_backoff():
+            raise AuthenticationException(
+                "Poprzednie logowanie do eWUS nie powiodło się - kolejna próba wstrzymana"
+            )
+
+        client = EWUSClient(test_environment=self.test_environment, debug=False, base_url=self.base_url)
+        credentials = EWUSClient.create_doctor_credentials(
+            domain=account.regionId,
+            login=account.login,
+            password=account.password,
+            doctor_id=account.doctorId if account.isDoctorIdRequired else None
+        )
+        try:
+            session, _ = client.login(credentials)
+        except (AuthenticationException, PassExpiredException):
+            self._failures[key] = datetime.now()
+            raise
+
+        self._failures.pop(key, None)
+        self._sessions[key] = session
+        timeout = (session.expires_at - datetime.now()).total_seconds()
+        if timeout > 0:
+            cache.set(self._cache_key(key), _session_to_dict(session), timeout)
+        return session
+
+    def _cached_session(self, key):
+        session = self._sessions.get(key)
+        if session is None:
+            data = cache.get(self._cache_key(key))
+            if data is not None:
+                session = _session_from_dict(data)
+                self._sessions[key] = session
+        if session is None:
+            return None
+        if datetime.now() + REFRESH_MARGIN >= session.expires_at:
+            self._sessions.pop(key, None)
+            return None
+        return session
+
+    def _key(self, account):
+        tenant = getattr(connection, 'tenant', None)
+        return (getattr(tenant, 'schema_name', None), str(account.pk))
+
+    def _cache_key(self, key):
+        environment = 'test' if self.test_environment else 'prod'
+        return f"ewus:session:{environment}:{key[0]}:{key[1]}"
+
+    def _lock(self, key):
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+
+def get_login_backoff():
+    """Jak długo po nieudanym logowaniu nie próbować ponownie"""
+    return timedelta(seconds=getattr(settings, 'EWUS_LOGIN_BACKOFF', 300))
+
+
+def _session_to_dict(session: SessionInfo) -> dict:
+    client = EWUSClient(debug=False)
+    client.session = session
+    return client.save_session_to_dict()
+
+
+def _session_from_dict(data: dict) -> SessionInfo:
+    client = EWUSClient(debug=False)
+    client.restore_session(data)
+    return client.session
+
+
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+def get_broker(test_environment: bool = True) -> SessionBroker:
+    """Wspólny broker sesji dla wybranego środowiska eWUS"""
+    with _brokers_lock:
+        broker = _brokers.get(test_environment)
+        if broker is None:
+            # Środowisko testowe można skierować na lokalny serwer zaślepkowy (ewus_stub_server)
+            base_url = getattr(settings, 'EWUS_TEST_BASE_URL', None) if test_environment else None
+            broker = _brokers[test_environment] = SessionBroker(test_environment, base_url)
+        return broker
+
+
+def get_account(user):
+    """Konto eWUS użytkownika albo None"""
+    try:
+        return user.ewuscreds
+    except (AttributeError, EwusAccount.DoesNotExist):
+        return None
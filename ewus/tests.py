@@ -1,3 +1,123 @@
-from django.test import TestCase
+import asyncio
+import gc
+import weakref
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+
+from jobs import queue
+from jobs.models import Job
+from patients.models import Patient
+from patients.views import patient_insurance
+from . import session_broker
+from .models import EwusAccount, InsuranceCheckRecord
+from .utils import async_client
+from .utils.stub_server import EwusStubServer
+
+
+class AsyncHttpClientLifetimeTests(SimpleTestCase):
+    async def open_client(self):
+        client = await async_client.get_http_client()
+        self.assertIs(await async_client.get_http_client(), client)
+        return client
+
+    def test_client_is_closed_with_its_event_loop(self):
+        # Każde wywołanie to nowa pętla - jak widok async pod WSGI
+        first = asyncio.run(self.open_client())
+        second = async_to_sync(self.open_client)()
+
+        self.assertIsNot(first, second)
+        self.assertTrue(first.is_closed)
+        self.assertTrue(second.is_closed)
+        gc.collect()
+        self.assertEqual(len(async_client._clients), 0)
+
+    def test_finished_loop_is_freed(self):
+        async def open_client():
+            await async_client.get_http_client()
+            return weakref.ref(asyncio.get_running_loop())
+
+        loops = [asyncio.run(open_client()), async_to_sync(open_client)()]
+        # Pętla zamknięta bez shutdown_asyncgens() również nie jest przytrzymywana
+        loop = asyncio.new_event_loop()
+        loops.append(loop.run_until_complete(open_client()))
+        loop.close()
+        del loop
+
+        gc.collect()
+        self.assertEqual([loop() for loop in loops], [None, None, None])
+        self.assertEqual(len(async_client._clients), 0)
+
+    def test_close_http_client(self):
+        async def open_and_close():
+            client = await async_client.get_http_client()
+            await async_client.close_http_client()
+            return client
+
+        self.assertTrue(asyncio.run(open_and_close()).is_closed)
+        self.assertEqual(len(async_client._clients), 0)
+
+
+class StaleInsuranceRefreshTests(TenantTestCase):
+    """Przeterminowany wynik z widoku async jest odświeżany przez kolejkę zadań"""
+
+    PESEL = '00092497177'  # w serwerze zaślepkowym: ubezpieczenie aktywne
+
+    def setUp(self):
+        super().setUp()
+        self.server = EwusStubServer().start()
+        self.addCleanup(self.server.stop)
+        settings = override_settings(EWUS_TEST_BASE_URL=self.server.url, EWUS_INSURANCE_STALE_TTL=900)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        brokers = mock.patch.dict(session_broker._brokers, clear=True)
+        brokers.start()
+        self.addCleanup(brokers.stop)
+
+        self.user = get_user_model().objects.create_user(
+            username='lekarz', email='lekarz@example.com', password='x'
+        )
+        EwusAccount.objects.create(userId=self.user, login='TEST1', password='haslo', regionId='07')
+        self.patient = Patient.objects.create(
+            pesel_encrypted=self.PESEL, first_name_encrypted='Jan', last_name_encrypted='Kowalski'
+        )
+        checked_at = timezone.now() - timedelta(days=1)
+        self.record = InsuranceCheckRecord.objects.create(
+            pesel_hash=self.patient.pesel_hash,
+            insurance_status=0,
+            checked_at=checked_at,
+            expires_at=timezone.now() - timedelta(minutes=1),
+        )
+
+    def get_insurance(self):
+        request = RequestFactory().get('/', {'refresh': '1'})
+        request.user = self.user
+        request.auser = mock.AsyncMock(return_value=self.user)
+        request.htmx = True
+        request.tenant = self.tenant
+        return async_to_sync(patient_insurance)(request, pk=self.patient.pk)
+
+    def test_stale_read_is_refreshed_by_job(self):
+        response = self.get_insurance()
+
+        self.assertEqual(response.status_code, 200)
+        # Od razu przeterminowany wynik, a odświeżenie czeka w kolejce
+        job = Job.objects.get(name='ewus.check_insurance')
+        self.assertEqual(job.payload['force'], True)
+        self.assertContains(response, f'{job.pk}')
+        # Kolejny odczyt przed wykonaniem nie zleca drugiego zadania
+        self.get_insurance()
+        self.assertEqual(Job.objects.filter(name='ewus.check_insurance').count(), 1)
+
+        queue.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE, job.error)
+        self.record.refresh_from_db()
+        self.assertTrue(self.record.is_fresh)
+        self.assertEqual(self.record.insurance_status, 1)
@@ -0,0 +1,245 @@
+"""
+Asynchroniczny klient eWUS dla wdrożeń ASGI.
+
+Budowanie i parsowanie XML jest wspólne z EWUSClient - różni się tylko
+transport: zapytania wysyła httpx.AsyncClient z pulą połączeń keep-alive,
+więc oczekiwanie na odpowiedź NFZ nie blokuje workera.
+"""
+import asyncio
+import weakref
+from typing import AsyncIterator, Iterable, Tuple
+
+import httpx
+
+from . import transport
+from .ewus_client import (
+    BulkCheckOutcome,
+    EWUSClient,
+    EWUSException,
+    InsuranceCheckResult,
+    InputException,
+    LoginCredentials,
+    LoginStatus,
+    SessionException,
+    SessionInfo,
+)
+
+
+# Jeden klient HTTP na pętlę zdarzeń (AsyncClient jest związany z pętlą).
+# Pod WSGI każde wywołanie widoku async dostaje nową pętlę, więc klient jest
+# zamykany razem z pętlą. Wartością jest sam klient - nic w słowniku nie
+# wskazuje na pętlę, więc zakończona pętla może zostać zwolniona.
+_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+# Pętle z podpiętym zamykaniem klienta
+_hooked_loops: weakref.WeakSet = weakref.WeakSet()
+
+
+def _close_on_shutdown(loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Podpina zamknięcie klienta pod loop.shutdown_asyncgens().
+
+    asyncio.run() i asgiref (async_to_sync) wywołują je w pętli tuż przed
+    jej zamknięciem. Opakowanie jest atrybutem samej pętli - odwołanie do
+    pętli tworzy tylko cykl, który gc zwalnia razem z nią.
+    """
+    if loop in _hooked_loops:
+        return
+    shutdown_asyncgens = loop.shutdown_asyncgens
+
+    async def shutdown() -> None:
+        try:
+            await close_http_client()
+        finally:
+            await shutdown_asyncgens()
+
+    loop.shutdown_asyncgens = shutdown
+    _hooked_loops.add(loop)
+
+
+async def get_http_client() -> httpx.AsyncClient:
+    """Zwraca wspólny dla bieżącej pętli zdarzeń klient HTTP"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is not None and not client.is_closed:
+        return client
+
+    client = httpx.AsyncClient(
+        timeout=httpx.Timeout(transport.READ_TIMEOUT, connect=transport.CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=transport.POOL_MAXSIZE,
+            max_keepalive_connections=transport.POOL_MAXSIZE,
+        ),
+        # Ponawiane są tylko błędy nawiązania połączenia - jak w transport.py
+        transport=httpx.AsyncHTTPTransport(retries=transport.CONNECT_RETRIES),
+    )
+    _close_on_shutdown(loop)
+    _clients[loop] = client
+    return client
+
+
+async def close_http_client() -> None:
+    """Zamyka klienta HTTP bieżącej pętli zdarzeń"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def post(url: str, data: bytes, headers: dict, idempotent: bool = False) -> httpx.Response:
+    """
+    Wysyła żądanie POST przez wspólną pulę połączeń
+
+    Args:
+        url: Adres usługi
+        data: Treść żądania
+        headers: Nagłówki HTTP
+        idempotent: Czy operację można powtórzyć po przekroczeniu czasu
+            odczytu lub błędzie 502/503/504
+
+    Returns:
+        Odpowiedź HTTP
+    """
+    client = await get_http_client()
+    attempts = 1 + (transport.IDEMPOTENT_RETRIES if idempotent else 0)
+
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+        try:
+            response = await client.post(url, content=data, headers=headers)
+        except (httpx.ReadTimeout, httpx.ConnectError):
+            if last_attempt:
+                raise
+        else:
+            if response.status_code not in transport.RETRY_STATUSES or last_attempt:
+                return response
+
+        await asyncio.sleep(transport.BACKOFF_FACTOR * (2 ** attempt))
+
+
+class AsyncEWUSClient(EWUSClient):
+    """
+    Klient eWUS z asynchronicznymi metodami login, check_insurance i logout.
+
+    Pozostałe metody (save_session_to_dict, restore_session, walidacja PESEL)
+    działają tak samo jak w EWUSClient.
+    """
+
+    async def login(self, credentials: LoginCredentials) -> Tuple[SessionInfo, LoginStatus]:
+        """
+        Loguje operatora do systemu eWUS
+
+        Args:
+            credentials: Dane logowania
+
+        Returns:
+            Tuple zawierający informacje o sesji i status logowania
+        """
+        headers = {
+            'Content-Type': 'text/xml; charset=utf-8',
+            'SOAPAction': 'http://xml.kamsoft.pl/ws/auth/Auth/loginRequest'
+        }
+        try:
+            response = await post(self.auth_url, self._create_login_xml(credentials), headers)
+        except httpx.TimeoutException:
+            raise EWUSException("Timeout połączenia z serwerem eWUS")
+        except httpx.HTTPError as e:
+            raise EWUSException(f"Błąd połączenia z serwerem eWUS: {str(e)}")
+
+        self._raise_for_status(response.status_code, response.text)
+
+        text = response.text.strip()
+        if not text:
+            raise EWUSException("Pusta odpowiedź serwera")
+        if not text.startswith('<'):
+            raise EWUSException(f"Odpowiedź nie jest w formacie XML: {text[:200]}...")
+
+        session_info, login_status = self._parse_login(response.text)
+        session_info.ow_code = credentials.domain
+        self.session = session_info
+        return session_info, login_status
+
+    async def check_insurance(self, pesel: str) -> InsuranceCheckResult:
+        """
+        Sprawdza status ubezpieczenia pacjenta
+
+        Args:
+            pesel: Numer PESEL pacjenta
+
+        Returns:
+            Wynik sprawdzenia ubezpieczenia
+        """
+        if not self.session:
+            raise SessionException("Brak aktywnej sesji. Zaloguj się najpierw.")
+
+        if not self._validate_pesel(pesel):
+            raise InputException("Nieprawidłowy format numeru PESEL")
+
+        headers = {
+            'Content-Type': 'text/xml; charset=utf-8',
+            'SOAPAction': 'executeService'
+        }
+        try:
+            response = await post(
+                self.broker_url, self._create_check_cwu_xml(pesel), headers, idempotent=True
+            )
+        except httpx.HTTPError as e:
+            raise EWUSException(f"Błąd podczas sprawdzania ubezpieczenia: {str(e)}")
+
+        self._raise_for_status(response.status_code, response.text)
+        return self._parse_check_cwu_response(response.text, pesel)
+
+    async def check_insurance_many(self, pesels: Iterable[str], max_concurrency: int = 8
+                                   ) -> AsyncIterator[BulkCheckOutcome]:
+        """
+        Sprawdza ubezpieczenie wielu pacjentów współbieżnie w ramach jednej sesji
+
+        Args:
+            pesels: Numery PESEL (duplikaty są sprawdzane raz)
+            max_concurrency: Maksymalna liczba jednoczesnych zapytań do eWUS
+
+        Returns:
+            Asynchroniczny iterator wyników w kolejności zakończenia
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def check(pesel: str) -> BulkCheckOutcome:
+            async with semaphore:
+                try:
+                    return BulkCheckOutcome(pesel=pesel, result=await self.check_insurance(pesel))
+                except EWUSException as e:
+                    return BulkCheckOutcome(pesel=pesel, error=e)
+
+        tasks = [asyncio.ensure_future(check(pesel)) for pesel in dict.fromkeys(pesels)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def logout(self) -> bool:
+        """
+        Wylogowuje operatora z systemu
+
+        Returns:
+            True jeśli wylogowanie przebiegło pomyślnie
+        """
+        if not self.session:
+            return True
+
+        if self.test_environment:
+            self.session = None
+            return True
+
+        headers = {
+            'Content-Type': 'text/xml; charset=utf-8',
+            'SOAPAction': 'logout'
+        }
+        try:
+            response = await post(self.auth_url, self._create_logout_xml(), headers)
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+        finally:
+            # W przypadku błędu i tak czyścimy sesję lokalnie
+            self.session = None
@@ -2,12 +2,21 @@ import requests
 import xml.etree.ElementTree as ET
 import html
 from datetime import datetime, timedelta
-from typing import Dict, Optional, List, Tuple
+from typing import Dict, Iterable, Iterator, Optional, List, Tuple
 from dataclasses import dataclass
 from enum import Enum
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
 import uuid
+import logging
 import re
 
+from . import soap_templates, transport
+
+
+logger = logging.getLogger(__name__)
+
 class OperatorType(Enum):
     """Typy operatorów w systemie eWUS"""
     LEKARZ = "LEK"
@@ -69,6 +78,33 @@ class InsuranceCheckResult:
     is_valid: bool = False
     notes: Optional[List[str]] = None
 
+@dataclass
+class BulkCheckOutcome:
+    """Wynik sprawdzenia jednego PESEL w trybie wsadowym"""
+    pesel: str
+    result: Optional[InsuranceCheckResult] = None
+    error: Optional[Exception] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+class RateLimiter:
+    """Ogranicznik liczby żądań na sekundę, współdzielony przez wątki"""
+    
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
 class EWUSException(Exception):
     """Bazowy wyjątek dla systemu eWUS"""
     pass
@@ -105,6 +141,73 @@ class PassExpiredException(EWUSException):
     """Hasło wygasło"""
     pass
 
+# Przestrzenie nazw odpowiedzi SOAP
+NS_SOAP_ENV = "http://schemas.xmlsoap.org/soap/envelope/"
+NS_COMMON = "http://xml.kamsoft.pl/ws/common"
+NS_LOGIN_TYPES = "http://xml.kamsoft.pl/ws/kaas/login_types"
+NS_STATUS_CWU = "https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5"
+
+# Kwalifikowane nazwy elementów (format ElementTree: {namespace}nazwa)
+TAG_SOAP_FAULT = f"{{{NS_SOAP_ENV}}}Fault"
+TAG_COM_FAULTCODE = f"{{{NS_COMMON}}}faultcode"
+TAG_COM_FAULTSTRING = f"{{{NS_COMMON}}}faultstring"
+TAG_COM_SESSION = f"{{{NS_COMMON}}}session"
+TAG_COM_AUTH_TOKEN = f"{{{NS_COMMON}}}authToken"
+TAG_LOGIN_RETURN = f"{{{NS_LOGIN_TYPES}}}loginReturn"
+TAG_CWU_RESPONSE = f"{{{NS_STATUS_CWU}}}status_cwu_odp"
+TAG_CWU_STATUS = f"{{{NS_STATUS_CWU}}}status_cwu"
+TAG_CWU_OPERATOR = f"{{{NS_STATUS_CWU}}}id_operatora"
+TAG_CWU_OW = f"{{{NS_STATUS_CWU}}}id_ow"
+TAG_CWU_PROVIDER = f"{{{NS_STATUS_CWU}}}id_swiad"
+TAG_CWU_INSURANCE_STATUS = f"{{{NS_STATUS_CWU}}}status_ubezp"
+TAG_CWU_PESEL = f"{{{NS_STATUS_CWU}}}numer_pesel"
+TAG_CWU_FIRST_NAME = f"{{{NS_STATUS_CWU}}}imie"
+TAG_CWU_LAST_NAME = f"{{{NS_STATUS_CWU}}}nazwisko"
+TAG_CWU_EXPIRATION = f"{{{NS_STATUS_CWU}}}data_waznosci_potwierdzenia"
+TAG_CWU_ADDITIONAL_INFO = f"{{{NS_STATUS_CWU}}}informacje_dodatkowe"
+TAG_CWU_INFO = f"{{{NS_STATUS_CWU}}}informacja"
+
+# Typ błędu NFZ (końcówka faultcode) -> wyjątek, w kolejności sprawdzania
+FAULT_EXCEPTIONS = (
+    ("AuthenticationException", AuthenticationException),
+    ("AuthorizationException", AuthorizationException),
+    ("SessionException", SessionException),
+    ("AuthTokenException", AuthTokenException),
+    ("InputException", InputException),
+    ("ServiceException", ServiceException),
+    ("ServerException", ServerException),
+    ("PassExpiredException", PassExpiredException),
+)
+
+OPERATOR_ID_PATTERNS = (
+    re.compile(r'operatora?\s*:?\s*(\w+)', re.IGNORECASE),
+    re.compile(r'operator\s*ID\s*:?\s*(\w+)', re.IGNORECASE),
+    re.compile(r'ID\s*:?\s*(\w+)', re.IGNORECASE),
+)
+
+def _index_elements(root: ET.Element) -> Dict[str, ET.Element]:
+    """
+    Mapa nazwa elementu -> pierwszy element o tej nazwie (w kolejności dokumentu).
+    Jeden przebieg po drzewie zamiast osobnego przeszukiwania dla każdego pola.
+    """
+    elements = {}
+    for elem in root.iter():
+        elements.setdefault(elem.tag, elem)
+    return elements
+
+def _with_id(elem: Optional[ET.Element]) -> Optional[ET.Element]:
+    """Zwraca element tylko jeśli ma atrybut id"""
+    return elem if elem is not None and 'id' in elem.attrib else None
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Data z odpowiedzi eWUS albo None, jeśli brak lub format nieprawidłowy"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace(" ", "T"))
+    except ValueError:
+        return None
+
 class EWUSClient:
     """
     Klient systemu eWUS NFZ do sprawdzania statusu ubezpieczenia pacjentów.
@@ -116,17 +219,19 @@ class EWUSClient:
     - Zarządzanie sesjami
     """
     
-    def __init__(self, test_environment: bool = True, debug: bool = False):
+    def __init__(self, test_environment: bool = True, debug: bool = False,
+                 base_url: Optional[str] = None):
         """
         Inicjalizacja klienta eWUS
         
         Args:
             test_environment: Czy używać środowiska testowego (domyślnie True)
             debug: Czy włączyć tryb debugowania (pokazuje XML i odpowiedzi)
+            base_url: Własny URL bazowy usług (np. lokalny serwer zaślepkowy)
         """
         self.test_environment = test_environment
         self.debug = debug
-        self.base_url = self._get_base_url()
+        self.base_url = (base_url or self._get_base_url()).rstrip('/')
         self.auth_url = f"{self.base_url}/services/Auth"
         self.broker_url = f"{self.base_url}/services/ServiceBroker"
         self.session: Optional[SessionInfo] = None
@@ -183,18 +288,16 @@ class EWUSClient:
         
         return base_params
     
-    def _create_login_xml(self, credentials: LoginCredentials) -> str:
+    def _credential_items(self, credentials: LoginCredentials) -> List[Tuple[str, str]]:
         """
-        Tworzy XML do logowania
+        Zwraca parametry logowania wymagane dla domeny i typu operatora
         
         Args:
             credentials: Dane logowania
             
         Returns:
-            XML do wysłania
+            Lista par (nazwa parametru, wartość)
         """
-        required_params = []
-        
         if credentials.operator_type:
             required_params = self._get_required_params(
                 credentials.domain, 
@@ -203,67 +306,35 @@ class EWUSClient:
         else:
             required_params = ["domain", "login"]
         
-        # Budowa parametrów credentials
-        items = []
-        items.append(f"""
-            <auth:item>
-                <auth:name>domain</auth:name>
-                <auth:value>
-                    <auth:stringValue>{credentials.domain}</auth:stringValue>
-                </auth:value>
-            </auth:item>""")
-        
-        items.append(f"""
-            <auth:item>
-                <auth:name>login</auth:name>
-                <auth:value>
-                    <auth:stringValue>{credentials.login}</auth:stringValue>
-                </auth:value>
-            </auth:item>""")
+        items = [("domain", credentials.domain), ("login", credentials.login)]
         
         if "type" in required_params and credentials.operator_type:
-            items.append(f"""
-            <auth:item>
-                <auth:name>type</auth:name>
-                <auth:value>
-                    <auth:stringValue>{credentials.operator_type.value}</auth:stringValue>
-                </auth:value>
-            </auth:item>""")
+            items.append(("type", credentials.operator_type.value))
         
         if "idntLek" in required_params and credentials.doctor_id:
-            items.append(f"""
-            <auth:item>
-                <auth:name>idntLek</auth:name>
-                <auth:value>
-                    <auth:stringValue>{credentials.doctor_id}</auth:stringValue>
-                </auth:value>
-            </auth:item>""")
+            items.append(("idntLek", credentials.doctor_id))
         
         if "idntSwd" in required_params and credentials.provider_id:
-            items.append(f"""
-            <auth:item>
-                <auth:name>idntSwd</auth:name>
-                <auth:value>
-                    <auth:stringValue>{credentials.provider_id}</auth:stringValue>
-                </auth:value>
-            </auth:item>""")
-        
-        credentials_xml = "".join(items)
-        
-        return f"""<?xml version="1.0" encoding="UTF-8"?>
-<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" 
-                  xmlns:auth="http://xml.kamsoft.pl/ws/kaas/login_types">
-    <soapenv:Header/>
-    <soapenv:Body>
-        <auth:login>
-            <auth:credentials>{credentials_xml}
-            </auth:credentials>
-            <auth:password>{credentials.password}</auth:password>
-        </auth:login>
-    </soapenv:Body>
-</soapenv:Envelope>"""
+            items.append(("idntSwd", credentials.provider_id))
+        
+        return items
     
-    def _create_check_cwu_xml(self, pesel: str) -> str:
+    def _create_login_xml(self, credentials: LoginCredentials) -> bytes:
+        """
+        Tworzy XML do logowania
+        
+        Args:
+            credentials: Dane logowania
+            
+        Returns:
+            XML do wysłania (UTF-8)
+        """
+        return soap_templates.LOGIN.render(
+            credentials=soap_templates.render_credentials(self._credential_items(credentials)),
+            password=credentials.password
+        )
+    
+    def _create_check_cwu_xml(self, pesel: str) -> bytes:
         """
         Tworzy XML do sprawdzenia statusu ubezpieczenia
         
@@ -271,60 +342,27 @@ class EWUSClient:
             pesel: Numer PESEL pacjenta
             
         Returns:
-            XML do wysłania
+            XML do wysłania (UTF-8)
         """
         if not self.session:
             raise SessionException("Brak aktywnej sesji. Zaloguj się najpierw.")
         
-        current_time = datetime.now().isoformat()
-        
-        return f"""<?xml version="1.0" encoding="UTF-8"?>
-<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" 
-                  xmlns:com="http://xml.kamsoft.pl/ws/common" 
-                  xmlns:brok="http://xml.kamsoft.pl/ws/broker">
-    <soapenv:Header>
-        <com:session id="{self.session.session_id}" xmlns:ns1="http://xml.kamsoft.pl/ws/common"/>
-        <com:authToken id="{self.session.auth_token}" xmlns:ns1="http://xml.kamsoft.pl/ws/common"/>
-    </soapenv:Header>
-    <soapenv:Body>
-        <brok:executeService>
-            <com:location>
-                <com:namespace>nfz.gov.pl/ws/broker/cwu</com:namespace>
-                <com:localname>checkCWU</com:localname>
-                <com:version>5.0</com:version>
-            </com:location>
-            <brok:date>{current_time}</brok:date>
-            <brok:payload>
-                <brok:textload>
-                    <ewus:status_cwu_pyt xmlns:ewus="https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5">
-                        <ewus:numer_pesel>{pesel}</ewus:numer_pesel>
-                        <ewus:system_swiad nazwa="eWUS-Python-Client" wersja="1.0.0"/>
-                    </ewus:status_cwu_pyt>
-                </brok:textload>
-            </brok:payload>
-        </brok:executeService>
-    </soapenv:Body>
-</soapenv:Envelope>"""
+        return soap_templates.CHECK_CWU.render(
+            session_id=self.session.session_id,
+            auth_token=self.session.auth_token,
+            date=datetime.now().isoformat(),
+            pesel=pesel
+        )
     
-    def _create_logout_xml(self) -> str:
+    def _create_logout_xml(self) -> bytes:
         """Tworzy XML do wylogowania"""
         if not self.session:
             raise SessionException("Brak aktywnej sesji.")
         
-        return f"""<?xml version="1.0" encoding="UTF-8"?>
-<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" 
-                  xmlns:auth="http://xml.kamsoft.pl/ws/kaas/login_types"
-                  xmlns:com="http://xml.kamsoft.pl/ws/common">
-    <soapenv:Header/>
-    <soapenv:Body>
-        <auth:logout>
-            <com:session id="{self.session.session_id}" xmlns:ns1="http://xml.kamsoft.pl/ws/common"/>
-        </auth:logout>
-    </soapenv:Body>
-</soapenv:Envelope>"""
+        return soap_templates.LOGOUT.render(session_id=self.session.session_id)
     
     def _create_change_password_xml(self, credentials: LoginCredentials, 
-                                  old_password: str, new_password: str) -> str:
+                                  old_password: str, new_password: str) -> bytes:
         """
         Tworzy XML do zmiany hasła
         
@@ -334,85 +372,51 @@ class EWUSClient:
             new_password: Nowe hasło
             
         Returns:
-            XML do wysłania
+            XML do wysłania (UTF-8)
         """
-        login_xml_part = self._create_login_xml(credentials)
-        # Wyciągamy część credentials z XML logowania
-        root = ET.fromstring(login_xml_part)
-        credentials_elem = root.find(".//auth:credentials", 
-                                   {"auth": "http://xml.kamsoft.pl/ws/kaas/login_types"})
-        credentials_xml = ET.tostring(credentials_elem, encoding="unicode")
-        
-        return f"""<?xml version="1.0" encoding="UTF-8"?>
-<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" 
-                  xmlns:auth="http://xml.kamsoft.pl/ws/kaas/login_types">
-    <soapenv:Header/>
-    <soapenv:Body>
-        <auth:changePassword>
-            {credentials_xml}
-            <auth:oldPassword>{old_password}</auth:oldPassword>
-            <auth:newPassword>{new_password}</auth:newPassword>
-            <auth:newPasswordRepeat>{new_password}</auth:newPasswordRepeat>
-        </auth:changePassword>
-    </soapenv:Body>
-</soapenv:Envelope>"""
+        return soap_templates.CHANGE_PASSWORD.render(
+            credentials=soap_templates.render_credentials(self._credential_items(credentials)),
+            old_password=old_password,
+            new_password=new_password
+        )
     
-    def _parse_soap_fault(self, response_text: str) -> None:
+    def _parse_soap_fault(self, response_text: str, root: Optional[ET.Element] = None) -> None:
         """
-        Parsuje błędy SOAP i rzuca odpowiednie wyjątki
+        Parsuje błąd SOAP i rzuca odpowiedni wyjątek
         
         Args:
             response_text: Odpowiedź SOAP z błędem
+            root: Sparsowany już dokument (jeśli jest dostępny)
         """
         try:
-            root = ET.fromstring(response_text)
+            if root is None:
+                root = ET.fromstring(response_text)
+            elements = _index_elements(root)
             
             # Sprawdź błędy NFZ (com:faultcode)
-            fault_code_nfz = root.find(".//com:faultcode", {"com": "http://xml.kamsoft.pl/ws/common"})
-            fault_string_nfz = root.find(".//com:faultstring", {"com": "http://xml.kamsoft.pl/ws/common"})
+            fault_code_nfz = elements.get(TAG_COM_FAULTCODE)
+            fault_string_nfz = elements.get(TAG_COM_FAULTSTRING)
             
             if fault_code_nfz is not None and fault_string_nfz is not None:
-                code = fault_code_nfz.text
+                code = fault_code_nfz.text or ""
                 message = fault_string_nfz.text
                 
                 # Wyciągnij typ błędu z faultcode (np. "Client.AuthenticationException" -> "AuthenticationException")
-                if "." in code:
-                    error_type = code.split(".")[-1]
-                else:
-                    error_type = code
+                error_type = code.split(".")[-1]
                 
-                if "AuthenticationException" in error_type:
-                    raise AuthenticationException(message)
-                elif "AuthorizationException" in error_type:
-                    raise AuthorizationException(message)
-                elif "SessionException" in error_type:
-                    raise SessionException(message)
-                elif "AuthTokenException" in error_type:
-                    raise AuthTokenException(message)
-                elif "InputException" in error_type:
-                    raise InputException(message)
-                elif "ServiceException" in error_type:
-                    raise ServiceException(message)
-                elif "ServerException" in error_type:
-                    raise ServerException(message)
-                elif "PassExpiredException" in error_type:
-                    raise PassExpiredException(message)
-                else:
-                    raise EWUSException(f"Nieznany błąd NFZ: {code} - {message}")
+                for name, exception_class in FAULT_EXCEPTIONS:
+                    if name in error_type:
+                        raise exception_class(message)
+                raise EWUSException(f"Nieznany błąd NFZ: {code} - {message}")
             
             # Sprawdź standardowe błędy SOAP
-            fault = root.find(".//soap:Fault", {"soap": "http://schemas.xmlsoap.org/soap/envelope/"})
-            if fault is None:
-                fault = root.find(".//soapenv:Fault", {"soapenv": "http://schemas.xmlsoap.org/soap/envelope/"})
-            
+            fault = elements.get(TAG_SOAP_FAULT)
             if fault is not None:
                 fault_code = fault.find("faultcode")
                 fault_string = fault.find("faultstring")
                 
                 if fault_code is not None and fault_string is not None:
-                    code = fault_code.text
-                    message = fault_string.text
-                    raise EWUSException(f"Błąd SOAP: {code} - {message}")
+                    raise EWUSException(f"Błąd SOAP: {fault_code.text} - {fault_string.text}")
             
             # Jeśli nie znaleziono fault, ale mamy response_text, pokaż co było
             if response_text.strip():
@@ -422,242 +426,139 @@ class EWUSClient:
                 
         except ET.ParseError as e:
             raise EWUSException(f"Nie można sparsować odpowiedzi XML: {str(e)[:200]}... Odpowiedź: {response_text[:300]}...")
+    
+    def _raise_for_status(self, status_code: int, response_text: str) -> None:
+        """
+        Rzuca wyjątek dla odpowiedzi HTTP innej niż 200
         
-    def _parse_login_response(self, response_text: str) -> SessionInfo:
+        Args:
+            status_code: Kod statusu HTTP
+            response_text: Treść odpowiedzi (błąd 500 może zawierać SOAP fault)
         """
-        Parsuje odpowiedź SOAP z logowania
+        if status_code == 200:
+            return
+        if status_code == 500:
+            self._parse_soap_fault(response_text)
+        raise EWUSException(f"Błąd HTTP {status_code}: {response_text[:300]}...")
+    
+    def _parse_login(self, response_text: str) -> Tuple[SessionInfo, LoginStatus]:
+        """
+        Parsuje odpowiedź SOAP z logowania w jednym przebiegu po dokumencie
         
         Args:
             response_text: Odpowiedź SOAP z logowania
             
         Returns:
-            Informacje o sesji
+            Tuple zawierający informacje o sesji i status logowania
         """
         try:
-            if self.debug:
-                print("🔧 DEBUG - Parsowanie odpowiedzi logowania...")
-                print(f"🔧 DEBUG - Długość odpowiedzi: {len(response_text)} znaków")
-                
             root = ET.fromstring(response_text)
+        except ET.ParseError as e:
+            error_msg = f"Nie można sparsować odpowiedzi logowania XML: {str(e)}"
+            if self.debug:
+                logger.debug(f"BŁĄD XML Parse: {error_msg}")
+                logger.debug("%s", response_text[:500])
+            raise EWUSException(error_msg)
+        
+        try:
+            elements = _index_elements(root)
             
             if self.debug:
-                print(f"🔧 DEBUG - Root element: {root.tag}")
-                print(f"🔧 DEBUG - Root namespaces: {root.attrib}")
-                
-                # Wyświetl wszystkie elementy w odpowiedzi
-                print("🔧 DEBUG - Wszystkie elementy w odpowiedzi:")
+                logger.debug("Elementy odpowiedzi logowania:")
                 for elem in root.iter():
-                    print(f"  - {elem.tag}: {elem.text} | attrib: {elem.attrib}")
-            
-            # Sprawdź czy nie ma błędu SOAP fault
-            fault = root.find(".//soapenv:Fault", {"soapenv": "http://schemas.xmlsoap.org/soap/envelope/"})
-            if fault is None:
-                fault = root.find(".//soap:Fault", {"soap": "http://schemas.xmlsoap.org/soap/envelope/"})
-            
-            if fault is not None:
-                if self.debug:
-                    print("🔧 DEBUG - Znaleziono SOAP fault w odpowiedzi!")
-                    fault_code = fault.find("faultcode")
-                    fault_string = fault.find("faultstring") 
-                    if fault_code is not None:
-                        print(f"🔧 DEBUG - Fault code: {fault_code.text}")
-                    if fault_string is not None:
-                        print(f"🔧 DEBUG - Fault string: {fault_string.text}")
-                self._parse_soap_fault(response_text)
-            
-            # Sprawdź błędy NFZ (com:faultcode)
-            fault_code_nfz = root.find(".//com:faultcode", {"com": "http://xml.kamsoft.pl/ws/common"})
-            if fault_code_nfz is not None:
-                if self.debug:
-                    print("🔧 DEBUG - Znaleziono NFZ fault code!")
-                self._parse_soap_fault(response_text)
+                    logger.debug(f"  - {elem.tag}: {elem.text} | attrib: {elem.attrib}")
             
-            # Szukaj session ID - używamy namespace który faktycznie jest w odpowiedzi
-            session_elem = None
+            # Sprawdź czy nie ma błędu SOAP fault lub błędu NFZ (com:faultcode)
+            if TAG_SOAP_FAULT in elements or TAG_COM_FAULTCODE in elements:
+                self._parse_soap_fault(response_text, root)
             
-            # Spróbuj z namespace ns1 (jak w odpowiedzi)
-            try:
-                session_elem = root.find(".//ns1:session[@id]", {"ns1": "http://xml.kamsoft.pl/ws/common"})
-                if session_elem is not None:
-                    if self.debug:
-                        print("🔧 DEBUG - Znaleziono session element z prefiksem ns1")
-            except Exception as e:
-                if self.debug:
-                    print(f"🔧 DEBUG - Błąd z ns1: {e}")
+            session_elem = _with_id(elements.get(TAG_COM_SESSION))
+            token_elem = _with_id(elements.get(TAG_COM_AUTH_TOKEN))
+            login_return = elements.get(TAG_LOGIN_RETURN)
             
-            # Jeśli nie ma z ns1, spróbuj bez namespace (bezpośrednie wyszukiwanie)
-            if session_elem is None:
-                if self.debug:
-                    print("🔧 DEBUG - Szukam session bez namespace...")
+            # Odpowiedź z innymi przestrzeniami nazw - szukamy po nazwie elementu
+            if session_elem is None or token_elem is None or login_return is None:
+                session_fallback = id_fallback = None
                 for elem in root.iter():
-                    if 'session' in elem.tag and 'id' in elem.attrib:
-                        session_elem = elem
-                        if self.debug:
-                            print(f"🔧 DEBUG - Znaleziono session element: {elem.tag}")
-                        break
-            
-            # Jeśli nie ma session w nagłówku, sprawdź w body
-            if session_elem is None:
-                if self.debug:
-                    print("🔧 DEBUG - Nie znaleziono session w nagłówku, szukam w body...")
-                
-                # Sprawdź wszystkie elementy z atrybutem id
-                for elem in root.iter():
-                    if 'id' in elem.attrib and ('session' in elem.tag.lower() or len(elem.attrib.get('id', '')) > 10):
-                        session_elem = elem
-                        if self.debug:
-                            print(f"🔧 DEBUG - Potencjalny session element: {elem.tag} = {elem.attrib}")
-                        break
+                    tag = elem.tag.lower()
+                    has_id = 'id' in elem.attrib
+                    if session_elem is None and has_id:
+                        if session_fallback is None and 'session' in tag:
+                            session_fallback = elem
+                        if id_fallback is None and len(elem.attrib['id']) > 10:
+                            id_fallback = elem
+                    if token_elem is None and has_id and 'token' in tag:
+                        token_elem = elem
+                    if login_return is None and 'loginreturn' in tag:
+                        login_return = elem
+                if session_elem is None:
+                    session_elem = session_fallback if session_fallback is not None else id_fallback
             
             if session_elem is None:
-                if self.debug:
-                    print("🔧 DEBUG - BŁĄD: Brak session ID w odpowiedzi!")
-                    print("🔧 DEBUG - Wszystkie elementy z atrybutem 'id':")
-                    for elem in root.iter():
-                        if 'id' in elem.attrib:
-                            print(f"  - {elem.tag}: id='{elem.attrib['id']}'")
                 raise EWUSException("Brak session ID w odpowiedzi logowania")
-            
-            session_id = session_elem.get("id")
-            if self.debug:
-                print(f"🔧 DEBUG - Session ID: {session_id}")
-            
-            # Szukaj auth token - używamy ten sam sposób co dla session
-            token_elem = None
-            
-            # Spróbuj z namespace ns1 (jak w odpowiedzi)
-            try:
-                token_elem = root.find(".//ns1:authToken[@id]", {"ns1": "http://xml.kamsoft.pl/ws/common"})
-                if token_elem is not None:
-                    if self.debug:
-                        print("🔧 DEBUG - Znaleziono authToken element z prefiksem ns1")
-            except Exception as e:
-                if self.debug:
-                    print(f"🔧 DEBUG - Błąd z ns1 dla token: {e}")
-            
-            # Jeśli nie ma z ns1, spróbuj bez namespace (bezpośrednie wyszukiwanie)
             if token_elem is None:
-                if self.debug:
-                    print("🔧 DEBUG - Szukam authToken bez namespace...")
-                for elem in root.iter():
-                    if ('token' in elem.tag.lower() or 'authtoken' in elem.tag.lower()) and 'id' in elem.attrib:
-                        token_elem = elem
-                        if self.debug:
-                            print(f"🔧 DEBUG - Znaleziono token element: {elem.tag}")
-                        break
-            
-            if token_elem is None:
-                if self.debug:
-                    print("🔧 DEBUG - BŁĄD: Brak auth token w odpowiedzi!")
-                    print("🔧 DEBUG - Wszystkie elementy z 'token' lub 'auth' w nazwie:")
-                    for elem in root.iter():
-                        if 'token' in elem.tag.lower() or 'auth' in elem.tag.lower():
-                            print(f"  - {elem.tag}: {elem.text} | attrib: {elem.attrib}")
                 raise EWUSException("Brak auth token w odpowiedzi logowania")
             
+            session_id = session_elem.get("id")
             auth_token = token_elem.get("id")
-            if self.debug:
-                print(f"🔧 DEBUG - Auth Token: {auth_token}")
+            message = html.unescape(login_return.text) if login_return is not None and login_return.text else None
             
-            # Szukaj informacji o operatorze
+            # Szukaj ID operatora w komunikacie (np. "ID operatora: 12345"),
+            # a jeśli go nie ma - utwórz na podstawie sesji
             operator_id = None
-            
-            # Sprawdź loginReturn dla dodatkowych informacji - używaj właściwy namespace
-            login_return = None
-            try:
-                login_return = root.find(".//ns1:loginReturn", {"ns1": "http://xml.kamsoft.pl/ws/kaas/login_types"})
-                if login_return is not None:
-                    if self.debug:
-                        print("🔧 DEBUG - Znaleziono loginReturn z ns1")
-            except Exception as e:
-                if self.debug:
-                    print(f"🔧 DEBUG - Błąd z ns1 dla loginReturn: {e}")
-            
-            # Jeśli nie ma z ns1, spróbuj bezpośrednio
-            if login_return is None:
-                if self.debug:
-                    print("🔧 DEBUG - Szukam loginReturn bez namespace...")
-                for elem in root.iter():
-                    if 'loginreturn' in elem.tag.lower():
-                        login_return = elem
-                        if self.debug:
-                            print(f"🔧 DEBUG - Znaleziono loginReturn element: {elem.tag}")
-                        break
-            
-            if login_return is not None and login_return.text:
-                if self.debug:
-                    print(f"🔧 DEBUG - LoginReturn message: {login_return.text}")
-                
-                # Próbuj wyciągnąć operator ID z komunikatu
-                message = login_return.text
-                if self.debug:
-                    print(f"🔧 DEBUG - LoginReturn message (raw): {message}")
-                    # Dekoduj HTML entities dla czytelności
-                    try:
-                        import html
-                        decoded_message = html.unescape(message)
-                        print(f"🔧 DEBUG - LoginReturn message (decoded): {decoded_message}")
-                    except:
-                        decoded_message = message
-                # Szukaj wzorców jak "ID operatora: 12345" itp.
-                import re
-                patterns = [
-                    r'operatora?\s*:?\s*(\w+)',
-                    r'operator\s*ID\s*:?\s*(\w+)',
-                    r'ID\s*:?\s*(\w+)'
-                ]
-                
-                for pattern in patterns:
-                    match = re.search(pattern, message, re.IGNORECASE)
+            if message:
+                for pattern in OPERATOR_ID_PATTERNS:
+                    match = pattern.search(message)
                     if match:
                         operator_id = match.group(1)
-                        if self.debug:
-                            print(f"🔧 DEBUG - Operator ID z komunikatu: {operator_id}")
                         break
-            
-            # Jeśli nie znaleziono operator ID, utwórz na podstawie session
             if not operator_id:
                 operator_id = f"OP_{session_id[:8]}"
-                if self.debug:
-                    print(f"🔧 DEBUG - Wygenerowany Operator ID: {operator_id}")
             
-            # Domyślny OW code (zostanie nadpisany w login())
-            ow_code = "00"
+            # Kody statusu zgodnie z dokumentacją NFZ - domyślnie sukces
+            login_status = LoginStatus.SUCCESS
+            if message:
+                for status in LoginStatus:
+                    if f"[{status.value}]" in message:
+                        login_status = status
+                        break
             
+            now = datetime.now()
             session_info = SessionInfo(
                 session_id=session_id,
                 auth_token=auth_token,
-                login_time=datetime.now(),
+                login_time=now,
                 operator_id=operator_id,
-                ow_code=ow_code,
-                expires_at=datetime.now() + timedelta(hours=8)
+                ow_code="00",  # Domyślny OW code (zostanie nadpisany w login())
+                expires_at=now + timedelta(hours=8)
             )
             
             if self.debug:
-                print("🔧 DEBUG - SessionInfo utworzony pomyślnie!")
-                print(f"🔧 DEBUG - Session ID: {session_info.session_id}")
-                print(f"🔧 DEBUG - Auth Token: {session_info.auth_token}")
-                print(f"🔧 DEBUG - Operator ID: {session_info.operator_id}")
-                print(f"🔧 DEBUG - Expires at: {session_info.expires_at}")
-                
-            return session_info
+                logger.debug(f"Komunikat logowania: {message}")
+                logger.debug(f"SessionInfo: {session_info}, status: {login_status}")
             
-        except ET.ParseError as e:
-            error_msg = f"Nie można sparsować odpowiedzi logowania XML: {str(e)}"
-            if self.debug:
-                print(f"🔧 DEBUG - BŁĄD XML Parse: {error_msg}")
-                print(f"🔧 DEBUG - Problematyczny XML (pierwsze 500 znaków):")
-                print(response_text[:500])
-            raise EWUSException(error_msg)
+            return session_info, login_status
             
+        except EWUSException:
+            raise
         except Exception as e:
             error_msg = f"Błąd podczas parsowania logowania: {str(e)}"
             if self.debug:
-                print(f"🔧 DEBUG - BŁĄD parsowania: {error_msg}")
-                import traceback
-                traceback.print_exc()
+                logger.debug(f"BŁĄD parsowania: {error_msg}")
             raise EWUSException(error_msg)
     
+    def _parse_login_response(self, response_text: str) -> SessionInfo:
+        """
+        Parsuje odpowiedź SOAP z logowania
+        
+        Args:
+            response_text: Odpowiedź SOAP z logowania
+            
+        Returns:
+            Informacje o sesji
+        """
+        return self._parse_login(response_text)[0]
+    
     def _determine_login_status(self, response_text: str) -> LoginStatus:
         """
         Określa status logowania na podstawie odpowiedzi
@@ -669,72 +570,8 @@ class EWUSClient:
             Status logowania
         """
         try:
-            root = ET.fromstring(response_text)
-            
-            # Znajdź komunikat loginReturn - używaj bezpieczne wyszukiwanie
-            login_return = None
-            
-            # Spróbuj z namespace ns1
-            try:
-                login_return = root.find(".//ns1:loginReturn", {"ns1": "http://xml.kamsoft.pl/ws/kaas/login_types"})
-                if login_return is not None:
-                    if self.debug:
-                        print("🔧 DEBUG - Znaleziono loginReturn dla statusu z ns1")
-            except Exception as e:
-                if self.debug:
-                    print(f"🔧 DEBUG - Błąd z ns1 dla status loginReturn: {e}")
-            
-            # Jeśli nie ma z ns1, spróbuj bezpośrednio
-            if login_return is None:
-                if self.debug:
-                    print("🔧 DEBUG - Szukam loginReturn dla statusu bez namespace...")
-                for elem in root.iter():
-                    if 'loginreturn' in elem.tag.lower():
-                        login_return = elem
-                        if self.debug:
-                            print(f"🔧 DEBUG - Znaleziono loginReturn dla statusu: {elem.tag}")
-                        break
-            
-            if login_return is not None and login_return.text:
-                message = login_return.text
-                if self.debug:
-                    print(f"🔧 DEBUG - Sprawdzam status z komunikatu: {message}")
-                
-                # Dekoduj HTML entities
-                try:
-                    import html
-                    message = html.unescape(message)
-                    if self.debug:
-                        print(f"🔧 DEBUG - Dekodowany komunikat: {message}")
-                except:
-                    pass
-                
-                # Sprawdź kody statusu zgodnie z dokumentacją NFZ
-                if "[000]" in message:
-                    if self.debug:
-                        print("🔧 DEBUG - Status: SUCCESS [000]")
-                    return LoginStatus.SUCCESS
-                elif "[001]" in message:
-                    if self.debug:
-                        print("🔧 DEBUG - Status: PASSWORD_EXPIRES_SOON [001]")
-                    return LoginStatus.PASSWORD_EXPIRES_SOON
-                elif "[002]" in message:
-                    if self.debug:
-                        print("🔧 DEBUG - Status: PASSWORD_EXPIRES_TOMORROW [002]")
-                    return LoginStatus.PASSWORD_EXPIRES_TOMORROW
-                elif "[003]" in message:
-                    if self.debug:
-                        print("🔧 DEBUG - Status: PASSWORD_EXPIRES_TODAY [003]")
-                    return LoginStatus.PASSWORD_EXPIRES_TODAY
-            
-            # Domyślnie sukces jeśli nie ma komunikatu o wygaśnięciu hasła
-            if self.debug:
-                print("🔧 DEBUG - Status: domyślny SUCCESS")
-            return LoginStatus.SUCCESS
-            
-        except ET.ParseError as e:
-            if self.debug:
-                print(f"🔧 DEBUG - Błąd parsowania dla statusu: {e}")
+            return self._parse_login(response_text)[1]
+        except EWUSException:
             return LoginStatus.SUCCESS
     
     def _parse_check_cwu_response(self, response_text: str, pesel: str) -> InsuranceCheckResult:
@@ -750,44 +587,35 @@ class EWUSClient:
         """
         try:
             root = ET.fromstring(response_text)
+            elements = _index_elements(root)
             
             # Sprawdź czy nie ma błędu
-            if root.find(".//soapenv:Fault", {"soapenv": "http://schemas.xmlsoap.org/soap/envelope/"}) is not None:
-                self._parse_soap_fault(response_text)
+            if TAG_SOAP_FAULT in elements:
+                self._parse_soap_fault(response_text, root)
             
             # Znajdź główny element odpowiedzi
-            response_elem = root.find(".//ewus:status_cwu_odp", {"ewus": "https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5"})
+            response_elem = elements.get(TAG_CWU_RESPONSE)
             if response_elem is None:
                 raise EWUSException("Brak elementu status_cwu_odp w odpowiedzi")
             
+            def text(tag, default=None):
+                elem = elements.get(tag)
+                return elem.text if elem is not None else default
+            
             # Podstawowe informacje o operacji
             operation_id = response_elem.get("id_operacji", str(uuid.uuid4()).replace("-", "")[:20])
-            operation_date_str = response_elem.get("data_czas_operacji")
-            
-            try:
-                operation_date = datetime.fromisoformat(operation_date_str.replace(" ", "T")) if operation_date_str else datetime.now()
-            except:
-                operation_date = datetime.now()
-            
-            # Informacje o systemie NFZ
-            system_nfz = root.find(".//ewus:system_nfz", {"ewus": "https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5"})
+            operation_date = _parse_datetime(response_elem.get("data_czas_operacji")) or datetime.now()
             
             # Status CWU
-            status_cwu_elem = root.find(".//ewus:status_cwu", {"ewus": "https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5"})
-            status_cwu = int(status_cwu_elem.text) if status_cwu_elem is not None and status_cwu_elem.text else 0
+            status_cwu = int(text(TAG_CWU_STATUS) or 0)
             
             # Dane operatora
-            operator_elem = root.find(".//ewus:id_operatora", {"ewus": "https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5"})
-            operator_id = operator_elem.text if operator_elem is not None else self.session.operator_id
-            
-            ow_elem = root.find(".//ewus:id_ow", {"ewus": "https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5"})
-            ow_code = ow_elem.text if ow_elem is not None else self.session.ow_code
-            
-            provider_elem = root.find(".//ewus:id_swiad", {"ewus": "https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5"})
-            provider_id = provider_elem.text if provider_elem is not None else None
+            operator_id = text(TAG_CWU_OPERATOR, self.session.operator_id if self.session else None)
+            ow_code = text(TAG_CWU_OW, self.session.ow_code if self.session else None)
+            provider_id = text(TAG_CWU_PROVIDER)
             
             # Status ubezpieczenia
-            status_ubezp_elem = root.find(".//ewus:status_ubezp", {"ewus": "https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5"})
+            status_ubezp_elem = elements.get(TAG_CWU_INSURANCE_STATUS)
             insurance_status_val = 0
             status_symbol = None
             
@@ -814,59 +642,38 @@ class EWUSClient:
                 is_valid = False
                 notes = ["Brak pozycji w systemie CWU"]
             
-            # Dane pacjenta
-            pesel_elem = root.find(".//ewus:numer_pesel", {"ewus": "https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5"})
-            pesel_response = pesel_elem.text if pesel_elem is not None else pesel
-            
-            first_name_elem = root.find(".//ewus:imie", {"ewus": "https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5"})
-            first_name = first_name_elem.text if first_name_elem is not None else None
-            
-            last_name_elem = root.find(".//ewus:nazwisko", {"ewus": "https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5"})
-            last_name = last_name_elem.text if last_name_elem is not None else None
-            
-            # Data ważności potwierdzenia
-            expiration_elem = root.find(".//ewus:data_waznosci_potwierdzenia", {"ewus": "https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5"})
-            expiration_date = None
-            if expiration_elem is not None and expiration_elem.text:
-                try:
-                    expiration_date = datetime.fromisoformat(expiration_elem.text.replace(" ", "T"))
-                except:
-                    pass
-            
             # Informacje dodatkowe
             additional_info = []
-            info_dodatkowe = root.find(".//ewus:informacje_dodatkowe", {"ewus": "https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5"})
+            info_dodatkowe = elements.get(TAG_CWU_ADDITIONAL_INFO)
             if info_dodatkowe is not None:
-                for info in info_dodatkowe.findall(".//ewus:informacja", {"ewus": "https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5"}):
+                for info in info_dodatkowe.iter(TAG_CWU_INFO):
                     kod = info.get("kod", "")
-                    poziom = info.get("poziom", "")
-                    wartosc = info.get("wartosc", "")
-                    
                     additional_info.append({
                         "kod": kod,
-                        "poziom": poziom,
-                        "wartosc": wartosc
+                        "poziom": info.get("poziom", ""),
+                        "wartosc": info.get("wartosc", "")
                     })
                     
                     # Dodaj informacje o specjalnych statusach do notatek
-                    if "COVID" in kod.upper():
-                        if "ZASWIADCZENIE" in kod.upper():
+                    kod = kod.upper()
+                    if "COVID" in kod:
+                        if "ZASWIADCZENIE" in kod:
                             notes.append("Posiada zaświadczenie o szczepieniu COVID-19")
-                        elif "KWARANTANNA" in kod.upper():
+                        elif "KWARANTANNA" in kod:
                             notes.append("Objęty kwarantanną COVID-19")
-                        elif "IZOLACJA" in kod.upper():
+                        elif "IZOLACJA" in kod:
                             notes.append("W izolacji domowej COVID-19")
-                    elif "UKR" in kod.upper():
+                    elif "UKR" in kod:
                         notes.append("Uprawnienia dla obywateli Ukrainy")
             
             # Utworzenie obiektu PatientInfo
             patient = PatientInfo(
-                pesel=pesel_response,
-                first_name=first_name,
-                last_name=last_name,
+                pesel=text(TAG_CWU_PESEL, pesel),
+                first_name=text(TAG_CWU_FIRST_NAME),
+                last_name=text(TAG_CWU_LAST_NAME),
                 insurance_status=insurance_status,
                 status_symbol=status_symbol,
-                expiration_date=expiration_date,
+                expiration_date=_parse_datetime(text(TAG_CWU_EXPIRATION)),
                 additional_info=additional_info if additional_info else None
             )
             
@@ -883,6 +690,8 @@ class EWUSClient:
             
         except ET.ParseError as e:
             raise EWUSException(f"Nie można sparsować odpowiedzi sprawdzania ubezpieczenia: {str(e)}")
+        except EWUSException:
+            raise
         except Exception as e:
             raise EWUSException(f"Błąd podczas parsowania odpowiedzi: {str(e)}")
     
@@ -1009,10 +818,10 @@ class EWUSClient:
             xml_request = self._create_login_xml(credentials)
             
             if self.debug:
-                print("🔧 DEBUG - Wysyłany XML:")
-                print(xml_request)
-                print("🔧 DEBUG - URL:", self.auth_url)
-                print("🔧 DEBUG - Środowisko testowe:", self.test_environment)
+                logger.debug("Wysyłany XML:")
+                logger.debug("%s", xml_request.decode('utf-8'))
+                logger.debug("URL: %s", self.auth_url)
+                logger.debug("Środowisko testowe: %s", self.test_environment)
             
             headers = {
                 'Content-Type': 'text/xml; charset=utf-8',
@@ -1020,30 +829,28 @@ class EWUSClient:
             }
             
             if self.debug:
-                print("🔧 DEBUG - Nagłówki:", headers)
+                logger.debug("Nagłówki: %s", headers)
             
             # Wysłanie żądania SOAP
-            response = requests.post(self.auth_url, data=xml_request, headers=headers, timeout=30)
+            response = transport.post(self.auth_url, xml_request, headers)
             
             if self.debug:
-                print("🔧 DEBUG - Status kod odpowiedzi:", response.status_code)
-                print("🔧 DEBUG - Nagłówki odpowiedzi:", dict(response.headers))
-                print("🔧 DEBUG - Pełna odpowiedź XML:")
-                print("=" * 80)
-                print(response.text)
-                print("=" * 80)
+                logger.debug("Status kod odpowiedzi: %s", response.status_code)
+                logger.debug("Nagłówki odpowiedzi: %s", dict(response.headers))
+                logger.debug("Pełna odpowiedź XML:")
+                logger.debug("%s", response.text)
             
             # Sprawdzenie statusu HTTP
             if response.status_code != 200:
                 if self.debug:
-                    print(f"🔧 DEBUG - BŁĄD HTTP: Status {response.status_code}")
-                    print(f"🔧 DEBUG - Treść błędu: {response.text[:500]}...")
+                    logger.debug(f"BŁĄD HTTP: Status {response.status_code}")
+                    logger.debug(f"Treść błędu: {response.text[:500]}...")
                 
                 # Sprawdź czy to błąd SOAP czy HTTP
                 if response.status_code == 500:
                     # Błąd 500 może zawierać SOAP fault
                     if self.debug:
-                        print("🔧 DEBUG - Próba parsowania SOAP fault z błędu 500...")
+                        logger.debug("Próba parsowania SOAP fault z błędu 500...")
                     self._parse_soap_fault(response.text)
                 else:
                     raise EWUSException(f"Błąd HTTP {response.status_code}: {response.text[:300]}...")
@@ -1054,68 +861,60 @@ class EWUSClient:
             
             if not response.text.strip().startswith('<?xml') and not response.text.strip().startswith('<'):
                 if self.debug:
-                    print("🔧 DEBUG - BŁĄD: Odpowiedź nie jest XML-em!")
-                    print(f"🔧 DEBUG - Pierwsze 200 znaków: {response.text[:200]}")
+                    logger.debug("BŁĄD: Odpowiedź nie jest XML-em!")
+                    logger.debug(f"Pierwsze 200 znaków: {response.text[:200]}")
                 raise EWUSException(f"Odpowiedź nie jest w formacie XML: {response.text[:200]}...")
             
             # Parsowanie odpowiedzi logowania
             if self.debug:
-                print("🔧 DEBUG - Rozpoczynam parsowanie odpowiedzi logowania...")
+                logger.debug("Rozpoczynam parsowanie odpowiedzi logowania...")
             
-            session_info = self._parse_login_response(response.text)
+            session_info, login_status = self._parse_login(response.text)
             session_info.ow_code = credentials.domain  # Ustawiamy prawdziwy kod OW
             
-            # Określenie statusu logowania
-            if self.debug:
-                print("🔧 DEBUG - Określam status logowania...")
-            
-            login_status = self._determine_login_status(response.text)
-            
             if self.debug:
-                print(f"🔧 DEBUG - Status logowania: {login_status}")
-                print(f"🔧 DEBUG - Session ID: {session_info.session_id}")
-                print(f"🔧 DEBUG - Auth Token: {session_info.auth_token}")
-                print(f"🔧 DEBUG - Operator ID: {session_info.operator_id}")
-                print(f"🔧 DEBUG - OW Code: {session_info.ow_code}")
+                logger.debug(f"Status logowania: {login_status}")
+                logger.debug(f"Session ID: {session_info.session_id}")
+                logger.debug(f"Auth Token: {session_info.auth_token}")
+                logger.debug(f"Operator ID: {session_info.operator_id}")
+                logger.debug(f"OW Code: {session_info.ow_code}")
             
             # Zapisanie sesji
             self.session = session_info
             
             if self.debug:
-                print("🔧 DEBUG - Logowanie zakończone pomyślnie!")
+                logger.debug("Logowanie zakończone pomyślnie!")
             
             return session_info, login_status
             
         except requests.exceptions.Timeout:
             error_msg = "Timeout połączenia z serwerem eWUS"
             if self.debug:
-                print(f"🔧 DEBUG - BŁĄD: {error_msg}")
+                logger.debug(f"BŁĄD: {error_msg}")
             raise EWUSException(error_msg)
             
         except requests.exceptions.ConnectionError as e:
             error_msg = f"Błąd połączenia z serwerem eWUS: {str(e)}"
             if self.debug:
-                print(f"🔧 DEBUG - BŁĄD POŁĄCZENIA: {error_msg}")
+                logger.debug(f"BŁĄD POŁĄCZENIA: {error_msg}")
             raise EWUSException(error_msg)
             
         except requests.exceptions.RequestException as e:
             error_msg = f"Błąd HTTP podczas logowania: {str(e)}"
             if self.debug:
-                print(f"🔧 DEBUG - BŁĄD HTTP: {error_msg}")
+                logger.debug(f"BŁĄD HTTP: {error_msg}")
             raise EWUSException(error_msg)
             
         except Exception as e:
             if isinstance(e, EWUSException):
                 if self.debug:
-                    print(f"🔧 DEBUG - Przekazuję wyjątek eWUS: {str(e)}")
+                    logger.debug(f"Przekazuję wyjątek eWUS: {str(e)}")
                 raise
             
             error_msg = f"Nieoczekiwany błąd podczas logowania: {str(e)}"
             if self.debug:
-                print(f"🔧 DEBUG - NIEOCZEKIWANY BŁĄD: {error_msg}")
-                import traceback
-                print("🔧 DEBUG - Stack trace:")
-                traceback.print_exc()
+                logger.debug(f"NIEOCZEKIWANY BŁĄD: {error_msg}")
+                logger.debug("Stack trace", exc_info=True)
             raise EWUSException(error_msg)
     
     def check_insurance(self, pesel: str) -> InsuranceCheckResult:
@@ -1142,9 +941,9 @@ class EWUSClient:
             xml_request = self._create_check_cwu_xml(pesel)
             
             if self.debug:
-                print("🔧 DEBUG - Wysyłany XML (check insurance):")
-                print(xml_request)
-                print("🔧 DEBUG - URL:", self.broker_url)
+                logger.debug("Wysyłany XML (check insurance):")
+                logger.debug("%s", xml_request.decode('utf-8'))
+                logger.debug("URL: %s", self.broker_url)
             
             headers = {
                 'Content-Type': 'text/xml; charset=utf-8',
@@ -1152,20 +951,16 @@ class EWUSClient:
             }
             
             if self.debug:
-                print("🔧 DEBUG - Nagłówki (check insurance):", headers)
+                logger.debug("Nagłówki (check insurance): %s", headers)
             
-            response = requests.post(self.broker_url, data=xml_request, headers=headers)
+            response = transport.post(self.broker_url, xml_request, headers, idempotent=True)
             
             if self.debug:
-                print("🔧 DEBUG - Status kod (check insurance):", response.status_code)
-                print("🔧 DEBUG - Odpowiedź (check insurance):")
-                print(response.text)
+                logger.debug("Status kod (check insurance): %s", response.status_code)
+                logger.debug("Odpowiedź (check insurance):")
+                logger.debug("%s", response.text)
             
-            if response.status_code != 200:
-                if response.status_code == 500:
-                    self._parse_soap_fault(response.text)
-                else:
-                    raise EWUSException(f"Błąd HTTP {response.status_code}: {response.text[:300]}...")
+            self._raise_for_status(response.status_code, response.text)
             
             # Parsowanie odpowiedzi z sprawdzania ubezpieczenia
             result = self._parse_check_cwu_response(response.text, pesel)
@@ -1176,6 +971,46 @@ class EWUSClient:
                 raise
             raise EWUSException(f"Błąd podczas sprawdzania ubezpieczenia: {str(e)}")
     
+    def check_insurance_many(self, pesels: Iterable[str], max_workers: int = 8,
+                             rate_limit: Optional[float] = None) -> Iterator[BulkCheckOutcome]:
+        """
+        Sprawdza ubezpieczenie wielu pacjentów równolegle w ramach jednej sesji
+        
+        Wyniki są zwracane w kolejności zakończenia, a nie w kolejności
+        numerów PESEL. Błąd dla jednego pacjenta nie przerywa pozostałych.
+        
+        Args:
+            pesels: Numery PESEL (duplikaty są sprawdzane raz)
+            max_workers: Maksymalna liczba jednoczesnych zapytań do eWUS
+            rate_limit: Maksymalna liczba zapytań na sekundę w sesji (None = bez limitu)
+            
+        Returns:
+            Iterator wyników BulkCheckOutcome
+        """
+        if not self.session:
+            raise SessionException("Brak aktywnej sesji. Zaloguj się najpierw.")
+        
+        pesels = list(dict.fromkeys(pesels))
+        limiter = RateLimiter(rate_limit) if rate_limit else None
+        
+        def check(pesel: str) -> BulkCheckOutcome:
+            if limiter:
+                limiter.wait()
+            try:
+                return BulkCheckOutcome(pesel=pesel, result=self.check_insurance(pesel))
+            except EWUSException as e:
+                return BulkCheckOutcome(pesel=pesel, error=e)
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [executor.submit(check, pesel) for pesel in pesels]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            finally:
+                # Przerwanie iteracji anuluje zapytania, które jeszcze nie wystartowały
+                for future in futures:
+                    future.cancel()
+    
     def change_password(self, credentials: LoginCredentials, 
                        old_password: str, new_password: str) -> bool:
         """
@@ -1203,26 +1038,22 @@ class EWUSClient:
             xml_request = self._create_change_password_xml(credentials, old_password, new_password)
             
             if self.debug:
-                print("🔧 DEBUG - Wysyłany XML (change password):")
-                print(xml_request)
+                logger.debug("Wysyłany XML (change password):")
+                logger.debug("%s", xml_request.decode('utf-8'))
             
             headers = {
                 'Content-Type': 'text/xml; charset=utf-8',
                 'SOAPAction': 'changePassword'
             }
             
-            response = requests.post(self.auth_url, data=xml_request, headers=headers)
+            response = transport.post(self.auth_url, xml_request, headers)
             
             if self.debug:
-                print("🔧 DEBUG - Status kod (change password):", response.status_code)
-                print("🔧 DEBUG - Odpowiedź (change password):")
-                print(response.text)
+                logger.debug("Status kod (change password): %s", response.status_code)
+                logger.debug("Odpowiedź (change password):")
+                logger.debug("%s", response.text)
             
-            if response.status_code != 200:
-                if response.status_code == 500:
-                    self._parse_soap_fault(response.text)
-                else:
-                    raise EWUSException(f"Błąd HTTP {response.status_code}: {response.text[:300]}...")
+            self._raise_for_status(response.status_code, response.text)
             
             # Sprawdź czy w odpowiedzi nie ma błędu
             try:
@@ -1260,20 +1091,20 @@ class EWUSClient:
             xml_request = self._create_logout_xml()
             
             if self.debug:
-                print("🔧 DEBUG - Wysyłany XML (logout):")
-                print(xml_request)
+                logger.debug("Wysyłany XML (logout):")
+                logger.debug("%s", xml_request.decode('utf-8'))
             
             headers = {
                 'Content-Type': 'text/xml; charset=utf-8',
                 'SOAPAction': 'logout'
             }
             
-            response = requests.post(self.auth_url, data=xml_request, headers=headers)
+            response = transport.post(self.auth_url, xml_request, headers)
             
             if self.debug:
-                print("🔧 DEBUG - Status kod (logout):", response.status_code)
-                print("🔧 DEBUG - Odpowiedź (logout):")
-                print(response.text)
+                logger.debug("Status kod (logout): %s", response.status_code)
+                logger.debug("Odpowiedź (logout):")
+                logger.debug("%s", response.text)
             
             self.session = None
             
@@ -1310,6 +1141,16 @@ class EWUSClient:
         """
         return self.session if self.is_logged_in() else None
     
+    @staticmethod
+    def get_transport_metrics() -> transport.TransportMetrics:
+        """
+        Zwraca statystyki wspólnej puli połączeń HTTP
+        
+        Returns:
+            Liczba żądań, otwartych i ponownie użytych połączeń oraz ponowień
+        """
+        return transport.get_metrics()
+    
     def get_test_pesels(self) -> Dict[str, str]:
         """
         Zwraca dostępne PESEL-e testowe
@@ -1425,7 +1266,7 @@ class EWUSClient:
             )
             
             if self.debug:
-                print(f"🔧 DEBUG - Przywrócono sesję: {self.session.session_id}")
+                logger.debug(f"Przywrócono sesję: {self.session.session_id}")
                 
         except Exception as e:
             raise SessionException(f"Błąd przywracania sesji: {str(e)}")
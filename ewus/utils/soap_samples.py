@@ -0,0 +1,139 @@
+"""
+Przykładowe odpowiedzi SOAP środowiska testowego eWUS.
+
+Struktura odpowiada odpowiedziom serwera ws-broker-server-ewus-auth-test
+(login, checkCWU w wersji 5, błąd uwierzytelnienia). Używane przez
+benchmark parsera i lokalny serwer zaślepkowy (stub_server).
+"""
+
+LOGIN_RESPONSE_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/">
+  <soapenv:Header>
+    <ns1:session xmlns:ns1="http://xml.kamsoft.pl/ws/common" id="{session_id}"/>
+    <ns1:authToken xmlns:ns1="http://xml.kamsoft.pl/ws/common" id="{auth_token}"/>
+  </soapenv:Header>
+  <soapenv:Body>
+    <ns1:loginReturn xmlns:ns1="http://xml.kamsoft.pl/ws/kaas/login_types">{message}</ns1:loginReturn>
+  </soapenv:Body>
+</soapenv:Envelope>"""
+
+LOGIN_SUCCESS_MESSAGE = "[000] Użytkownik został prawidłowo zalogowany."
+
+
+def login_response(session_id='B8C5D0A0A1E4F4C7B6F5E4D3C2B1A0F9', auth_token='sWPCBo3e0zvJ8aNLydc1k7',
+                   message=LOGIN_SUCCESS_MESSAGE):
+    """Odpowiedź na login z podanym identyfikatorem sesji i tokenem"""
+    return LOGIN_RESPONSE_TEMPLATE.format(session_id=session_id, auth_token=auth_token, message=message)
+
+
+LOGIN_RESPONSE = login_response()
+
+LOGIN_PASSWORD_EXPIRES_RESPONSE = login_response(
+    message="[001] Użytkownik został prawidłowo zalogowany. Hasło wygaśnie za 7 dni."
+)
+
+LOGOUT_RESPONSE = """<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/">
+  <soapenv:Body>
+    <ns1:logoutReturn xmlns:ns1="http://xml.kamsoft.pl/ws/kaas/login_types">Wylogowany</ns1:logoutReturn>
+  </soapenv:Body>
+</soapenv:Envelope>"""
+
+FAULT_RESPONSE_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/">
+  <soapenv:Body>
+    <soapenv:Fault>
+      <faultcode>soapenv:Server.userException</faultcode>
+      <faultstring>pl.kamsoft.ws.common.{exception}</faultstring>
+      <detail>
+        <com:{element} xmlns:com="http://xml.kamsoft.pl/ws/common">
+          <com:faultcode>Client.{exception}</com:faultcode>
+          <com:faultstring>{message}</com:faultstring>
+        </com:{element}>
+      </detail>
+    </soapenv:Fault>
+  </soapenv:Body>
+</soapenv:Envelope>"""
+
+
+def fault_response(exception, message):
+    """Błąd SOAP eWUS (HTTP 500) dla wyjątku, np. 'SessionException'"""
+    return FAULT_RESPONSE_TEMPLATE.format(
+        exception=exception,
+        element=exception[0].lower() + exception[1:],
+        message=message,
+    )
+
+
+AUTHENTICATION_FAULT_RESPONSE = fault_response('AuthenticationException', 'Nieprawidłowy login lub hasło')
+
+CHECK_CWU_RESPONSE_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/">
+  <soapenv:Header>
+    <com:session xmlns:com="http://xml.kamsoft.pl/ws/common" id="B8C5D0A0A1E4F4C7B6F5E4D3C2B1A0F9"/>
+    <com:authToken xmlns:com="http://xml.kamsoft.pl/ws/common" id="sWPCBo3e0zvJ8aNLydc1k7"/>
+  </soapenv:Header>
+  <soapenv:Body>
+    <brok:executeServiceReturn xmlns:brok="http://xml.kamsoft.pl/ws/broker">
+      <brok:location>
+        <brok:namespace>nfz.gov.pl/ws/broker/cwu</brok:namespace>
+        <brok:localname>checkCWU</brok:localname>
+        <brok:version>5.0</brok:version>
+      </brok:location>
+      <brok:date>2025-07-07T10:15:30.512+02:00</brok:date>
+      <brok:payload>
+        <brok:embedded>
+          <ewus:status_cwu_odp xmlns:ewus="https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5" data_czas_operacji="2025-07-07T10:15:30.498+02:00" id_operacji="{operation_id}">
+            <ewus:status_cwu>{status_cwu}</ewus:status_cwu>
+            <ewus:numer_pesel>{pesel}</ewus:numer_pesel>
+            <ewus:system_nfz>
+              <ewus:id_ow>15</ewus:id_ow>
+              <ewus:nazwa>Wielkopolski Oddział Wojewódzki NFZ</ewus:nazwa>
+            </ewus:system_nfz>
+            <ewus:swiad>
+              <ewus:id_swiad>123456789</ewus:id_swiad>
+              <ewus:id_operatora>TEST1</ewus:id_operatora>
+            </ewus:swiad>
+            <ewus:pacjent>
+              <ewus:data_waznosci_potwierdzenia>2025-07-07T23:59:59</ewus:data_waznosci_potwierdzenia>
+              <ewus:status_ubezp ozn_rec="DN">{status_ubezp}</ewus:status_ubezp>
+              <ewus:dane_pacjenta>
+                <ewus:imie>{first_name}</ewus:imie>
+                <ewus:nazwisko>{last_name}</ewus:nazwisko>
+              </ewus:dane_pacjenta>
+              <ewus:informacje_dodatkowe>{additional_info}</ewus:informacje_dodatkowe>
+            </ewus:pacjent>
+          </ewus:status_cwu_odp>
+        </brok:embedded>
+      </brok:payload>
+    </brok:executeServiceReturn>
+  </soapenv:Body>
+</soapenv:Envelope>"""
+
+INFO_KWARANTANNA = (
+    '<ewus:informacja kod="KWARANTANNA-COVID19" poziom="O" '
+    'wartosc="Pacjent objęty kwarantanną COVID-19"/>'
+)
+
+
+def check_cwu_response(pesel, status_cwu=1, status_ubezp=1, first_name='IMIĘTESTOWE',
+                       last_name='NAZWISKOTESTOWE', additional_info='',
+                       operation_id='L1500000000000000001'):
+    """Odpowiedź checkCWU dla podanego PESEL"""
+    return CHECK_CWU_RESPONSE_TEMPLATE.format(
+        pesel=pesel,
+        status_cwu=status_cwu,
+        status_ubezp=status_ubezp,
+        first_name=first_name,
+        last_name=last_name,
+        additional_info=additional_info,
+        operation_id=operation_id,
+    )
+
+
+CHECK_CWU_RESPONSES = {
+    'aktywny': check_cwu_response('00092497177'),
+    'nieaktywny': check_cwu_response('00092497178', status_ubezp=0),
+    'kwarantanna': check_cwu_response('00032948271', additional_info=INFO_KWARANTANNA),
+    'nieaktualny': check_cwu_response('02082642235', status_cwu=-1, status_ubezp=0),
+}
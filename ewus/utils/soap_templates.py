@@ -0,0 +1,128 @@
+"""
+Szablony żądań SOAP do eWUS.
+
+Statyczne części kopert są kodowane do bajtów (bez zbędnych białych znaków)
+raz, przy imporcie modułu. Przy każdym żądaniu wstawiane są wyłącznie
+wartości zmienne, zawsze escapowane jako tekst XML - wartość nie może
+zmienić struktury dokumentu.
+"""
+import re
+from typing import List, Tuple, Union
+from xml.sax.saxutils import escape
+
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+_XML_ENTITIES = {'"': "&quot;", "'": "&apos;"}
+_INTER_ELEMENT_WHITESPACE = re.compile(r">\s+<")
+
+
+def escape_value(value) -> bytes:
+    """Escapuje wartość do użycia w treści elementu lub atrybucie XML"""
+    if value.__class__ is not str:
+        value = str(value)
+    # Identyfikatory sesji, PESEL i daty zwykle nie wymagają escapowania
+    if "&" in value or "<" in value or ">" in value or '"' in value or "'" in value:
+        value = escape(value, _XML_ENTITIES)
+    return value.encode("utf-8")
+
+
+class SoapTemplate:
+    """
+    Szablon z polami {nazwa}, skompilowany do bajtowego formatu %s.
+    Wartości typu str są escapowane, a bytes traktowane jako gotowy
+    fragment XML (np. wynik innego szablonu).
+    """
+
+    def __init__(self, template: str):
+        self.fields: List[str] = _PLACEHOLDER.findall(template)
+        # Białe znaki między elementami nie mają znaczenia dla SOAP - koperta jest mniejsza
+        static = _INTER_ELEMENT_WHITESPACE.sub("><", template.strip()).replace("%", "%%")
+        self._format: bytes = _PLACEHOLDER.sub("%s", static).encode("utf-8")
+
+    def render(self, **values: Union[str, bytes]) -> bytes:
+        return self._format % tuple([
+            value if value.__class__ is bytes else escape_value(value)
+            for value in map(values.__getitem__, self.fields)
+        ])
+
+
+CREDENTIAL_ITEM = SoapTemplate("""
+            <auth:item>
+                <auth:name>{name}</auth:name>
+                <auth:value>
+                    <auth:stringValue>{value}</auth:stringValue>
+                </auth:value>
+            </auth:item>""")
+
+LOGIN = SoapTemplate("""<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
+                  xmlns:auth="http://xml.kamsoft.pl/ws/kaas/login_types">
+    <soapenv:Header/>
+    <soapenv:Body>
+        <auth:login>
+            <auth:credentials>{credentials}
+            </auth:credentials>
+            <auth:password>{password}</auth:password>
+        </auth:login>
+    </soapenv:Body>
+</soapenv:Envelope>""")
+
+CHECK_CWU = SoapTemplate("""<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
+                  xmlns:com="http://xml.kamsoft.pl/ws/common"
+                  xmlns:brok="http://xml.kamsoft.pl/ws/broker">
+    <soapenv:Header>
+        <com:session id="{session_id}" xmlns:ns1="http://xml.kamsoft.pl/ws/common"/>
+        <com:authToken id="{auth_token}" xmlns:ns1="http://xml.kamsoft.pl/ws/common"/>
+    </soapenv:Header>
+    <soapenv:Body>
+        <brok:executeService>
+            <com:location>
+                <com:namespace>nfz.gov.pl/ws/broker/cwu</com:namespace>
+                <com:localname>checkCWU</com:localname>
+                <com:version>5.0</com:version>
+            </com:location>
+            <brok:date>{date}</brok:date>
+            <brok:payload>
+                <brok:textload>
+                    <ewus:status_cwu_pyt xmlns:ewus="https://ewus.nfz.gov.pl/ws/broker/ewus/status_cwu/v5">
+                        <ewus:numer_pesel>{pesel}</ewus:numer_pesel>
+                        <ewus:system_swiad nazwa="eWUS-Python-Client" wersja="1.0.0"/>
+                    </ewus:status_cwu_pyt>
+                </brok:textload>
+            </brok:payload>
+        </brok:executeService>
+    </soapenv:Body>
+</soapenv:Envelope>""")
+
+LOGOUT = SoapTemplate("""<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
+                  xmlns:auth="http://xml.kamsoft.pl/ws/kaas/login_types"
+                  xmlns:com="http://xml.kamsoft.pl/ws/common">
+    <soapenv:Header/>
+    <soapenv:Body>
+        <auth:logout>
+            <com:session id="{session_id}" xmlns:ns1="http://xml.kamsoft.pl/ws/common"/>
+        </auth:logout>
+    </soapenv:Body>
+</soapenv:Envelope>""")
+
+CHANGE_PASSWORD = SoapTemplate("""<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
+                  xmlns:auth="http://xml.kamsoft.pl/ws/kaas/login_types">
+    <soapenv:Header/>
+    <soapenv:Body>
+        <auth:changePassword>
+            <auth:credentials>{credentials}
+            </auth:credentials>
+            <auth:oldPassword>{old_password}</auth:oldPassword>
+            <auth:newPassword>{new_password}</auth:newPassword>
+            <auth:newPasswordRepeat>{new_password}</auth:newPasswordRepeat>
+        </auth:changePassword>
+    </soapenv:Body>
+</soapenv:Envelope>""")
+
+
+def render_credentials(items: List[Tuple[str, str]]) -> bytes:
+    """Fragment <auth:item> dla listy par (nazwa, wartość)"""
+    return b"".join(CREDENTIAL_ITEM.render(name=name, value=value) for name, value in items)
@@ -0,0 +1,182 @@
+"""
+Lokalny serwer zaślepkowy eWUS.
+
+Obsługuje kontrakty SOAP usług Auth (login, logout) i ServiceBroker
+(checkCWU) w zakresie używanym przez EWUSClient, przez prawdziwe HTTP
+z keep-alive - pozwala mierzyć klienta, pulę połączeń i sprawdzanie
+wsadowe bez środowiska testowego NFZ:
+
+    server = EwusStubServer(config=StubConfig(latency=0.2)).start()
+    client = EWUSClient(base_url=server.url)
+    ...
+    server.stop()
+
+Opóźnienie, odsetek błędów serwera i czas życia sesji są konfigurowalne.
+"""
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from . import soap_samples
+
+
+LOGIN_REQUEST = re.compile(rb"<auth:login>")
+LOGOUT_REQUEST = re.compile(rb"<auth:logout>")
+PASSWORD = re.compile(rb"<auth:password>([^<]*)</auth:password>")
+SESSION_ID = re.compile(rb'<com:session id="([^"]*)"')
+AUTH_TOKEN = re.compile(rb'<com:authToken id="([^"]*)"')
+PESEL = re.compile(rb"<ewus:numer_pesel>(\d+)</ewus:numer_pesel>")
+PESEL_IN_RESPONSE = re.compile(r"<ewus:numer_pesel>(\d+)</ewus:numer_pesel>")
+
+RESPONSES_BY_PESEL = {
+    PESEL_IN_RESPONSE.search(response).group(1): response
+    for response in soap_samples.CHECK_CWU_RESPONSES.values()
+}
+
+
+@dataclass
+class StubConfig:
+    """Zachowanie serwera zaślepkowego"""
+    latency: float = 0.0  # stałe opóźnienie odpowiedzi w sekundach
+    jitter: float = 0.0  # losowe opóźnienie dodatkowe 0..jitter sekund
+    fault_rate: float = 0.0  # odsetek zapytań checkCWU kończonych ServerException
+    session_ttl: float = 8 * 60 * 60  # czas życia sesji w sekundach
+    password: Optional[str] = None  # jeśli ustawione - inne hasła dają AuthenticationException
+
+
+class EwusStubServer(ThreadingHTTPServer):
+    """Wielowątkowy serwer HTTP udający usługi eWUS"""
+    daemon_threads = True
+    # Domyślna kolejka (5) gubi połączenia przy większej współbieżności klienta
+    request_queue_size = 128
+
+    def __init__(self, address=('127.0.0.1', 0), config: StubConfig = None):
+        super().__init__(address, StubRequestHandler)
+        self.config = config or StubConfig()
+        self.stats = Counter()
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/ws-broker-server-ewus-auth-test"
+
+    def start(self) -> 'EwusStubServer':
+        """Uruchamia serwer w wątku w tle"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def open_session(self):
+        session_id = uuid.uuid4().hex.upper()
+        auth_token = uuid.uuid4().hex[:22]
+        with self._lock:
+            self._sessions[session_id] = (auth_token, time.monotonic() + self.config.session_ttl)
+        return session_id, auth_token
+
+    def close_session(self, session_id) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def session_error(self, session_id, auth_token) -> Optional[str]:
+        """Treść błędu SOAP dla nieprawidłowej sesji albo None"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None or session[1] < time.monotonic():
+            return soap_samples.fault_response('SessionException', 'Sesja wygasła lub nie istnieje')
+        if session[0] != auth_token:
+            return soap_samples.fault_response('AuthTokenException', 'Nieprawidłowy token autoryzacyjny')
+        return None
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 - połączenia pozostają otwarte, jak w prawdziwej usłudze
+    protocol_version = 'HTTP/1.1'
+    # Nagłówki i treść idą osobnymi zapisami - bez tego Nagle dokłada ~40 ms
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        config = self.server.config
+        delay = config.latency + (random.uniform(0, config.jitter) if config.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if self.path.endswith('/services/Auth'):
+            status, text = self._auth(body)
+        elif self.path.endswith('/services/ServiceBroker'):
+            status, text = self._broker(body)
+        else:
+            status, text = 404, ''
+
+        payload = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _auth(self, body):
+        server = self.server
+        if LOGIN_REQUEST.search(body):
+            server.count('login')
+            password = PASSWORD.search(body)
+            expected = server.config.password
+            if expected is not None and (password is None or password.group(1).decode() != expected):
+                server.count('login_fault')
+                return 500, soap_samples.AUTHENTICATION_FAULT_RESPONSE
+            session_id, auth_token = server.open_session()
+            return 200, soap_samples.login_response(session_id, auth_token)
+
+        if LOGOUT_REQUEST.search(body):
+            server.count('logout')
+            session_id = SESSION_ID.search(body)
+            if session_id:
+                server.close_session(session_id.group(1).decode())
+            return 200, soap_samples.LOGOUT_RESPONSE
+
+        return 500, soap_samples.fault_response('InputException', 'Nieobsługiwana operacja')
+
+    def _broker(self, body):
+        server = self.server
+        server.count('check_cwu')
+        session_id = SESSION_ID.search(body)
+        auth_token = AUTH_TOKEN.search(body)
+        error = server.session_error(
+            session_id.group(1).decode() if session_id else None,
+            auth_token.group(1).decode() if auth_token else None,
+        )
+        if error is not None:
+            server.count('session_fault')
+            return 500, error
+
+        if server.config.fault_rate and random.random() < server.config.fault_rate:
+            server.count('server_fault')
+            return 500, soap_samples.fault_response('ServerException', 'Błąd wewnętrzny serwera')
+
+        pesel = PESEL.search(body)
+        if pesel is None:
+            return 500, soap_samples.fault_response('InputException', 'Brak numeru PESEL')
+        pesel = pesel.group(1).decode()
+        # PESEL-e z przykładów mają swoje odpowiedzi, pozostali pacjenci są ubezpieczeni
+        response = RESPONSES_BY_PESEL.get(pesel)
+        return 200, response if response is not None else soap_samples.check_cwu_response(pesel)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,146 @@
+"""
+Wspólna pula połączeń HTTP do serwerów eWUS.
+
+Wszystkie instancje EWUSClient w procesie korzystają z jednej sesji
+requests (keep-alive), dzięki czemu kolejne wywołania SOAP nie otwierają
+za każdym razem nowego połączenia TCP + TLS.
+"""
+import threading
+import time
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+POOL_CONNECTIONS = 4  # liczba hostów (auth, broker)
+POOL_MAXSIZE = 20  # połączeń na host
+CONNECT_RETRIES = 2
+IDEMPOTENT_RETRIES = 2
+BACKOFF_FACTOR = 0.3
+RETRY_STATUSES = (502, 503, 504)
+
+
+@dataclass
+class TransportMetrics:
+    """Statystyki puli połączeń"""
+    requests: int = 0
+    connections_opened: int = 0
+    retries: int = 0
+
+    @property
+    def connections_reused(self) -> int:
+        return max(self.requests - self.connections_opened, 0)
+
+    @property
+    def reuse_ratio(self) -> float:
+        return self.connections_reused / self.requests if self.requests else 0.0
+
+
+_session = None
+_session_lock = threading.Lock()
+_retries = 0
+_retries_lock = threading.Lock()
+
+
+def _create_session() -> requests.Session:
+    # Na poziomie puli ponawiamy tylko błędy nawiązania połączenia -
+    # żądanie nie zostało wtedy wysłane, więc jest to bezpieczne dla każdej operacji
+    retry = Retry(
+        total=None,
+        connect=CONNECT_RETRIES,
+        read=0,
+        status=0,
+        other=0,
+        redirect=0,
+        backoff_factor=BACKOFF_FACTOR,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        pool_block=False,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Zwraca wspólną dla procesu sesję HTTP"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+    return _session
+
+
+def close_session() -> None:
+    """Zamyka pulę połączeń (np. przy zamykaniu procesu lub w testach)"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def post(url: str, data, headers: dict, idempotent: bool = False,
+         timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)) -> requests.Response:
+    """
+    Wysyła żądanie POST przez wspólną pulę połączeń
+
+    Args:
+        url: Adres usługi
+        data: Treść żądania
+        headers: Nagłówki HTTP
+        idempotent: Czy operację można bezpiecznie powtórzyć po przekroczeniu
+            czasu odczytu lub błędzie 502/503/504 (np. sprawdzenie ubezpieczenia)
+        timeout: Krotka (timeout połączenia, timeout odczytu) w sekundach
+
+    Returns:
+        Odpowiedź HTTP
+    """
+    global _retries
+    session = get_session()
+    attempts = 1 + (IDEMPOTENT_RETRIES if idempotent else 0)
+
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+        try:
+            response = session.post(url, data=data, headers=headers, timeout=timeout)
+        except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError):
+            if last_attempt:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+
+        with _retries_lock:
+            _retries += 1
+        time.sleep(BACKOFF_FACTOR * (2 ** attempt))
+
+
+def get_metrics() -> TransportMetrics:
+    """Liczba żądań i nowo otwartych połączeń w puli (reszta to połączenia ponownie użyte)"""
+    metrics = TransportMetrics(retries=_retries)
+    session = _session
+    if session is None:
+        return metrics
+
+    # Ten sam adapter jest zamontowany dla http:// i https://
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            metrics.requests += pool.num_requests
+            metrics.connections_opened += pool.num_connections
+    return metrics
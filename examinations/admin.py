@@ -1,6 +1,8 @@
 # examinations/admin.py
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.html import format_html
+from patients.admin import CustomPatientSearchMixin, prefetch_patients
 from .models import ExaminationType, Examination, Measurement
 
 
@@ -11,13 +13,20 @@ class ExaminationTypeAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description']
     list_editable = ['requires_referral', 'is_active']
     
+    def get_queryset(self, request):
+        """Liczba badań policzona w zapytaniu listy zamiast COUNT dla każdego wiersza"""
+        return super().get_queryset(request).annotate(_examination_count=Count('examinations'))
+    
     def examination_count(self, obj):
-        return obj.examinations.count()
+        return obj._examination_count
     examination_count.short_description = 'Liczba badań'
+    examination_count.admin_order_field = '_examination_count'
 
 
 @admin.register(Examination)
-class ExaminationAdmin(admin.ModelAdmin):
+class ExaminationAdmin(CustomPatientSearchMixin, admin.ModelAdmin):
+    patient_lookup = 'visit_card__patient'
+    
     list_display = [
         'id',
         'get_patient_name',
@@ -36,10 +45,11 @@ class ExaminationAdmin(admin.ModelAdmin):
         'completed_date'
     ]
     
+    # Pacjent ładowany przez prefetch_patients - JOIN odszyfrowywałby go wiersz po wierszu
+    list_select_related = ['visit_card', 'examination_type', 'performed_by']
+    
+    # Imię, nazwisko i PESEL pacjenta wyszukuje CustomPatientSearchMixin
     search_fields = [
-        'visit_card__patient__pesel_search',
-        'visit_card__patient__first_name_search',
-        'visit_card__patient__last_name_search',
         'examination_type__name'
     ]
     
@@ -90,6 +100,9 @@ class ExaminationAdmin(admin.ModelAdmin):
         })
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(prefetch_patients('visit_card__patient'))
+    
     def get_patient_name(self, obj):
         return obj.visit_card.patient.get_decrypted_full_name()
     get_patient_name.short_description = 'Pacjent'
@@ -132,7 +145,9 @@ class ExaminationAdmin(admin.ModelAdmin):
 
 
 @admin.register(Measurement)
-class MeasurementAdmin(admin.ModelAdmin):
+class MeasurementAdmin(CustomPatientSearchMixin, admin.ModelAdmin):
+    patient_lookup = 'visit_card__patient'
+    
     list_display = [
         'id',
         'get_patient_name',
@@ -150,10 +165,12 @@ class MeasurementAdmin(admin.ModelAdmin):
         'measured_by'
     ]
     
+    # Pacjent ładowany przez prefetch_patients - JOIN odszyfrowywałby go wiersz po wierszu
+    list_select_related = ['visit_card', 'measured_by']
+    
+    # Imię, nazwisko i PESEL pacjenta wyszukuje CustomPatientSearchMixin
     search_fields = [
-        'visit_card__patient__pesel_search',
-        'visit_card__patient__first_name_search',
-        'visit_card__patient__last_name_search'
+        'visit_card__patient__email'
     ]
     
     readonly_fields = [
@@ -204,6 +221,9 @@ class MeasurementAdmin(admin.ModelAdmin):
         })
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(prefetch_patients('visit_card__patient'))
+    
     def get_patient_name(self, obj):
         return obj.visit_card.patient.get_decrypted_full_name()
     get_patient_name.short_description = 'Pacjent'
@@ -1,5 +1,5 @@
 # examinations/models.py
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -301,6 +301,11 @@ class Measurement(models.Model):
     def __str__(self):
         return f"Pomiary {self.visit_card.patient.get_decrypted_full_name()} - {self.measurement_date}"
     
+    def save(self, *args, **kwargs):
+        # Zapis pomiaru i przeliczenie aktywności pacjenta (patients/signals.py) w jednej transakcji
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     @property
     def blood_pressure_display(self):
         """Wyświetla ciśnienie w formacie 120/80"""
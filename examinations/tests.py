@@ -1,3 +1,53 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django_tenants.test.cases import TenantTestCase
+
+from patients.tests import AdminQueryCountMixin, create_patients
+from visits.models import VisitCard, VisitType
+from .models import Examination, ExaminationType, Measurement
+
+
+class ExaminationAdminQueryCountTests(AdminQueryCountMixin, TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.visit_type = VisitType.objects.create(name='Profilaktyka 40+')
+        self.examination_type = ExaminationType.objects.create(name='Morfologia')
+        self.created = 0
+
+    def add_visit_cards(self, count):
+        cards = [
+            VisitCard.objects.create(patient=patient, visit_type=self.visit_type)
+            for patient in create_patients(count, start=self.created)
+        ]
+        self.created += count
+        return cards
+
+    def add_examination_types(self, count):
+        for card in self.add_visit_cards(count):
+            examination_type = ExaminationType.objects.create(name=f'Badanie {card.pk}')
+            Examination.objects.create(visit_card=card, examination_type=examination_type)
+
+    def add_examinations(self, count):
+        for card in self.add_visit_cards(count):
+            Examination.objects.create(
+                visit_card=card, examination_type=self.examination_type, performed_by=self.admin_user
+            )
+
+    def add_measurements(self, count):
+        for card in self.add_visit_cards(count):
+            Measurement.objects.create(
+                visit_card=card,
+                measurement_date=date(2025, 1, 1),
+                blood_pressure_systolic=120 + card.pk,
+                blood_pressure_diastolic=80,
+                measured_by=self.admin_user,
+            )
+
+    def test_examination_type_changelist(self):
+        self.assertChangelistQueries(ExaminationType, 3, self.add_examination_types)
+
+    def test_examination_changelist(self):
+        self.assertChangelistQueries(Examination, 5, self.add_examinations)
+
+    def test_measurement_changelist(self):
+        self.assertChangelistQueries(Measurement, 6, self.add_measurements)
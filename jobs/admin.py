@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['id', 'created_at', 'started_at', 'finished_at']
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+    verbose_name = 'Zadania w tle'
+
+    def ready(self):
+        # Rejestracja zadań z modułów <aplikacja>/jobs.py
+        autodiscover_modules('jobs')
@@ -0,0 +1,92 @@
+from django.core.management.base import BaseCommand
+from django.db import connection as db_connection
+from django_tenants.utils import connection, get_public_schema_name
+from jobs import queue
+from jobs.models import Job
+from tenants.models import Tenant
+import time
+
+
+class Command(BaseCommand):
+    help = 'Worker kolejki zadań w tle - przetwarza zadania jednego lub wszystkich tenantów'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tenant_schema',
+            type=str,
+            nargs='?',
+            help='Schema name tenanta (domyślnie: wszyscy tenanci)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Wykonaj gotowe zadania i zakończ (np. z crona)'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Przerwa między przeglądami pustej kolejki w sekundach (domyślnie: 2)'
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=20,
+            help='Maksymalna liczba zadań jednego tenanta w jednym przebiegu (domyślnie: 20)'
+        )
+
+    def handle(self, *args, **options):
+        tenant_schema = options['tenant_schema']
+
+        if tenant_schema:
+            tenants = Tenant.objects.filter(schema_name=tenant_schema)
+            if not tenants.exists():
+                self.stdout.write(
+                    self.style.ERROR(f'Tenant "{tenant_schema}" nie istnieje!')
+                )
+                return
+        else:
+            tenants = Tenant.objects.exclude(schema_name=get_public_schema_name())
+
+        self.stdout.write(self.style.SUCCESS('🏥 Worker zadań uruchomiony'))
+
+        try:
+            while True:
+                processed = 0
+                for tenant in list(tenants):
+                    processed += self._process_tenant(tenant, options['batch'])
+
+                if options['once']:
+                    break
+                if not processed:
+                    # Nie trzymamy otwartego połączenia podczas bezczynności
+                    db_connection.close()
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('⚠️ Worker zatrzymany'))
+
+    def _process_tenant(self, tenant, batch):
+        connection.set_tenant(tenant)
+
+        requeued = queue.requeue_stale()
+        if requeued:
+            self.stdout.write(
+                self.style.WARNING(f'⚠️ [{tenant.schema_name}] Przywrócono {requeued} porzuconych zadań')
+            )
+
+        jobs = queue.run_pending(limit=batch)
+        for job in jobs:
+            if job.status == Job.DONE:
+                self.stdout.write(f'✅ [{tenant.schema_name}] {job.name} ({job.pk})')
+            elif job.status == Job.PENDING:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f'⏳ [{tenant.schema_name}] {job.name} ({job.pk}) - próba {job.attempts}/{job.max_attempts} '
+                        f'nieudana, ponowienie o {job.run_at:%H:%M:%S}: {job.error}'
+                    )
+                )
+            else:
+                self.stdout.write(
+                    self.style.ERROR(f'❌ [{tenant.schema_name}] {job.name} ({job.pk}): {job.error}')
+                )
+        return len(jobs)
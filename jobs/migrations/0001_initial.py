@@ -0,0 +1,44 @@
+# Generated by Django 5.2.3 on 2026-10-17 03:43
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, verbose_name='Zadanie')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Parametry')),
+                ('status', models.CharField(choices=[('pending', 'Oczekuje'), ('running', 'W trakcie'), ('done', 'Zakończone'), ('failed', 'Błąd')], default='pending', max_length=10, verbose_name='Status')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Wynik')),
+                ('error', models.TextField(blank=True, verbose_name='Ostatni błąd')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Liczba prób')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='Maksymalna liczba prób')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Uruchom po')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data utworzenia')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Rozpoczęto')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Zakończono')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to=settings.AUTH_USER_MODEL, verbose_name='Zlecił')),
+            ],
+            options={
+                'verbose_name': 'Zadanie w tle',
+                'verbose_name_plural': 'Zadania w tle',
+                'db_table': 'tenant_schema_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['run_at'], name='tenant_sche_jobs_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+from django.db import models
+from django.utils import timezone
+from users.models import User
+import uuid
+
+
+class Job(models.Model):
+    """
+    Zadanie do wykonania w tle przez worker (manage.py run_jobs).
+    Tabela jest w schemacie tenanta - worker przetwarza kolejkę każdego tenanta osobno.
+    """
+    
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    
+    STATUS_CHOICES = [
+        (PENDING, 'Oczekuje'),
+        (RUNNING, 'W trakcie'),
+        (DONE, 'Zakończone'),
+        (FAILED, 'Błąd'),
+    ]
+    
+    # UUID - identyfikator trafia do adresu odpytywanego przez htmx
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=100, verbose_name='Zadanie')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Parametry')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name='Status'
+    )
+    result = models.JSONField(null=True, blank=True, verbose_name='Wynik')
+    error = models.TextField(blank=True, verbose_name='Ostatni błąd')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Liczba prób')
+    max_attempts = models.PositiveSmallIntegerField(default=3, verbose_name='Maksymalna liczba prób')
+    run_at = models.DateTimeField(default=timezone.now, verbose_name='Uruchom po')
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name='Zlecił'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Data utworzenia')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Rozpoczęto')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Zakończono')
+    # Odświeżany przez zadanie w trakcie pracy (queue.heartbeat) - brak sygnału oznacza porzucenie
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name='Ostatni sygnał')
+    
+    class Meta:
+        db_table = 'tenant_schema_jobs'
+        verbose_name = 'Zadanie w tle'
+        verbose_name_plural = 'Zadania w tle'
+        ordering = ['-created_at']
+        indexes = [
+            # Worker szuka tylko oczekujących zadań - indeks częściowy pozostaje mały
+            models.Index(
+                fields=['run_at'],
+                name='tenant_sche_jobs_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+    
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
@@ -0,0 +1,154 @@
+"""
+Kolejka zadań w tle oparta na tabeli Job w schemacie tenanta.
+
+Widok zleca zadanie (enqueue) i od razu odpowiada - stan zadania odpytuje
+htmx. Worker (manage.py run_jobs) pobiera zadania przez
+SELECT ... FOR UPDATE SKIP LOCKED, więc kilka workerów może obsługiwać tę
+samą kolejkę bez podwójnego wykonania. Nieudane zadanie wraca do kolejki
+z wykładniczo rosnącym opóźnieniem, aż do wyczerpania max_attempts.
+Długie zadania co paczkę wywołują heartbeat(job) - zadanie "w trakcie" bez
+sygnału przez JOBS_STALE_TIMEOUT uznaje się za porzucone przez worker.
+
+Zadania rejestruje się dekoratorem @task w modułach <aplikacja>/jobs.py.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Job
+
+
+_registry = {}
+
+
+class UnknownTaskError(Exception):
+    """Zadanie o tej nazwie nie zostało zarejestrowane"""
+
+
+def task(name, max_attempts=3, bind=False):
+    """
+    Rejestruje funkcję jako zadanie w tle
+
+    Funkcja otrzymuje payload jako argumenty nazwane, a jej wynik
+    (serializowalny do JSON) jest zapisywany w Job.result. Przy bind=True
+    pierwszym argumentem jest wykonywany Job (np. do nazwania punktu
+    kontrolnego wznawianego przy kolejnej próbie).
+    """
+    def decorator(func):
+        func.task_name = name
+        func.max_attempts = max_attempts
+        func.bind = bind
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise UnknownTaskError(f"Nieznane zadanie: {name}")
+
+
+def enqueue(name, payload=None, user=None, run_at=None):
+    """Dodaje zadanie do kolejki bieżącego tenanta"""
+    func = get_task(name)
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        max_attempts=func.max_attempts,
+        run_at=run_at or timezone.now(),
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def claim():
+    """Pobiera i oznacza jako wykonywane najstarsze gotowe zadanie (albo None)"""
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=Job.PENDING, run_at__lte=now)
+            .order_by('run_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.started_at = now
+        job.heartbeat_at = now
+        job.save(update_fields=['status', 'attempts', 'started_at', 'heartbeat_at'])
+    return job
+
+
+def heartbeat(job):
+    """Potwierdza, że wykonywane zadanie wciąż pracuje (wywoływane np. po każdej paczce)"""
+    job.heartbeat_at = timezone.now()
+    Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(heartbeat_at=job.heartbeat_at)
+
+
+def run(job):
+    """Wykonuje pobrane zadanie i zapisuje wynik albo błąd"""
+    try:
+        func = get_task(job.name)
+        args = (job,) if func.bind else ()
+        result = func(*args, **job.payload)
+    except Exception as e:
+        job.error = f"{e.__class__.__name__}: {e}"
+        if job.attempts < job.max_attempts and not isinstance(e, UnknownTaskError):
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + get_retry_delay(job.attempts)
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'run_at', 'finished_at'])
+        return job
+
+    job.status = Job.DONE
+    job.result = result
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'finished_at'])
+    return job
+
+
+def run_pending(limit=None):
+    """Wykonuje gotowe zadania bieżącego tenanta; zwraca listę wykonanych"""
+    processed = []
+    while limit is None or len(processed) < limit:
+        job = claim()
+        if job is None:
+            break
+        processed.append(run(job))
+    return processed
+
+
+def requeue_stale():
+    """
+    Przywraca do kolejki zadania porzucone przez worker (np. po restarcie)
+
+    Porzucone jest zadanie "w trakcie", które od JOBS_STALE_TIMEOUT sekund nie
+    dało sygnału życia - czas trwania długiego zadania nie ma znaczenia.
+    """
+    now = timezone.now()
+    stale = Job.objects.annotate(
+        last_seen=Coalesce('heartbeat_at', 'started_at')
+    ).filter(
+        status=Job.RUNNING,
+        last_seen__lt=now - timedelta(seconds=getattr(settings, 'JOBS_STALE_TIMEOUT', 600))
+    )
+    stale.filter(attempts__gte=models.F('max_attempts')).update(
+        status=Job.FAILED,
+        error='Przekroczono czas wykonania',
+        finished_at=now,
+    )
+    return stale.update(status=Job.PENDING, run_at=now)
+
+
+def get_retry_delay(attempts):
+    """Opóźnienie kolejnej próby: JOBS_RETRY_BACKOFF * 2^(próba - 1)"""
+    return timedelta(seconds=getattr(settings, 'JOBS_RETRY_BACKOFF', 10) * 2 ** (attempts - 1))
@@ -0,0 +1,181 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+
+from . import queue
+from .models import Job
+from .views import job_status
+
+
+@queue.task('tests.add')
+def add(a, b):
+    return {'sum': a + b}
+
+
+@queue.task('tests.bound', bind=True)
+def bound(job, value):
+    return {'job': str(job.pk), 'attempts': job.attempts, 'value': value}
+
+
+@queue.task('tests.fail', max_attempts=2)
+def fail():
+    raise ValueError('błąd testowy')
+
+
+@override_settings(JOBS_RETRY_BACKOFF=10, JOBS_STALE_TIMEOUT=600)
+class JobQueueTests(TenantTestCase):
+
+    def test_enqueue_claim_run(self):
+        job = queue.enqueue('tests.add', {'a': 2, 'b': 3})
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(job.max_attempts, 3)
+
+        claimed = queue.claim()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, Job.RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNotNone(claimed.started_at)
+        # Zadanie w trakcie nie jest pobierane drugi raz
+        self.assertIsNone(queue.claim())
+
+        queue.run(claimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.result, {'sum': 5})
+        self.assertIsNotNone(job.finished_at)
+
+    def test_bound_task_receives_job(self):
+        job = queue.enqueue('tests.bound', {'value': 1})
+        queue.run(queue.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.result, {'job': str(job.pk), 'attempts': 1, 'value': 1})
+
+    def test_enqueue_unknown_task(self):
+        with self.assertRaises(queue.UnknownTaskError):
+            queue.enqueue('tests.missing')
+
+    def test_claim_skips_future_jobs(self):
+        queue.enqueue('tests.add', {'a': 1, 'b': 1}, run_at=timezone.now() + timedelta(minutes=5))
+        self.assertIsNone(queue.claim())
+
+    def test_retry_with_backoff_then_failed(self):
+        job = queue.enqueue('tests.fail')
+
+        before = timezone.now()
+        queue.run(queue.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.error, 'ValueError: błąd testowy')
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=10))
+        # Ponowna próba dopiero po upływie opóźnienia
+        self.assertIsNone(queue.claim())
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        queue.run(queue.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_unknown_task_fails_without_retry(self):
+        job = Job.objects.create(name='tests.missing')
+        queue.run(queue.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 1)
+
+    def test_retry_delay_doubles(self):
+        self.assertEqual(queue.get_retry_delay(1), timedelta(seconds=10))
+        self.assertEqual(queue.get_retry_delay(3), timedelta(seconds=40))
+
+    def test_requeue_stale(self):
+        long_ago = timezone.now() - timedelta(seconds=601)
+        stale = Job.objects.create(
+            name='tests.add', status=Job.RUNNING, attempts=1, max_attempts=3, started_at=long_ago
+        )
+        exhausted = Job.objects.create(
+            name='tests.add', status=Job.RUNNING, attempts=3, max_attempts=3, started_at=long_ago
+        )
+        running = Job.objects.create(
+            name='tests.add', status=Job.RUNNING, attempts=1, max_attempts=3, started_at=timezone.now()
+        )
+        # Długie zadanie, które wciąż daje sygnał życia
+        long_running = Job.objects.create(
+            name='tests.add', status=Job.RUNNING, attempts=1, max_attempts=3,
+            started_at=long_ago, heartbeat_at=timezone.now()
+        )
+        silent = Job.objects.create(
+            name='tests.add', status=Job.RUNNING, attempts=1, max_attempts=3,
+            started_at=long_ago, heartbeat_at=long_ago
+        )
+
+        self.assertEqual(queue.requeue_stale(), 2)
+
+        for job in (stale, exhausted, running, long_running, silent):
+            job.refresh_from_db()
+        self.assertEqual(stale.status, Job.PENDING)
+        self.assertEqual(exhausted.status, Job.FAILED)
+        self.assertIsNotNone(exhausted.finished_at)
+        self.assertEqual(running.status, Job.RUNNING)
+        self.assertEqual(long_running.status, Job.RUNNING)
+        self.assertEqual(silent.status, Job.PENDING)
+
+    def test_heartbeat_keeps_long_job_running(self):
+        job = queue.enqueue('tests.add', {'a': 1, 'b': 1})
+        claimed = queue.claim()
+        self.assertEqual(claimed.heartbeat_at, claimed.started_at)
+        long_ago = timezone.now() - timedelta(seconds=601)
+        Job.objects.filter(pk=job.pk).update(started_at=long_ago, heartbeat_at=long_ago)
+
+        queue.heartbeat(claimed)
+
+        self.assertEqual(queue.requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertEqual(job.heartbeat_at, claimed.heartbeat_at)
+
+    def test_run_pending_limit(self):
+        for i in range(3):
+            queue.enqueue('tests.add', {'a': i, 'b': 0})
+        self.assertEqual(len(queue.run_pending(limit=2)), 2)
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+
+
+class JobStatusViewTests(TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='x')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='x')
+        self.staff = User.objects.create_user(
+            username='staff', email='staff@example.com', password='x', is_staff=True
+        )
+        self.job = queue.enqueue('tests.add', {'a': 1, 'b': 2}, user=self.owner)
+
+    def get_status(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        request.htmx = True
+        request.tenant = self.tenant
+        return job_status(request, pk=self.job.pk)
+
+    def test_owner_sees_job(self):
+        self.assertEqual(self.job.created_by, self.owner)
+        self.assertEqual(self.get_status(self.owner).status_code, 200)
+
+    def test_staff_sees_job(self):
+        self.assertEqual(self.get_status(self.staff).status_code, 200)
+
+    def test_other_user_gets_404(self):
+        with self.assertRaises(Http404):
+            self.get_status(self.other)
+
+    def test_anonymous_redirected_to_login(self):
+        self.assertEqual(self.get_status(AnonymousUser()).status_code, 302)
@@ -0,0 +1,15 @@
+from django.contrib.auth.decorators import login_required
+from django.http import Http404
+from django.shortcuts import get_object_or_404, render
+from .models import Job
+
+
+@login_required
+def job_status(request, pk):
+    """Stan zadania - pełna strona albo fragment odpytywany przez htmx do zakończenia"""
+    job = get_object_or_404(Job, pk=pk)
+    if job.created_by_id != request.user.id and not request.user.is_staff:
+        raise Http404
+    
+    template = 'jobs/job_status.html' if request.htmx else 'jobs/job_detail.html'
+    return render(request, template, {'job': job})
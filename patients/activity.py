@@ -0,0 +1,114 @@
+"""
+Zdenormalizowana aktywność pacjenta: kolumny na Patient liczone z kart
+wizyt i pomiarów.
+
+- last_visit_at - data utworzenia najnowszej karty wizyty,
+- open_40plus_card - najnowsza otwarta karta 40+ (patrz patients.eligibility),
+- active_visit_count - liczba aktywnych kart (nieanulowanych, niezakończonych),
+- last_measurement_date - data ostatniego pomiaru.
+
+Listy i pulpity filtrują i sortują po tych kolumnach bez złączeń
+z visit_cards. Kolumny są przeliczane jednym UPDATE z podzapytaniami
+dla pacjentów, których dotyczy zmiana - sygnały zapisu i usunięcia
+VisitCard i Measurement (patients/signals.py) robią to w transakcji
+zmiany. Operacje omijające sygnały (bulk_create, update() na querysecie)
+wyrównuje komenda rebuild_patient_activity.
+
+Kolumny mają editable=False (poza formularzami i adminem). patient.save()
+zapisuje je jak każde inne pole, a potem w tej samej transakcji przelicza
+je od nowa (Patient.refresh_activity) - zapis nieaktualnej instancji nie
+cofa ich do starych wartości.
+"""
+import time
+
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+
+from .eligibility import CLOSED_STATUSES, VISIT_TYPE_40PLUS
+from .results import BatchResult
+
+
+def activity_values(visit_card_model, measurement_model):
+    """
+    Wyrażenia kolumn aktywności względem OuterRef('pk') pacjenta
+
+    Modele przekazywane są jawnie, żeby te same wyrażenia działały
+    w migracji (modele historyczne).
+    """
+    cards = visit_card_model.objects.filter(patient=models.OuterRef('pk'))
+    active_cards = cards.filter(is_cancelled=False).exclude(visit_status__in=CLOSED_STATUSES)
+
+    return {
+        'last_visit_at': models.Subquery(
+            cards.order_by('-created_at').values('created_at')[:1]
+        ),
+        'open_40plus_card': models.Subquery(
+            active_cards.filter(visit_type__name=VISIT_TYPE_40PLUS)
+            .order_by('-created_at', '-pk').values('pk')[:1]
+        ),
+        'active_visit_count': Coalesce(
+            models.Subquery(
+                active_cards.order_by().values('patient')
+                .annotate(count=models.Count('pk')).values('count')
+            ),
+            0
+        ),
+        'last_measurement_date': models.Subquery(
+            measurement_model.objects.filter(visit_card__patient=models.OuterRef('pk'))
+            .order_by('-measurement_date').values('measurement_date')[:1]
+        ),
+    }
+
+
+def refresh(patient_ids):
+    """
+    Przelicza kolumny aktywności wskazanych pacjentów jednym zapytaniem
+
+    Args:
+        patient_ids: ID pacjentów - lista albo queryset wartości (podzapytanie)
+    """
+    from examinations.models import Measurement
+    from visits.models import VisitCard
+    from .models import Patient
+
+    return Patient.objects.filter(pk__in=patient_ids).update(
+        **activity_values(VisitCard, Measurement)
+    )
+
+
+def rebuild(chunk_size=5000, progress=None):
+    """
+    Przelicza kolumny aktywności wszystkich pacjentów bieżącego tenanta
+
+    Pacjenci przetwarzani są zakresami ID po `chunk_size`, każdy zakres
+    w osobnej transakcji - bez jednej długiej transakcji blokującej tabelę.
+
+    Args:
+        chunk_size: Liczba pacjentów w jednym UPDATE
+        progress: Opcjonalna funkcja wywoływana z BatchResult po każdej paczce
+
+    Returns:
+        BatchResult
+    """
+    from .models import Patient
+
+    result = BatchResult()
+    start = time.perf_counter()
+    last_pk = 0
+
+    while True:
+        ids = list(
+            Patient.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            refresh(ids)
+        last_pk = ids[-1]
+        result.processed += len(ids)
+        result.elapsed = time.perf_counter() - start
+        if progress:
+            progress(result)
+
+    result.elapsed = time.perf_counter() - start
+    return result
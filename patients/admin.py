@@ -1,10 +1,15 @@
 
 from django.contrib import admin
-from django.core.exceptions import ValidationError
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from django.utils.html import format_html
 from django.db import models
 from django import forms
 from .models import Patient, ProgramParticipationHistory
+from . import bulk_import
+from jobs.queue import enqueue
 
 
 class PatientAdminForm(forms.ModelForm):
@@ -64,61 +69,60 @@ class PatientAdminForm(forms.ModelForm):
         return cleaned_data
 
 
+class PatientImportForm(forms.Form):
+    """Formularz przesłania pliku importu pacjentów"""
+    
+    file = forms.FileField(
+        label='Plik CSV lub XLSX',
+        help_text='Kolumny: pesel, imie, nazwisko oraz opcjonalnie email, telefon'
+    )
+    
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        try:
+            bulk_import.check_extension(file.name)
+        except bulk_import.ImportFormatError as e:
+            raise forms.ValidationError(str(e))
+        return file
+
+
+def prefetch_patients(lookup='patient'):
+    """
+    Pacjenci wyświetlanej strony w jednym zapytaniu, odszyfrowani wsadowo
+    
+    Prefetch wykonuje się dopiero dla strony wyników listy, więc zamiast
+    odszyfrowywać dane pacjenta wiersz po wierszu robimy to raz dla całej strony.
+    """
+    return models.Prefetch(lookup, queryset=Patient.objects.with_decrypted())
+
+
 class CustomPatientSearchMixin:
-    """Mixin dodający custom wyszukiwanie do admin"""
+    """
+    Mixin dodający wyszukiwanie po zaszyfrowanych danych pacjenta do admin
+    
+    `patient_lookup` wskazuje pacjenta z modelu listy (np. 'visit_card__patient');
+    None oznacza, że lista zawiera samych pacjentów.
+    """
+    
+    patient_lookup = None
     
     def get_search_results(self, request, queryset, search_term):
         """
-        Custom wyszukiwanie które obsługuje zaszyfrowane pola
+        Standardowe search_fields LUB dopasowanie pacjenta po indeksie ślepym -
+        jedno zapytanie z podzapytaniem zamiast osobnych sond exists()
         """
         if not search_term:
             return queryset, False
         
-        # Standardowe wyszukiwanie po niezaszyfrowanych polach
-        queryset, use_distinct = super().get_search_results(request, queryset, search_term)
-        
-        # Dodatkowe wyszukiwanie po zaszyfrowanych polach
-        search_results = models.Q()
-        
-        # Wyszukiwanie po PESEL (jeśli search_term wygląda jak PESEL)
-        if search_term.isdigit() and len(search_term) >= 3:
-            try:
-                patients_by_pesel = Patient.objects.search_by_pesel(search_term)
-                if patients_by_pesel.exists():
-                    search_results |= models.Q(id__in=patients_by_pesel.values_list('id', flat=True))
-            except:
-                pass
-        
-        # Wyszukiwanie po imieniu/nazwisku
-        if search_term.isalpha():
-            try:
-                # Spróbuj jako pojedyncze imię
-                patients_by_first_name = Patient.objects.search_by_name(first_name=search_term)
-                if patients_by_first_name.exists():
-                    search_results |= models.Q(id__in=patients_by_first_name.values_list('id', flat=True))
-                
-                # Spróbuj jako nazwisko
-                patients_by_last_name = Patient.objects.search_by_name(last_name=search_term)
-                if patients_by_last_name.exists():
-                    search_results |= models.Q(id__in=patients_by_last_name.values_list('id', flat=True))
-            except:
-                pass
-        
-        # Wyszukiwanie po pełnym imieniu i nazwisku
-        if ' ' in search_term:
-            try:
-                patients_by_full_name = Patient.objects.search_by_full_name(search_term)
-                if patients_by_full_name.exists():
-                    search_results |= models.Q(id__in=patients_by_full_name.values_list('id', flat=True))
-            except:
-                pass
+        matching, may_have_duplicates = super().get_search_results(request, queryset, search_term)
         
-        # Połącz wyniki
-        if search_results:
-            queryset = queryset.filter(search_results)
-            use_distinct = True
+        patients = Patient.objects.search(search_term).values('pk')
+        lookup = f'{self.patient_lookup}__in' if self.patient_lookup else 'pk__in'
+        by_patient = queryset.filter(**{lookup: patients})
         
-        return queryset, use_distinct
+        if matching is queryset:
+            return by_patient, may_have_duplicates
+        return matching | by_patient, may_have_duplicates
 
 
 class ProgramParticipationHistoryInline(admin.TabularInline):
@@ -302,8 +306,44 @@ class PatientAdmin(CustomPatientSearchMixin, admin.ModelAdmin):
             form.add_error(None, f"Błąd zapisu: {str(e)}")
     
     def get_queryset(self, request):
-        """Optymalizacja zapytań"""
-        return super().get_queryset(request).select_related()
+        """Optymalizacja zapytań - dane osobowe strony odszyfrowywane wsadowo"""
+        return super().get_queryset(request).select_related().with_decrypted()
+    
+    def get_urls(self):
+        return [
+            path(
+                'import/',
+                self.admin_site.admin_view(self.import_view),
+                name='patients_patient_import'
+            ),
+        ] + super().get_urls()
+    
+    def import_view(self, request):
+        """Przesłanie pliku importu - sam import wykonuje worker zadań"""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        
+        form = PatientImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            path = bulk_import.store_upload(form.cleaned_data['file'])
+            job = enqueue('patients.import_patients', {'path': path}, user=request.user)
+            self.message_user(
+                request,
+                format_html(
+                    'Zlecono import pliku {} - <a href="{}">stan zadania</a>',
+                    form.cleaned_data['file'].name,
+                    reverse('jobs:status', args=[job.pk])
+                )
+            )
+            return redirect('admin:patients_patient_changelist')
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import pacjentów',
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/patients/patient/import.html', context)
     
     # Dodatkowe akcje admin
     actions = ['test_decryption', 'regenerate_hashes']
@@ -328,21 +368,31 @@ class PatientAdmin(CustomPatientSearchMixin, admin.ModelAdmin):
     test_decryption.short_description = "Testuj odszyfrowanie wybranych pacjentów"
     
     def regenerate_hashes(self, request, queryset):
-        """Akcja regenerująca hasze wyszukiwania"""
-        count = 0
-        for patient in queryset:
-            patient.save()  # save() automatycznie regeneruje hasze
-            count += 1
+        """Akcja regenerująca hasze wyszukiwania - wykonywana w tle przez worker zadań"""
+        if queryset.query.has_filters():
+            patient_ids = list(queryset.values_list('pk', flat=True))
+            count = len(patient_ids)
+        else:
+            # "Zaznacz wszystkie" bez filtrów - nie przekazujemy listy wszystkich ID
+            patient_ids = None
+            count = queryset.count()
+        job = enqueue('patients.regenerate_hashes', {'patient_ids': patient_ids}, user=request.user)
         
         self.message_user(
             request,
-            f"Zregenerowano hasze dla {count} pacjentów"
+            format_html(
+                'Zlecono regenerację haszy dla {} pacjentów - <a href="{}">stan zadania</a>',
+                count,
+                reverse('jobs:status', args=[job.pk])
+            )
         )
     regenerate_hashes.short_description = "Regeneruj hasze wyszukiwania"
 
 
 @admin.register(ProgramParticipationHistory)
-class ProgramParticipationHistoryAdmin(admin.ModelAdmin):
+class ProgramParticipationHistoryAdmin(CustomPatientSearchMixin, admin.ModelAdmin):
+    patient_lookup = 'patient'
+    
     list_display = [
         'patient',
         'get_patient_name',
@@ -359,6 +409,9 @@ class ProgramParticipationHistoryAdmin(admin.ModelAdmin):
         'created_at'
     ]
     
+    # Pacjent ładowany przez prefetch_patients - bez JOIN-a, który odszyfrowywałby go wiersz po wierszu
+    list_select_related = ()
+    
     # Wyszukiwanie - możemy wyszukiwać po ID pacjenta lub danych kontaktowych
     search_fields = [
         'patient__id',
@@ -398,8 +451,8 @@ class ProgramParticipationHistoryAdmin(admin.ModelAdmin):
     years_since_participation.short_description = 'Lat od uczestnictwa'
     
     def get_queryset(self, request):
-        """Optymalizacja zapytań"""
-        return super().get_queryset(request).select_related('patient')
+        """Optymalizacja zapytań - pacjenci strony w jednym zapytaniu, odszyfrowani wsadowo"""
+        return super().get_queryset(request).prefetch_related(prefetch_patients())
 
 
 # Dodatkowe customizacje admin interface
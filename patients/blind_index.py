@@ -0,0 +1,129 @@
+"""
+Indeks ślepy (blind index) do wyszukiwania po zaszyfrowanych danych pacjenta.
+
+Dla imienia, nazwiska i PESEL przechowujemy wyłącznie kluczowane skróty HMAC
+znormalizowanych fragmentów wartości:
+- prefiksów o długości 1..(NGRAM_SIZE - 1) - dla krótkich zapytań,
+- n-gramów (trigramów) każdego słowa - dla wyszukiwania podciągów.
+
+Dzięki temu wyszukiwanie podciągu sprowadza się do zapytania SQL po indeksie,
+bez odszyfrowywania danych całej przychodni.
+"""
+import hashlib
+import hmac
+
+from django.conf import settings
+
+
+NGRAM_SIZE = 3
+
+# Długość przechowywanego skrótu (hex) - 128 bitów w zupełności wystarcza
+TOKEN_LENGTH = 32
+
+FIELD_FIRST_NAME = 'first_name'
+FIELD_LAST_NAME = 'last_name'
+FIELD_PESEL = 'pesel'
+
+NAME_FIELDS = (FIELD_FIRST_NAME, FIELD_LAST_NAME)
+
+KIND_PREFIX = 'p'
+KIND_NGRAM = 'g'
+
+
+def get_index_key():
+    """Zwraca klucz HMAC indeksu ślepego"""
+    key = getattr(settings, 'PATIENT_BLIND_INDEX_KEY', None) or getattr(
+        settings, 'PATIENT_SEARCH_SALT', 'default_salt'
+    )
+    return key.encode()
+
+
+def normalize(value):
+    """Normalizuje wartość tak samo jak hasze wyszukiwania (małe litery, bez zbędnych spacji)"""
+    if not value:
+        return ''
+    return ' '.join(str(value).lower().split())
+
+
+def normalize_pesel(value):
+    """Usuwa spacje i myślniki z numeru PESEL"""
+    if not value:
+        return ''
+    return str(value).replace(' ', '').replace('-', '')
+
+
+def token_hash(field, kind, fragment, key=None):
+    """Kluczowany skrót HMAC-SHA256 fragmentu wartości danego pola"""
+    message = f"{field}:{kind}:{fragment}".encode()
+    digest = hmac.new(key or get_index_key(), message, hashlib.sha256).hexdigest()
+    return digest[:TOKEN_LENGTH]
+
+
+def _word_fragments(word):
+    """Zwraca pary (rodzaj, fragment) dla pojedynczego słowa"""
+    fragments = set()
+    for length in range(1, min(len(word), NGRAM_SIZE - 1) + 1):
+        fragments.add((KIND_PREFIX, word[:length]))
+    for i in range(len(word) - NGRAM_SIZE + 1):
+        fragments.add((KIND_NGRAM, word[i:i + NGRAM_SIZE]))
+    return fragments
+
+
+def value_tokens(field, value, key=None):
+    """Zwraca zbiór skrótów indeksu dla wartości pola"""
+    if field == FIELD_PESEL:
+        words = [normalize_pesel(value)]
+    else:
+        words = normalize(value).split()
+
+    key = key or get_index_key()
+    tokens = set()
+    for word in words:
+        for kind, fragment in _word_fragments(word):
+            tokens.add(token_hash(field, kind, fragment, key))
+    return tokens
+
+
+def patient_tokens(first_name, last_name, pesel, key=None):
+    """
+    Zwraca listę par (pole, skrót) dla pacjenta
+
+    Args:
+        first_name: Odszyfrowane imię
+        last_name: Odszyfrowane nazwisko
+        pesel: Odszyfrowany PESEL
+    """
+    key = key or get_index_key()
+    tokens = []
+    for field, value in (
+        (FIELD_FIRST_NAME, first_name),
+        (FIELD_LAST_NAME, last_name),
+        (FIELD_PESEL, pesel),
+    ):
+        if value:
+            tokens.extend((field, token) for token in value_tokens(field, value, key))
+    return tokens
+
+
+def term_tokens(field, term, key=None):
+    """
+    Zwraca zbiór skrótów, które MUSZĄ wystąpić w polu, aby pasowało do słowa zapytania.
+
+    Krótkie słowa (poniżej NGRAM_SIZE znaków) dopasowujemy jako prefiks,
+    dłuższe jako podciąg - przez koniunkcję wszystkich ich n-gramów.
+    """
+    key = key or get_index_key()
+    if len(term) < NGRAM_SIZE:
+        return {token_hash(field, KIND_PREFIX, term, key)}
+    return {
+        token_hash(field, KIND_NGRAM, term[i:i + NGRAM_SIZE], key)
+        for i in range(len(term) - NGRAM_SIZE + 1)
+    }
+
+
+def query_terms(query):
+    """Dzieli zapytanie na słowa; numer PESEL wpisany ze spacjami traktuje jako jedno słowo"""
+    compact = normalize_pesel(query)
+    if compact.isdigit():
+        return [compact]
+    return normalize(query).split()
@@ -0,0 +1,353 @@
+"""
+Import pacjentów z plików CSV i XLSX.
+
+Plik czytany jest strumieniowo, paczkami po `batch_size` wierszy, więc zużycie
+pamięci nie rośnie z rozmiarem pliku. Dla każdej paczki:
+
+1. walidacja PESEL (wsadowo, pesel_batch), szyfrowanie, hasze wyszukiwania,
+   klucze sortowania i wpisy indeksu ślepego liczone są w puli procesów
+   (praca CPU bez bazy),
+2. w jednej transakcji na paczkę, pod blokadą importu tenanta, duplikaty
+   odrzucane są po pesel_hash (względem bazy i wcześniejszych wierszy
+   pliku), a pacjenci i wpisy indeksu zapisywani są przez bulk_create.
+
+Błędny wiersz nie przerywa importu - trafia do listy błędów z numerem linii.
+Obsługa XLSX wymaga pakietu openpyxl.
+"""
+import csv
+import itertools
+import os
+import tempfile
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from zrowie.decryption import encrypt
+from . import blind_index, pesel_batch, sort_keys
+from .results import BatchResult
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover - XLSX jest opcjonalny
+    openpyxl = None
+
+
+# Nagłówki kolumn (po normalizacji) i odpowiadające im pola
+COLUMNS = {
+    'pesel': 'pesel',
+    'first_name': 'first_name',
+    'imie': 'first_name',
+    'imię': 'first_name',
+    'last_name': 'last_name',
+    'nazwisko': 'last_name',
+    'email': 'email',
+    'e-mail': 'email',
+    'phone': 'phone',
+    'telefon': 'phone',
+}
+REQUIRED_COLUMNS = ('pesel', 'first_name', 'last_name')
+
+# Ile błędów wierszy przechowujemy w wyniku (pozostałe są tylko liczone)
+MAX_ERRORS = 1000
+
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx')
+
+
+class ImportFormatError(Exception):
+    """Pliku nie da się zaimportować (format, brak wymaganych kolumn)"""
+
+
+@dataclass
+class ImportResult(BatchResult):
+    """Podsumowanie importu (processed - liczba wierszy pliku)"""
+    created: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    errors: list = field(default_factory=list)  # (linia, komunikat), najwyżej MAX_ERRORS
+
+    def add_error(self, line, message):
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+    def as_dict(self, max_errors=100):
+        """Wynik serializowalny do JSON (np. jako wynik zadania w tle)"""
+        return {
+            'rows': self.processed,
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'invalid': self.invalid,
+            'rows_per_second': round(self.rows_per_second, 1),
+            'errors': [f"linia {line}: {message}" for line, message in self.errors[:max_errors]],
+        }
+
+
+def import_patients(path, batch_size=500, workers=None, encoding='utf-8-sig', progress=None):
+    """
+    Importuje pacjentów z pliku CSV/XLSX do schematu bieżącego tenanta
+
+    Args:
+        path: Ścieżka pliku (.csv lub .xlsx)
+        batch_size: Liczba wierszy w paczce (i w jednej transakcji)
+        workers: Liczba procesów przygotowujących wiersze (None = liczba CPU, 1 = bez puli)
+        encoding: Kodowanie pliku CSV
+        progress: Opcjonalna funkcja wywoływana z ImportResult po każdej paczce
+
+    Returns:
+        ImportResult
+    """
+    result = ImportResult()
+    seen = set()
+    start = time.perf_counter()
+
+    with _open_rows(path, encoding) as rows:
+        chunks = _chunked(rows, batch_size)
+        workers = workers or os.cpu_count() or 1
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                for prepared in _prepare_in_pool(executor, chunks, workers * 2):
+                    _write_batch(prepared, seen, result)
+                    result.elapsed = time.perf_counter() - start
+                    if progress:
+                        progress(result)
+        else:
+            for chunk in chunks:
+                _write_batch(prepare_rows(chunk), seen, result)
+                result.elapsed = time.perf_counter() - start
+                if progress:
+                    progress(result)
+
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def store_upload(uploaded_file):
+    """Zapisuje przesłany plik w PATIENT_IMPORT_DIR i zwraca jego ścieżkę"""
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    directory = getattr(settings, 'PATIENT_IMPORT_DIR', None) or tempfile.gettempdir()
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, prefix='patients-', suffix=extension, delete=False) as target:
+        for chunk in uploaded_file.chunks():
+            target.write(chunk)
+    return target.name
+
+
+def check_extension(name):
+    """Sprawdza, czy plik o tej nazwie można zaimportować"""
+    extension = os.path.splitext(name)[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise ImportFormatError("Obsługiwane są pliki CSV i XLSX")
+    if extension == '.xlsx' and openpyxl is None:
+        raise ImportFormatError("Import XLSX wymaga pakietu openpyxl - zapisz plik jako CSV")
+
+
+# --- odczyt pliku ---
+
+@contextmanager
+def _open_rows(path, encoding):
+    """Otwiera plik i zwraca iterator par (numer linii, wiersz)"""
+    check_extension(path)
+    if path.lower().endswith('.xlsx'):
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield _xlsx_rows(workbook.active)
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline='', encoding=encoding) as file:
+            yield _csv_rows(file)
+
+
+def _csv_rows(file):
+    sample = file.read(4096)
+    file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(file, dialect)
+    columns = _map_header(next(reader, None))
+    for values in reader:
+        if any(values):
+            yield reader.line_num, _row(columns, values)
+
+
+def _xlsx_rows(sheet):
+    rows = sheet.iter_rows(values_only=True)
+    columns = _map_header(next(rows, None))
+    for line, values in enumerate(rows, start=2):
+        if any(value not in (None, '') for value in values):
+            yield line, _row(columns, [_xlsx_value(value, column) for value, column in zip(values, columns)])
+
+
+def _xlsx_value(value, column):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, int) and column == 'pesel':
+        # Excel zapisuje PESEL jako liczbę i gubi wiodące zera (urodzeni 2000-2009)
+        return f"{value:011d}"
+    return str(value)
+
+
+def _map_header(header):
+    if not header:
+        raise ImportFormatError("Plik jest pusty")
+    columns = [COLUMNS.get(str(name or '').strip().lower()) for name in header]
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ImportFormatError(f"Brak wymaganych kolumn: {', '.join(missing)}")
+    return columns
+
+
+def _row(columns, values):
+    return {column: value.strip() for column, value in zip(columns, values) if column}
+
+
+def _chunked(rows, size):
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# --- przygotowanie wierszy (w procesach puli) ---
+
+def _init_worker():
+    # Procesy uruchamiane metodą spawn (Windows) startują bez skonfigurowanego Django
+    import django
+    django.setup()
+
+
+def _prepare_in_pool(executor, chunks, max_pending):
+    """Przygotowuje paczki w puli, zachowując kolejność i ograniczając liczbę paczek w locie"""
+    pending = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(prepare_rows, chunk))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def prepare_rows(rows):
+    """
+    Waliduje i przygotowuje paczkę wierszy do zapisu
+
+    Returns:
+        Lista krotek (linia, dane albo None, błąd albo None)
+    """
+    pesels = [blind_index.normalize_pesel(row.get('pesel')) for line, row in rows]
+    decoded = pesel_batch.decode_many(pesels)
+
+    prepared = []
+    for i, (line, row) in enumerate(rows):
+        try:
+            if not decoded.valid[i]:
+                raise ValidationError(pesel_batch.error_message(pesels[i]))
+            data = _prepare_row(row, pesels[i], decoded.birth_date(i), decoded.gender(i))
+            prepared.append((line, data, None))
+        except ValidationError as e:
+            prepared.append((line, None, '; '.join(e.messages)))
+    return prepared
+
+
+def _prepare_row(row, pesel, birth_date, gender):
+    # Import modeli dopiero tutaj - moduł jest ładowany w procesach puli przed django.setup()
+    from .models import Patient, create_search_hash
+
+    first_name = row.get('first_name')
+    last_name = row.get('last_name')
+    if not first_name or not last_name:
+        raise ValidationError("Imię i nazwisko są wymagane")
+
+    contact = {}
+    for name in ('email', 'phone'):
+        value = row.get(name) or None
+        if value:
+            Patient._meta.get_field(name).run_validators(value)
+        contact[name] = value
+
+    return {
+        'pesel_encrypted': encrypt(pesel),
+        'first_name_encrypted': encrypt(first_name),
+        'last_name_encrypted': encrypt(last_name),
+        'pesel_hash': create_search_hash(pesel),
+        'first_name_hash': create_search_hash(first_name),
+        'last_name_hash': create_search_hash(last_name),
+        'name_sort_key': sort_keys.name_sort_key(first_name, last_name),
+        'pesel_sort_key': sort_keys.pesel_sort_key(pesel),
+        'date_of_birth': birth_date,
+        'gender': gender,
+        'tokens': blind_index.patient_tokens(first_name, last_name, pesel),
+        **contact,
+    }
+
+
+# --- zapis ---
+
+def _write_batch(prepared, seen, result):
+    """Odrzuca duplikaty i zapisuje paczkę w jednej transakcji"""
+    from .models import Patient, PatientSearchToken
+
+    result.processed += len(prepared)
+    valid = []
+    for line, data, error in prepared:
+        if error is not None:
+            result.invalid += 1
+            result.add_error(line, error)
+        else:
+            valid.append((line, data))
+    if not valid:
+        return
+
+    patients, tokens = [], []
+    with transaction.atomic():
+        # Sprawdzenie duplikatów i zapis w jednej transakcji pod blokadą - pesel_hash
+        # nie jest unikalny, więc dwa równoległe importy wstawiłyby tego samego pacjenta
+        _lock_import()
+        existing = set(
+            Patient.objects
+            .filter(pesel_hash__in=[data['pesel_hash'] for line, data in valid])
+            .values_list('pesel_hash', flat=True)
+        )
+
+        for line, data in valid:
+            digest = bytes.fromhex(data['pesel_hash'])
+            if data['pesel_hash'] in existing or digest in seen:
+                result.duplicates += 1
+                result.add_error(line, "Pacjent o tym numerze PESEL już istnieje")
+                continue
+            seen.add(digest)
+            tokens.append(data.pop('tokens'))
+            patients.append(Patient(**data))
+
+        if not patients:
+            return
+
+        Patient.objects.bulk_create(patients)
+        PatientSearchToken.objects.bulk_create(
+            [
+                PatientSearchToken(patient=patient, field=field_name, token_hash=token)
+                for patient, patient_tokens in zip(patients, tokens)
+                for field_name, token in patient_tokens
+            ],
+            batch_size=1000
+        )
+    result.created += len(patients)
+
+
+def _lock_import():
+    """Blokada importu w schemacie bieżącego tenanta do końca transakcji"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(hashtext(%s))",
+            [f"patients.import:{connection.schema_name}"]
+        )
@@ -0,0 +1,120 @@
+"""
+Kwalifikacja pacjentów do programu Profilaktyka 40+ jako warunki SQL.
+
+Patient.can_start_40plus_visit sprawdzał warunki osobnymi zapytaniami dla
+każdego pacjenta, więc lista "kto może przystąpić do 40+" kosztowała
+N x 2 zapytania. Tutaj te same warunki są wyrażone w jednym zapytaniu
+po całym tenancie:
+
+- wiek co najmniej 40 lat - porównanie date_of_birth z datą graniczną,
+- brak otwartej karty 40+ (nieanulowanej, nie zakończonej i nie odwołanej),
+- brak karty 40+ zakończonej w ciągu ostatnich 365 dni,
+- brak wpisu w historii uczestnictwa w programie 40+ w bieżącym roku.
+
+Warunki na kartach i historii to podzapytania Exists (anti-join w bazie).
+Z tych samych warunków korzysta filtr listy pacjentów, lista do
+zapraszania na badania, eksport kampanii i karta pacjenta.
+"""
+from datetime import timedelta
+
+from django.db import models
+from django.utils import timezone
+
+from visits.models import VisitCard
+from .models import ProgramParticipationHistory
+
+
+PROGRAM_40PLUS = '40+'
+VISIT_TYPE_40PLUS = '40+'
+MINIMUM_AGE = 40
+
+# Statusy kończące kartę - karta w innym statusie jest otwarta
+CLOSED_STATUSES = ['zakończone', 'odwołane']
+
+# Kolumny eksportu kampanii (nagłówek CSV)
+CAMPAIGN_COLUMNS = [
+    'Imię', 'Nazwisko', 'PESEL', 'Data urodzenia', 'Wiek', 'Płeć', 'Email', 'Telefon'
+]
+
+
+def age_cutoff(today, years=MINIMUM_AGE):
+    """Najpóźniejsza data urodzenia osoby, która dziś ma co najmniej `years` lat"""
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        # 29 lutego, a rok graniczny nie jest przestępny
+        return today.replace(year=today.year - years, day=28)
+
+
+def conditions(today=None):
+    """
+    Podzapytania Exists wykluczające pacjenta z programu
+
+    Returns:
+        Słownik nazwa -> Exists (względem OuterRef('pk') pacjenta)
+    """
+    today = today or timezone.localdate()
+    cards_40plus = VisitCard.objects.filter(
+        patient=models.OuterRef('pk'), visit_type__name=VISIT_TYPE_40PLUS
+    )
+    return {
+        'has_open_40plus': models.Exists(
+            cards_40plus.filter(is_cancelled=False).exclude(visit_status__in=CLOSED_STATUSES)
+        ),
+        'has_recent_40plus': models.Exists(
+            cards_40plus.filter(
+                visit_status='zakończone',
+                visit_completed_date__gte=today - timedelta(days=365)
+            )
+        ),
+        'participated_40plus': models.Exists(
+            ProgramParticipationHistory.objects.filter(
+                patient=models.OuterRef('pk'),
+                program_type=PROGRAM_40PLUS,
+                participation_year=today.year
+            )
+        ),
+    }
+
+
+def annotate(queryset, today=None):
+    """Dodaje flagi warunków i wynikową flagę eligible_40plus do każdego pacjenta"""
+    today = today or timezone.localdate()
+    exclusions = conditions(today)
+    eligible = models.Q(date_of_birth__lte=age_cutoff(today))
+    for name in exclusions:
+        eligible &= models.Q(**{name: False})
+    return queryset.annotate(**exclusions).annotate(
+        eligible_40plus=models.ExpressionWrapper(eligible, output_field=models.BooleanField())
+    )
+
+
+def eligible(queryset, today=None):
+    """Zawęża queryset do pacjentów, którzy mogą rozpocząć wizytę 40+"""
+    today = today or timezone.localdate()
+    return queryset.filter(
+        models.Q(date_of_birth__lte=age_cutoff(today)),
+        *[~exclusion for exclusion in conditions(today).values()]
+    )
+
+
+def campaign_rows(queryset, chunk_size=1000, today=None):
+    """
+    Wiersze eksportu kampanii dla pacjentów kwalifikujących się do 40+
+
+    Pacjenci pobierani są porcjami po `chunk_size`, a dane osobowe każdej
+    porcji odszyfrowywane wsadowo - eksport całego tenanta nie trzyma
+    wszystkich pacjentów w pamięci.
+    """
+    patients = eligible(queryset, today).with_decrypted().order_by('pk')
+    for patient in patients.iterator(chunk_size=chunk_size):
+        yield [
+            patient.first_name_encrypted,
+            patient.last_name_encrypted,
+            patient.pesel_encrypted,
+            patient.date_of_birth.isoformat(),
+            patient.age,
+            patient.get_gender_display(),
+            patient.email or '',
+            patient.phone or '',
+        ]
@@ -0,0 +1,157 @@
+"""
+Wsadowa przebudowa haszy wyszukiwania pacjentów (np. po zmianie PATIENT_SEARCH_SALT).
+
+Zamiast patient.save() dla każdego wiersza (ponowne wyciąganie danych z PESEL,
+ponowne szyfrowanie wszystkich pól i osobne zapytania) pacjenci przetwarzani
+są paczkami po `chunk_size` w kolejności ID:
+
+1. dane osobowe paczki odszyfrowywane są wsadowo (with_decrypted),
+2. hasze liczone są w pamięci, PESEL-e sprawdzane przez pesel_batch,
+3. bulk_update zapisuje wyłącznie kolumny haszy, a wpisy indeksu ślepego
+   są podmieniane w tej samej transakcji,
+4. w tej samej transakcji zapisywany jest punkt kontrolny (ID ostatniego
+   pacjenta) - przerwany przebieg można wznowić bez powtarzania pracy.
+
+Przebudowa jest idempotentna, więc ponowne wykonanie tej samej paczki
+niczego nie psuje.
+"""
+import time
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import blind_index, pesel_batch
+from .models import HashRebuildCheckpoint, Patient, PatientSearchToken, create_search_hash
+from .results import BatchResult
+
+
+HASH_FIELDS = ['pesel_hash', 'first_name_hash', 'last_name_hash']
+
+# Ile ID pacjentów z niepoprawnym PESEL przechowujemy w wyniku
+MAX_INVALID = 1000
+
+
+@dataclass
+class RebuildResult(BatchResult):
+    """Podsumowanie przebudowy"""
+    tokens: int = 0
+    invalid_pesels: list = field(default_factory=list)  # ID pacjentów, najwyżej MAX_INVALID
+    resumed_from: int = 0
+
+    def as_dict(self):
+        return {
+            **super().as_dict(),
+            'tokens': self.tokens,
+            'invalid_pesels': self.invalid_pesels,
+        }
+
+
+def rebuild_hashes(patient_ids=None, chunk_size=1000, checkpoint=None, resume=False,
+                   search_index=True, progress=None):
+    """
+    Przebudowuje hasze wyszukiwania pacjentów bieżącego tenanta
+
+    Args:
+        patient_ids: ID pacjentów do przebudowy (None = wszyscy)
+        chunk_size: Liczba pacjentów w paczce (i w jednej transakcji)
+        checkpoint: Nazwa punktu kontrolnego (None = bez zapisywania postępu)
+        resume: Wznów niezakończony przebieg o tej nazwie zamiast zaczynać od nowa
+        search_index: Przebuduj również wpisy indeksu ślepego
+        progress: Opcjonalna funkcja wywoływana z RebuildResult po każdej paczce
+
+    Returns:
+        RebuildResult
+    """
+    result = RebuildResult()
+    start = time.perf_counter()
+    key = blind_index.get_index_key()
+
+    state = _start_checkpoint(checkpoint, resume) if checkpoint else None
+    last_pk = state.last_pk if state else 0
+    result.resumed_from = last_pk
+    if state:
+        result.processed = state.processed
+
+    for chunk in _chunks(patient_ids, chunk_size, last_pk):
+        result.tokens += _rebuild_chunk(chunk, key, search_index, state, result)
+        result.processed += len(chunk)
+        result.elapsed = time.perf_counter() - start
+        if progress:
+            progress(result)
+
+    if state:
+        state.finished_at = timezone.now()
+        state.save(update_fields=['finished_at', 'updated_at'])
+
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def _start_checkpoint(name, resume):
+    state, created = HashRebuildCheckpoint.objects.get_or_create(name=name)
+    if not created and (not resume or state.is_finished):
+        state.last_pk = 0
+        state.processed = 0
+        state.started_at = timezone.now()
+        state.finished_at = None
+        state.save()
+    return state
+
+
+def _chunks(patient_ids, chunk_size, last_pk):
+    """Paczki pacjentów o ID > last_pk w kolejności ID, z odszyfrowanymi danymi osobowymi"""
+    queryset = Patient.objects.with_decrypted().order_by('pk')
+
+    if patient_ids is None:
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_pk = chunk[-1].pk
+    else:
+        # Lista ID dzielona po stronie Pythona - bez ogromnego IN (...) w każdym zapytaniu
+        ids = sorted(pk for pk in set(patient_ids) if pk > last_pk)
+        for i in range(0, len(ids), chunk_size):
+            chunk = list(queryset.filter(pk__in=ids[i:i + chunk_size]))
+            if chunk:
+                yield chunk
+
+
+def _rebuild_chunk(patients, key, search_index, state, result):
+    """Liczy hasze paczki i zapisuje je wraz z punktem kontrolnym w jednej transakcji"""
+    pesels = [patient.pesel_encrypted for patient in patients]
+    valid = pesel_batch.validate_many(pesels)
+
+    tokens = []
+    for patient, pesel, pesel_ok in zip(patients, pesels, valid):
+        if pesel and not pesel_ok and len(result.invalid_pesels) < MAX_INVALID:
+            result.invalid_pesels.append(patient.pk)
+
+        patient.pesel_hash = create_search_hash(pesel)
+        patient.first_name_hash = create_search_hash(patient.first_name_encrypted)
+        patient.last_name_hash = create_search_hash(patient.last_name_encrypted)
+
+        if search_index:
+            tokens.extend(
+                PatientSearchToken(patient=patient, field=field_name, token_hash=token)
+                for field_name, token in blind_index.patient_tokens(
+                    patient.first_name_encrypted,
+                    patient.last_name_encrypted,
+                    pesel,
+                    key
+                )
+            )
+
+    with transaction.atomic():
+        Patient.objects.bulk_update(patients, HASH_FIELDS, batch_size=len(patients))
+        if search_index:
+            PatientSearchToken.objects.filter(patient__in=patients).delete()
+            PatientSearchToken.objects.bulk_create(tokens, batch_size=1000)
+        if state:
+            state.last_pk = patients[-1].pk
+            state.processed = result.processed + len(patients)
+            state.save(update_fields=['last_pk', 'processed', 'updated_at'])
+
+    return len(tokens)
@@ -0,0 +1,34 @@
+"""Zadania w tle aplikacji pacjentów"""
+import os
+
+from jobs.queue import heartbeat, task
+
+from . import bulk_import, hash_rebuild
+
+
+@task('patients.regenerate_hashes', bind=True)
+def regenerate_hashes(job, patient_ids=None):
+    """Przebudowuje hasze wyszukiwania wybranych (albo wszystkich) pacjentów"""
+    # Punkt kontrolny zadania - ponowna próba po błędzie wznawia od ostatniej zapisanej paczki
+    return hash_rebuild.rebuild_hashes(
+        patient_ids=patient_ids,
+        checkpoint=checkpoint_name(job),
+        resume=True,
+        progress=lambda result: heartbeat(job),
+    ).as_dict()
+
+
+def checkpoint_name(job):
+    return f"job:{job.pk}"
+
+
+@task('patients.import_patients', max_attempts=1, bind=True)
+def import_patients(job, path, batch_size=500):
+    """Importuje pacjentów z pliku przesłanego w adminie i usuwa plik"""
+    try:
+        result = bulk_import.import_patients(
+            path, batch_size=batch_size, progress=lambda result: heartbeat(job)
+        )
+    finally:
+        os.remove(path)
+    return result.as_dict()
@@ -0,0 +1,140 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from patients.models import Patient
+from patients import sort_keys
+from patients.management.commands.seed_patients import Command as SeedCommand
+from tenants.models import Tenant
+from django_tenants.utils import connection
+import random
+import statistics
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Mierzy czas pobrania pierwszej strony posortowanej listy pacjentów: '
+        'sortowanie odszyfrowanych danych w Pythonie vs ORDER BY po kluczach sortowania '
+        '(dla nazwiska - po kubełkach pierwszej litery). '
+        'Dane testowe są tworzone w transakcji i wycofywane po pomiarze.'
+    )
+
+    FIRST_NAMES = ['Anna', 'Jan', 'Łukasz', 'Ewa', 'Piotr', 'Żaneta', 'Marek', 'Ścibor', 'Zofia', 'Adam']
+    LAST_NAMES = ['Nowak', 'Kowalski', 'Wiśniewski', 'Dąbrowski', 'Żak', 'Ślusarz', 'Mazur', 'Zając', 'Łata', 'Bąk']
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tenant_schema',
+            type=str,
+            help='Schema name tenanta, w którym zostaną utworzone tymczasowe dane'
+        )
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10000, 100000],
+            help='Liczby pacjentów do pomiaru (domyślnie: 10000 100000)'
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=25,
+            help='Rozmiar strony (domyślnie: 25, jak w PatientListView)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Liczba powtórzeń każdego pomiaru (domyślnie: 3)'
+        )
+
+    def handle(self, *args, **options):
+        tenant_schema = options['tenant_schema']
+
+        try:
+            tenant = Tenant.objects.get(schema_name=tenant_schema)
+        except Tenant.DoesNotExist:
+            self.stdout.write(
+                self.style.ERROR(f'Tenant "{tenant_schema}" nie istnieje!')
+            )
+            return
+
+        connection.set_tenant(tenant)
+        self.page_size = options['page_size']
+        self.repeat = options['repeat']
+
+        self.stdout.write(f'{"Pacjentów":>10} {"Sortowanie":>10} {"Przed [ms]":>12} {"Po [ms]":>10} {"Przyspieszenie":>15}')
+        self.stdout.write('-' * 61)
+
+        for size in options['sizes']:
+            with transaction.atomic():
+                self._create_patients(size)
+                total = Patient.objects.count()
+
+                for sort, python_key, db_page in (
+                    ('name', lambda p: p.get_decrypted_full_name().lower(), self._bucket_sort_page),
+                    ('pesel', lambda p: p.get_decrypted_pesel(), lambda: self._db_sort_page('pesel_sort_key')),
+                ):
+                    before = self._measure(lambda: self._python_sort_page(python_key))
+                    after = self._measure(db_page)
+                    self.stdout.write(
+                        f'{total:>10} {sort:>10} {before:>12.1f} {after:>10.1f} {before / max(after, 0.001):>14.0f}x'
+                    )
+
+                # Nie zostawiamy danych testowych w bazie
+                transaction.set_rollback(True)
+
+    def _measure(self, func):
+        """Mediana czasu wykonania w milisekundach"""
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def _python_sort_page(self, key):
+        """Dotychczasowa ścieżka: odszyfrowanie całej tabeli i sortowanie w Pythonie"""
+        patients = list(Patient.objects.all())
+        patients.sort(key=key)
+        return patients[:self.page_size]
+
+    def _db_sort_page(self, field):
+        """Nowa ścieżka: ORDER BY po kluczu sortowania + LIMIT"""
+        return list(Patient.objects.order_by(field, 'pk')[:self.page_size])
+
+    def _bucket_sort_page(self):
+        """Nazwisko: kubełki pierwszej litery w bazie, kolejność w kubełku po odszyfrowaniu"""
+        patients = sort_keys.SortedByBucket(
+            Patient.objects.with_decrypted(),
+            'name_sort_key',
+            key=lambda p: sort_keys.name_collation_key(p.first_name_encrypted, p.last_name_encrypted)
+        )
+        return patients[:self.page_size]
+
+    def _create_patients(self, count):
+        """Tworzy tymczasowych pacjentów przez bulk_create"""
+        seed = SeedCommand()
+        self.stdout.write(f'⏳ Tworzenie {count} pacjentów testowych...')
+
+        batch = []
+        for _ in range(count):
+            gender = random.choice(['M', 'K'])
+            pesel = seed.generate_valid_pesel(gender)
+            first_name = random.choice(self.FIRST_NAMES)
+            last_name = random.choice(self.LAST_NAMES)
+            birth_date, gender = Patient.extract_pesel_data(pesel)
+            batch.append(Patient(
+                first_name_encrypted=first_name,
+                last_name_encrypted=last_name,
+                pesel_encrypted=pesel,
+                date_of_birth=birth_date,
+                gender=gender,
+                name_sort_key=sort_keys.name_sort_key(first_name, last_name),
+                pesel_sort_key=sort_keys.pesel_sort_key(pesel),
+            ))
+            if len(batch) >= 2000:
+                Patient.objects.bulk_create(batch)
+                batch = []
+
+        if batch:
+            Patient.objects.bulk_create(batch)
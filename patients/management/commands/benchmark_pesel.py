@@ -0,0 +1,103 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from patients.models import Patient
+from patients import pesel_batch
+import numpy as np
+import statistics
+import time
+
+
+def synthetic_pesels(count, invalid_rate=0.01, seed=0):
+    """Losowe PESEL-e z lat 1900-2099 z poprawną sumą kontrolną (część celowo zepsuta)"""
+    rng = np.random.default_rng(seed)
+    birth_dates = (
+        np.datetime64('1900-01-01') + rng.integers(0, 200 * 365, count).astype('timedelta64[D]')
+    )
+    years = birth_dates.astype('datetime64[Y]').astype(np.int32) + 1970
+    months = birth_dates.astype('datetime64[M]').astype(np.int32) % 12 + 1
+    days = (birth_dates - birth_dates.astype('datetime64[M]')).astype(np.int32) + 1
+    coded_months = months + np.where(years >= 2000, 20, 0)
+
+    digits = np.empty((count, 11), dtype=np.int32)
+    digits[:, 0], digits[:, 1] = (years % 100) // 10, years % 10
+    digits[:, 2], digits[:, 3] = coded_months // 10, coded_months % 10
+    digits[:, 4], digits[:, 5] = days // 10, days % 10
+    digits[:, 6:10] = rng.integers(0, 10, (count, 4))
+    digits[:, 10] = (10 - (digits[:, :10] @ pesel_batch.WEIGHTS) % 10) % 10
+
+    broken = rng.random(count) < invalid_rate
+    digits[broken, 10] = (digits[broken, 10] + 1) % 10
+
+    text = (digits + ord('0')).astype(np.uint8).tobytes().decode('ascii')
+    return [text[i:i + 11] for i in range(0, count * 11, 11)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Porównuje walidację i dekodowanie PESEL: ścieżka skalarna '
+        '(Patient.extract_pesel_data w pętli) vs wsadowa (pesel_batch.decode_many)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=1_000_000,
+            help='Liczba syntetycznych numerów PESEL (domyślnie: 1000000)'
+        )
+        parser.add_argument(
+            '--invalid-rate',
+            type=float,
+            default=0.01,
+            help='Odsetek numerów z błędną sumą kontrolną (domyślnie: 0.01)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Liczba powtórzeń każdego pomiaru (domyślnie: 3)'
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        self.stdout.write(self.style.SUCCESS(f'🏥 Generuję {count} numerów PESEL...'))
+        pesels = synthetic_pesels(count, options['invalid_rate'])
+
+        scalar_times, batch_times = [], []
+        for _ in range(options['repeat']):
+            start = time.perf_counter()
+            scalar = self._decode_scalar(pesels)
+            scalar_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            batch = pesel_batch.decode_many(pesels)
+            batch_times.append(time.perf_counter() - start)
+
+        mismatches = sum(
+            1 for i, result in enumerate(scalar)
+            if result != ((batch.birth_date(i), batch.gender(i)) if batch.valid[i] else None)
+        )
+
+        scalar_time = statistics.median(scalar_times)
+        batch_time = statistics.median(batch_times)
+        self.stdout.write(f'{"Ścieżka":<10} {"czas s":>8} {"PESEL/s":>12}')
+        self.stdout.write('-' * 32)
+        self.stdout.write(f'{"skalarna":<10} {scalar_time:>8.2f} {count / scalar_time:>12,.0f}')
+        self.stdout.write(f'{"wsadowa":<10} {batch_time:>8.2f} {count / batch_time:>12,.0f}')
+        self.stdout.write(
+            f'📊 Przyspieszenie: {scalar_time / batch_time:.1f}x, poprawnych: {int(batch.valid.sum())}/{count}'
+        )
+
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'❌ Wyniki różnią się dla {mismatches} numerów!'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Wyniki obu ścieżek są identyczne'))
+
+    def _decode_scalar(self, pesels):
+        results = []
+        for pesel in pesels:
+            try:
+                results.append(Patient.extract_pesel_data(pesel))
+            except ValidationError:
+                results.append(None)
+        return results
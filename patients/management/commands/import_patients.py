@@ -0,0 +1,97 @@
+from django.core.management.base import BaseCommand
+from patients import bulk_import
+from tenants.models import Tenant
+from django_tenants.utils import connection
+import os
+
+
+class Command(BaseCommand):
+    help = 'Importuje pacjentów z pliku CSV/XLSX (kolumny: pesel, imie, nazwisko, email, telefon)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tenant_schema',
+            type=str,
+            help='Schema name tenanta (np. "tenant1", "przychodnia_a")'
+        )
+        parser.add_argument(
+            'path',
+            type=str,
+            help='Ścieżka pliku .csv lub .xlsx'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Liczba wierszy zapisywanych w jednej transakcji (domyślnie: 500)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Liczba procesów przygotowujących wiersze, 1 = bez puli (domyślnie: liczba CPU)'
+        )
+        parser.add_argument(
+            '--encoding',
+            default='utf-8-sig',
+            help='Kodowanie pliku CSV, np. cp1250 dla eksportów z Excela (domyślnie: utf-8-sig)'
+        )
+        parser.add_argument(
+            '--show-errors',
+            type=int,
+            default=50,
+            help='Ile błędów wierszy wypisać (domyślnie: 50)'
+        )
+
+    def handle(self, *args, **options):
+        tenant_schema = options['tenant_schema']
+
+        try:
+            tenant = Tenant.objects.get(schema_name=tenant_schema)
+        except Tenant.DoesNotExist:
+            self.stdout.write(
+                self.style.ERROR(f'Tenant "{tenant_schema}" nie istnieje!')
+            )
+            return
+
+        connection.set_tenant(tenant)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'🏥 Pracuję z tenant: {tenant.name} (schema: {tenant_schema})')
+        )
+
+        def progress(result):
+            self.stdout.write(
+                f'✅ Przetworzono {result.processed} wierszy, dodano {result.created} '
+                f'({result.rows_per_second:.0f} wierszy/s)'
+            )
+
+        try:
+            result = bulk_import.import_patients(
+                options['path'],
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                encoding=options['encoding'],
+                progress=progress,
+            )
+        except (bulk_import.ImportFormatError, OSError, UnicodeDecodeError) as e:
+            self.stdout.write(self.style.ERROR(f'❌ Nie można zaimportować pliku: {e}'))
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'🎉 Dodano {result.created} pacjentów z {result.processed} wierszy w {result.elapsed:.1f} s '
+                f'({result.rows_per_second:.0f} wierszy/s)'
+            )
+        )
+        self.stdout.write(
+            f'📊 Duplikaty: {result.duplicates}, błędne wiersze: {result.invalid}'
+        )
+
+        if result.errors and options['show_errors']:
+            self.stdout.write(self.style.WARNING('⚠️ Pominięte wiersze:'))
+            for line, message in result.errors[:options['show_errors']]:
+                self.stdout.write(f'  linia {line}: {message}')
+            hidden = result.duplicates + result.invalid - min(len(result.errors), options['show_errors'])
+            if hidden > 0:
+                self.stdout.write(f'  ... i {hidden} więcej')
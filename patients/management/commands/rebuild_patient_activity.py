@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django_tenants.utils import connection, get_public_schema_name
+from patients import activity
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = (
+        'Przelicza zdenormalizowane kolumny aktywności pacjentów (ostatnia wizyta, otwarta karta 40+, '
+        'aktywne karty, ostatni pomiar) dla jednego lub wszystkich tenantów'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tenant_schema',
+            type=str,
+            nargs='?',
+            help='Schema name tenanta (domyślnie: wszyscy tenanci)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Liczba pacjentów przeliczanych w jednej transakcji (domyślnie: 5000)'
+        )
+
+    def handle(self, *args, **options):
+        tenant_schema = options['tenant_schema']
+
+        if tenant_schema:
+            tenants = Tenant.objects.filter(schema_name=tenant_schema)
+            if not tenants.exists():
+                self.stdout.write(
+                    self.style.ERROR(f'Tenant "{tenant_schema}" nie istnieje!')
+                )
+                return
+        else:
+            tenants = Tenant.objects.exclude(schema_name=get_public_schema_name()).order_by('schema_name')
+
+        total = 0
+        for tenant in list(tenants):
+            total += self._rebuild_tenant(tenant, options['chunk_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'🎉 Przeliczono aktywność {total} pacjentów'))
+
+    def _rebuild_tenant(self, tenant, chunk_size):
+        connection.set_tenant(tenant)
+        self.stdout.write(
+            self.style.SUCCESS(f'🏥 Pracuję z tenant: {tenant.name} (schema: {tenant.schema_name})')
+        )
+
+        def progress(result):
+            self.stdout.write(
+                f'✅ [{tenant.schema_name}] Przeliczono {result.processed} pacjentów '
+                f'({result.rows_per_second:.0f}/s)'
+            )
+
+        result = activity.rebuild(chunk_size=chunk_size, progress=progress)
+        self.stdout.write(f'📊 [{tenant.schema_name}] {result.processed} pacjentów, {result.elapsed:.1f} s')
+        return result.processed
@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from patients.models import Patient, PatientSearchToken
+from patients import blind_index
+from tenants.models import Tenant
+from django_tenants.utils import connection
+
+
+class Command(BaseCommand):
+    help = 'Przebudowuje indeks wyszukiwania (blind index) pacjentów dla wybranego tenanta'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tenant_schema',
+            type=str,
+            help='Schema name tenanta (np. "tenant1", "przychodnia_a")'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Liczba pacjentów przetwarzanych w jednej transakcji (domyślnie: 500)'
+        )
+
+    def handle(self, *args, **options):
+        tenant_schema = options['tenant_schema']
+        batch_size = options['batch_size']
+
+        try:
+            tenant = Tenant.objects.get(schema_name=tenant_schema)
+        except Tenant.DoesNotExist:
+            self.stdout.write(
+                self.style.ERROR(f'Tenant "{tenant_schema}" nie istnieje!')
+            )
+            return
+
+        connection.set_tenant(tenant)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'🏥 Pracuję z tenant: {tenant.name} (schema: {tenant_schema})')
+        )
+
+        key = blind_index.get_index_key()
+        total = Patient.objects.count()
+        processed = 0
+        token_count = 0
+
+        batch = []
+        for patient in Patient.objects.order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(patient)
+            if len(batch) >= batch_size:
+                token_count += self._rebuild_batch(batch, key)
+                processed += len(batch)
+                batch = []
+                self.stdout.write(f'✅ Przetworzono {processed}/{total} pacjentów...')
+
+        if batch:
+            token_count += self._rebuild_batch(batch, key)
+            processed += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'🎉 Zindeksowano {processed} pacjentów ({token_count} wpisów indeksu) w tenant "{tenant.name}"'
+            )
+        )
+
+    def _rebuild_batch(self, patients, key):
+        """Usuwa i tworzy od nowa wpisy indeksu dla paczki pacjentów"""
+        tokens = []
+        for patient in patients:
+            for field, token in blind_index.patient_tokens(
+                patient.first_name_encrypted,
+                patient.last_name_encrypted,
+                patient.pesel_encrypted,
+                key
+            ):
+                tokens.append(PatientSearchToken(patient=patient, field=field, token_hash=token))
+
+        with transaction.atomic():
+            PatientSearchToken.objects.filter(patient__in=patients).delete()
+            PatientSearchToken.objects.bulk_create(tokens, batch_size=1000)
+
+        return len(tokens)
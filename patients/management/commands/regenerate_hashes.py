@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand
+from django_tenants.utils import connection, get_public_schema_name
+from patients import hash_rebuild
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = (
+        'Przebudowuje hasze wyszukiwania i indeks ślepy pacjentów (np. po zmianie PATIENT_SEARCH_SALT) '
+        'dla jednego lub wszystkich tenantów. Postęp jest zapisywany - przerwany przebieg wznawia --resume.'
+    )
+
+    CHECKPOINT = 'regenerate_hashes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tenant_schema',
+            type=str,
+            nargs='?',
+            help='Schema name tenanta (domyślnie: wszyscy tenanci)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Liczba pacjentów przetwarzanych w jednej transakcji (domyślnie: 1000)'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Wznów przerwany przebieg od ostatniego punktu kontrolnego'
+        )
+        parser.add_argument(
+            '--skip-search-index',
+            action='store_true',
+            help='Przebuduj tylko kolumny haszy, bez wpisów indeksu ślepego'
+        )
+
+    def handle(self, *args, **options):
+        tenant_schema = options['tenant_schema']
+
+        if tenant_schema:
+            tenants = Tenant.objects.filter(schema_name=tenant_schema)
+            if not tenants.exists():
+                self.stdout.write(
+                    self.style.ERROR(f'Tenant "{tenant_schema}" nie istnieje!')
+                )
+                return
+        else:
+            tenants = Tenant.objects.exclude(schema_name=get_public_schema_name()).order_by('schema_name')
+
+        total = 0
+        for tenant in list(tenants):
+            total += self._rebuild_tenant(tenant, options)
+
+        self.stdout.write(self.style.SUCCESS(f'🎉 Przebudowano hasze {total} pacjentów'))
+
+    def _rebuild_tenant(self, tenant, options):
+        connection.set_tenant(tenant)
+        self.stdout.write(
+            self.style.SUCCESS(f'🏥 Pracuję z tenant: {tenant.name} (schema: {tenant.schema_name})')
+        )
+
+        def progress(result):
+            self.stdout.write(
+                f'✅ [{tenant.schema_name}] Przetworzono {result.processed} pacjentów '
+                f'({result.rows_per_second:.0f}/s)'
+            )
+
+        result = hash_rebuild.rebuild_hashes(
+            chunk_size=options['chunk_size'],
+            checkpoint=self.CHECKPOINT,
+            resume=options['resume'],
+            search_index=not options['skip_search_index'],
+            progress=progress,
+        )
+
+        if result.resumed_from:
+            self.stdout.write(f'⏳ [{tenant.schema_name}] Wznowiono od pacjenta ID > {result.resumed_from}')
+        if result.invalid_pesels:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'⚠️ [{tenant.schema_name}] Niepoprawny PESEL u {len(result.invalid_pesels)} pacjentów '
+                    f'(ID: {", ".join(map(str, result.invalid_pesels[:20]))})'
+                )
+            )
+        self.stdout.write(
+            f'📊 [{tenant.schema_name}] {result.processed} pacjentów, {result.tokens} wpisów indeksu, '
+            f'{result.elapsed:.1f} s'
+        )
+        return result.processed
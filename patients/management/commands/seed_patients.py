@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from patients.models import Patient
+from patients import pesel_batch
 from tenants.models import Tenant
 from django_tenants.utils import connection
 import random
@@ -93,11 +94,15 @@ class Command(BaseCommand):
         created_count = 0
         skipped_count = 0
         
+        # Losuj płcie i generuj numery PESEL z góry - walidacja wsadowa całej listy
+        plcie = [random.choice(['M', 'K']) for _ in range(count)]
+        pesele = [self.generate_valid_pesel(plec) for plec in plcie]
+        poprawne = pesel_batch.validate_many(pesele)
+        
         with transaction.atomic():
             for i in range(count):
                 try:
-                    # Losuj płeć
-                    plec = random.choice(['M', 'K'])
+                    plec = plcie[i]
                     
                     # Losuj imię na podstawie płci
                     if plec == 'M':
@@ -107,9 +112,8 @@ class Command(BaseCommand):
                     
                     nazwisko = random.choice(nazwiska)
                     
-                    # Generuj prawidłowy PESEL
-                    pesel = self.generate_valid_pesel(plec)
-                    if not pesel:
+                    pesel = pesele[i]
+                    if not poprawne[i]:
                         self.stdout.write(
                             self.style.WARNING(f'Nie udało się wygenerować PESEL dla pacjenta {i+1}')
                         )
@@ -287,13 +291,10 @@ class Command(BaseCommand):
             # Finalny PESEL - 11 cyfr
             pesel = pesel_without_control + str(control_digit)
             
-            # Sprawdź czy mamy 11 cyfr
+            # Sprawdź czy mamy 11 cyfr (sumę kontrolną sprawdza pesel_batch.validate_many)
             if len(pesel) != 11:
                 return None
             
-            # Waliduj używając metody z modelu
-            Patient.validate_pesel(pesel)
-            
             return pesel
             
         except Exception as e:
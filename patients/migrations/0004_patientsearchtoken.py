@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-17 03:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0003_remove_patient_pesel_search_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('first_name', 'Imię'), ('last_name', 'Nazwisko'), ('pesel', 'PESEL')], max_length=10, verbose_name='Pole')),
+                ('token_hash', models.CharField(help_text='HMAC prefiksu lub n-gramu wartości pola', max_length=32, verbose_name='Skrót fragmentu')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='patients.patient', verbose_name='Pacjent')),
+            ],
+            options={
+                'verbose_name': 'Wpis indeksu wyszukiwania',
+                'verbose_name_plural': 'Indeks wyszukiwania pacjentów',
+                'db_table': 'tenant_schema_patientsearchtokens',
+                'indexes': [models.Index(fields=['token_hash', 'field', 'patient'], name='tenant_sche_token_h_f8fb5d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.3 on 2026-10-17 03:27
+
+from django.db import migrations, models
+
+from patients import sort_keys
+
+
+def populate_sort_keys(apps, schema_editor):
+    Patient = apps.get_model('patients', 'Patient')
+    batch = []
+    for patient in Patient.objects.using(schema_editor.connection.alias).iterator(chunk_size=1000):
+        patient.name_sort_key = sort_keys.name_sort_key(patient.first_name_encrypted, patient.last_name_encrypted)
+        patient.pesel_sort_key = sort_keys.pesel_sort_key(patient.pesel_encrypted)
+        batch.append(patient)
+        if len(batch) >= 1000:
+            Patient.objects.bulk_update(batch, ['name_sort_key', 'pesel_sort_key'])
+            batch = []
+    if batch:
+        Patient.objects.bulk_update(batch, ['name_sort_key', 'pesel_sort_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0004_patientsearchtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='name_sort_key',
+            field=models.CharField(blank=True, help_text='Skrócony klucz kolacji - nie pozwala odtworzyć danych', max_length=24, null=True, verbose_name='Klucz sortowania nazwiska i imienia'),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='pesel_sort_key',
+            field=models.CharField(blank=True, help_text='Część PESEL z datą urodzenia', max_length=6, null=True, verbose_name='Klucz sortowania PESEL'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['name_sort_key', 'id'], name='tenant_sche_name_so_c3d3f5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['pesel_sort_key', 'id'], name='tenant_sche_pesel_s_ac11a8_idx'),
+        ),
+        migrations.RunPython(populate_sort_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-17 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0005_patient_sort_keys'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['created_at', 'id'], name='tenant_sche_created_6d9a05_idx'),
+        ),
+    ]
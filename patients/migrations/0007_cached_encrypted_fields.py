@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-17 03:30
+
+import zrowie.decryption
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0006_patient_tenant_sche_created_6d9a05_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='patient',
+            name='first_name_encrypted',
+            field=zrowie.decryption.CachedEncryptedCharField(blank=True, null=True, verbose_name='Zaszyfrowane imię'),
+        ),
+        migrations.AlterField(
+            model_name='patient',
+            name='last_name_encrypted',
+            field=zrowie.decryption.CachedEncryptedCharField(blank=True, null=True, verbose_name='Zaszyfrowane nazwisko'),
+        ),
+        migrations.AlterField(
+            model_name='patient',
+            name='pesel_encrypted',
+            field=zrowie.decryption.CachedEncryptedCharField(blank=True, help_text='PESEL pacjenta w formie zaszyfrowanej', null=True, verbose_name='Zaszyfrowany PESEL'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-17 03:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0007_cached_encrypted_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HashRebuildCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nazwa przebiegu')),
+                ('last_pk', models.BigIntegerField(default=0, help_text='Przebieg wznawiany jest od pacjentów o większym ID', verbose_name='Ostatni przetworzony pacjent')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Przetworzonych pacjentów')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Rozpoczęto')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Ostatnia aktualizacja')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Zakończono')),
+            ],
+            options={
+                'verbose_name': 'Punkt kontrolny przebudowy haszy',
+                'verbose_name_plural': 'Punkty kontrolne przebudowy haszy',
+                'db_table': 'tenant_schema_hashrebuildcheckpoints',
+            },
+        ),
+    ]
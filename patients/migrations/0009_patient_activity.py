@@ -0,0 +1,60 @@
+# Generated by Django 5.2.3 on 2026-10-17 04:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from patients import activity
+
+
+def populate_activity(apps, schema_editor):
+    Patient = apps.get_model('patients', 'Patient')
+    VisitCard = apps.get_model('visits', 'VisitCard')
+    Measurement = apps.get_model('examinations', 'Measurement')
+    Patient.objects.using(schema_editor.connection.alias).update(
+        **activity.activity_values(VisitCard, Measurement)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examinations', '0001_initial'),
+        ('patients', '0008_hashrebuildcheckpoint'),
+        ('visits', '0004_visitcard_tenant_sche_created_7c34c5_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='active_visit_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Aktywne karty wizyt'),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='last_measurement_date',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Ostatni pomiar'),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='last_visit_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Ostatnia wizyta'),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='open_40plus_card',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='visits.visitcard', verbose_name='Otwarta karta 40+'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(models.OrderBy(models.F('last_visit_at'), descending=True, nulls_last=True), models.OrderBy(models.F('id'), descending=True), name='tenant_sche_last_vi_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['active_visit_count'], name='tenant_sche_active__3df19c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['last_measurement_date'], name='tenant_sche_last_me_a2e974_idx'),
+        ),
+        migrations.RunPython(populate_activity, migrations.RunPython.noop),
+    ]
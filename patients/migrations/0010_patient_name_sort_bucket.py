@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+from patients import sort_keys
+
+
+def populate_name_buckets(apps, schema_editor):
+    """Zastępuje skrócone klucze kolacji kubełkami pierwszej litery nazwiska"""
+    Patient = apps.get_model('patients', 'Patient')
+    batch = []
+    for patient in Patient.objects.using(schema_editor.connection.alias).iterator(chunk_size=1000):
+        patient.name_sort_key = sort_keys.name_sort_key(patient.first_name_encrypted, patient.last_name_encrypted)
+        batch.append(patient)
+        if len(batch) >= 1000:
+            Patient.objects.bulk_update(batch, ['name_sort_key'])
+            batch = []
+    if batch:
+        Patient.objects.bulk_update(batch, ['name_sort_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0009_patient_activity'),
+    ]
+
+    operations = [
+        # Najpierw dane - krótsza kolumna nie zmieściłaby starych kluczy
+        migrations.RunPython(populate_name_buckets, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='patient',
+            name='name_sort_key',
+            field=models.CharField(
+                blank=True,
+                help_text='Kod pierwszej litery nazwiska - ujawnia tylko tę literę',
+                max_length=2,
+                null=True,
+                verbose_name='Kubełek sortowania nazwiska',
+            ),
+        ),
+    ]
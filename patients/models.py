@@ -1,14 +1,112 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import RegexValidator
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from datetime import date
-from encrypted_model_fields.fields import EncryptedCharField
+from django.db.models.query import ModelIterable
+from zrowie import decryption
+from zrowie.decryption import CachedEncryptedCharField
 import hashlib
+import itertools
 from django.conf import settings
+from . import blind_index, sort_keys
 
 
-class PatientManager(models.Manager):
+class DecryptedModelIterable(ModelIterable):
+    """
+    Iterator modeli, który odszyfrowuje zaszyfrowane kolumny całej paczki
+    wierszy naraz zamiast pojedynczo w from_db_value.
+    
+    Przy iterator(chunk_size=...) paczką jest każda pobrana porcja wierszy,
+    więc pamięć pozostaje ograniczona do jednej porcji.
+    """
+    
+    def __iter__(self):
+        rows = super().__iter__()
+        chunk_size = self.chunk_size if self.chunked_fetch else None
+        while True:
+            instances = list(itertools.islice(rows, chunk_size))
+            if not instances:
+                return
+            self._decrypt(instances)
+            yield from instances
+            if chunk_size is None:
+                return
+    
+    def _decrypt(self, instances):
+        fields = self.queryset._decrypted_fields
+        
+        ciphertexts = []
+        for instance in instances:
+            for field in fields:
+                ciphertexts.append(instance.__dict__.pop(_raw_alias(field)))
+        
+        plain = iter(decryption.decrypt_many(ciphertexts, workers=self.queryset._decrypt_workers))
+        for instance in instances:
+            for field in fields:
+                instance.__dict__[field] = next(plain)
+
+
+def _raw_alias(field):
+    return f'_raw_{field}'
+
+
+def create_search_hash(value):
+    """Hash do wyszukiwania: SHA-256 z salt z settings i znormalizowanej wartości"""
+    if not value:
+        return None
+    
+    # Używamy salt z settings + wartość
+    salt = getattr(settings, 'PATIENT_SEARCH_SALT', 'default_salt')
+    hash_input = f"{salt}{value.lower().strip()}"
+    return hashlib.sha256(hash_input.encode()).hexdigest()
+
+
+class PatientQuerySet(models.QuerySet):
+    """QuerySet pacjentów z odszyfrowywaniem wsadowym"""
+    
+    _decrypted_fields = ()
+    _decrypt_workers = None
+    
+    def with_decrypted(self, workers=None):
+        """
+        Odszyfrowuje imię, nazwisko i PESEL całej strony wyników w jednym przebiegu.
+        
+        Kolumny są pobierane jako surowy szyfrogram (bez konwersji pola)
+        i odszyfrowywane wsadowo po pobraniu wierszy. Dla dużych eksportów
+        można podać `workers` - liczbę wątków do odszyfrowywania.
+        """
+        fields = [
+            field.attname for field in self.model._meta.concrete_fields
+            if isinstance(field, CachedEncryptedCharField)
+        ]
+        clone = self.defer(*fields).annotate(**{
+            _raw_alias(field): models.ExpressionWrapper(models.F(field), output_field=models.TextField())
+            for field in fields
+        })
+        clone._decrypted_fields = tuple(fields)
+        clone._decrypt_workers = workers
+        clone._iterable_class = DecryptedModelIterable
+        return clone
+    
+    def with_40plus_eligibility(self, today=None):
+        """Dodaje flagę eligible_40plus (i warunki cząstkowe) - patrz patients.eligibility"""
+        from . import eligibility
+        return eligibility.annotate(self, today)
+    
+    def eligible_for_40plus(self, today=None):
+        """Pacjenci, którzy mogą rozpocząć wizytę 40+ - jedno zapytanie dla całego tenanta"""
+        from . import eligibility
+        return eligibility.eligible(self, today)
+    
+    def _clone(self):
+        clone = super()._clone()
+        clone._decrypted_fields = self._decrypted_fields
+        clone._decrypt_workers = self._decrypt_workers
+        return clone
+
+
+class PatientManager(models.Manager.from_queryset(PatientQuerySet)):
     """Custom manager dla wyszukiwania pacjentów po zaszyfrowanych danych"""
     
     def search_by_pesel(self, pesel):
@@ -44,15 +142,48 @@ class PatientManager(models.Manager):
             )
         return self.none()
     
+    def search(self, query):
+        """
+        Wyszukiwanie podciągu w imieniu, nazwisku lub PESEL po indeksie ślepym.
+        Każde słowo zapytania musi pasować - nie odszyfrowujemy żadnych rekordów.
+        """
+        queryset = self.get_queryset()
+        key = blind_index.get_index_key()
+        for term in blind_index.query_terms(query):
+            queryset = queryset.filter(self._search_term_condition(term, key))
+        return queryset
+    
+    def _search_term_condition(self, term, key):
+        """Warunek dla pojedynczego słowa zapytania"""
+        term_hash = self._create_search_hash(term)
+        if term.isdigit():
+            fields = [blind_index.FIELD_PESEL]
+            condition = models.Q(pesel_hash=term_hash)
+        else:
+            fields = blind_index.NAME_FIELDS
+            condition = models.Q(first_name_hash=term_hash) | models.Q(last_name_hash=term_hash)
+        
+        hashes = set()
+        for field in fields:
+            hashes |= blind_index.term_tokens(field, term, key)
+        
+        # Liczba różnych fragmentów słowa - taka sama dla każdego pola
+        required = len(blind_index.term_tokens(fields[0], term, key))
+        
+        # Pacjent pasuje, gdy w jednym polu występują wszystkie skróty słowa
+        matching = (
+            PatientSearchToken.objects
+            .filter(token_hash__in=hashes)
+            .values('patient_id', 'field')
+            .annotate(matched=models.Count('token_hash', distinct=True))
+            .filter(matched=required)
+            .values('patient_id')
+        )
+        return condition | models.Q(pk__in=matching)
+    
     def _create_search_hash(self, value):
         """Tworzy hash do wyszukiwania"""
-        if not value:
-            return None
-        
-        # Używamy salt z settings + wartość
-        salt = getattr(settings, 'PATIENT_SEARCH_SALT', 'default_salt')
-        hash_input = f"{salt}{value.lower().strip()}"
-        return hashlib.sha256(hash_input.encode()).hexdigest()
+        return create_search_hash(value)
 
 
 class Patient(models.Model):
@@ -64,7 +195,7 @@ class Patient(models.Model):
     ]
     
     # Zaszyfrowane pola (nullable dla migracji istniejących danych)
-    pesel_encrypted = EncryptedCharField(
+    pesel_encrypted = CachedEncryptedCharField(
         max_length=11,
         null=True,
         blank=True,
@@ -72,14 +203,14 @@ class Patient(models.Model):
         help_text='PESEL pacjenta w formie zaszyfrowanej'
     )
     
-    first_name_encrypted = EncryptedCharField(
+    first_name_encrypted = CachedEncryptedCharField(
         max_length=100,
         null=True,
         blank=True,
         verbose_name='Zaszyfrowane imię'
     )
     
-    last_name_encrypted = EncryptedCharField(
+    last_name_encrypted = CachedEncryptedCharField(
         max_length=100,
         null=True,
         blank=True,
@@ -114,6 +245,23 @@ class Patient(models.Model):
         help_text='Hash nazwiska używany tylko do wyszukiwania'
     )
     
+    # Klucze sortowania zaszyfrowanych pól (ORDER BY po stronie bazy)
+    name_sort_key = models.CharField(
+        max_length=sort_keys.NAME_SORT_KEY_LENGTH,
+        null=True,
+        blank=True,
+        verbose_name='Kubełek sortowania nazwiska',
+        help_text='Kod pierwszej litery nazwiska - ujawnia tylko tę literę'
+    )
+    
+    pesel_sort_key = models.CharField(
+        max_length=sort_keys.PESEL_SORT_KEY_LENGTH,
+        null=True,
+        blank=True,
+        verbose_name='Klucz sortowania PESEL',
+        help_text='Część PESEL z datą urodzenia'
+    )
+    
     # Niezaszyfrowane pola kontaktowe
     email = models.EmailField(
         max_length=255,
@@ -147,6 +295,37 @@ class Patient(models.Model):
         help_text='Automatycznie wyciągana z PESEL'
     )
     
+    # Aktywność - zdenormalizowane z kart wizyt i pomiarów (patients/activity.py)
+    last_visit_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Ostatnia wizyta'
+    )
+    
+    open_40plus_card = models.ForeignKey(
+        'visits.VisitCard',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+        verbose_name='Otwarta karta 40+'
+    )
+    
+    active_visit_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Aktywne karty wizyt'
+    )
+    
+    last_measurement_date = models.DateField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Ostatni pomiar'
+    )
+    
     # Timestamps
     created_at = models.DateTimeField(
         auto_now_add=True,
@@ -161,6 +340,12 @@ class Patient(models.Model):
     # Custom manager
     objects = PatientManager()
     
+    # Pola, których zmiana wymaga przebudowy indeksu wyszukiwania
+    SEARCH_INDEX_FIELDS = {'first_name_encrypted', 'last_name_encrypted', 'pesel_encrypted'}
+    
+    # Kolumny aktywności liczone z kart wizyt i pomiarów (patients/activity.py)
+    ACTIVITY_FIELDS = ['last_visit_at', 'open_40plus_card', 'active_visit_count', 'last_measurement_date']
+    
     class Meta:
         db_table = 'tenant_schema_patients'
         verbose_name = 'Pacjent'
@@ -172,6 +357,16 @@ class Patient(models.Model):
             models.Index(fields=['last_name_hash']),
             models.Index(fields=['date_of_birth']),
             models.Index(fields=['gender']),
+            models.Index(fields=['name_sort_key', 'id']),
+            models.Index(fields=['pesel_sort_key', 'id']),
+            models.Index(fields=['created_at', 'id']),
+            # Lista sortowana od ostatniej wizyty, pacjenci bez wizyt na końcu
+            models.Index(
+                models.F('last_visit_at').desc(nulls_last=True), models.F('id').desc(),
+                name='tenant_sche_last_vi_desc_idx'
+            ),
+            models.Index(fields=['active_visit_count']),
+            models.Index(fields=['last_measurement_date']),
         ]
     
     def __str__(self):
@@ -192,26 +387,7 @@ class Patient(models.Model):
     @property
     def can_start_40plus_visit(self):
         """Sprawdza czy pacjent może przystąpić do wizyty 40+ (raz na rok)"""
-        from datetime import datetime, timedelta
-        from visits.models import VisitCard
-        
-
-        has_open_40plus = self.visit_cards.filter(
-            visit_type__name='40+',
-            is_cancelled=False
-        ).exists()
-        
-        if has_open_40plus or self.age < 40:
-            return False
-        
-        one_year_ago = datetime.now().date() - timedelta(days=365)
-        recent_40plus = self.visit_cards.filter(
-            visit_type__name='40+',
-            visit_status='zakończone',
-            visit_completed_date__gte=one_year_ago
-        ).exists()
-        
-        return not recent_40plus
+        return type(self).objects.filter(pk=self.pk).eligible_for_40plus().exists()
 
     @property
     def current_40plus_visit(self):
@@ -273,16 +449,44 @@ class Patient(models.Model):
         if self.last_name_encrypted:
             self.last_name_hash = self._create_search_hash(self.last_name_encrypted.lower())
         
-        super().save(*args, **kwargs)
+        # Klucze sortowania
+        self.name_sort_key = sort_keys.name_sort_key(self.first_name_encrypted, self.last_name_encrypted)
+        self.pesel_sort_key = sort_keys.pesel_sort_key(self.pesel_encrypted)
+        
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Instancja mogła zostać wczytana przed zmianą kart wizyt - zapisane z niej
+            # kolumny aktywności przeliczamy od nowa, zanim zapis stanie się widoczny
+            if update_fields is None or set(update_fields) & set(self.ACTIVITY_FIELDS):
+                self.refresh_activity()
+        
+        if update_fields is None or set(update_fields) & self.SEARCH_INDEX_FIELDS:
+            self.update_search_index()
+    
+    def refresh_activity(self):
+        """Przelicza kolumny aktywności w bazie i wczytuje je do instancji"""
+        from . import activity
+        activity.refresh([self.pk])
+        self.refresh_from_db(fields=self.ACTIVITY_FIELDS)
+    
+    def update_search_index(self):
+        """Przebudowuje wpisy indeksu ślepego pacjenta"""
+        tokens = blind_index.patient_tokens(
+            self.first_name_encrypted,
+            self.last_name_encrypted,
+            self.pesel_encrypted
+        )
+        with transaction.atomic():
+            self.search_tokens.all().delete()
+            PatientSearchToken.objects.bulk_create([
+                PatientSearchToken(patient=self, field=field, token_hash=token)
+                for field, token in tokens
+            ])
     
     def _create_search_hash(self, value):
         """Tworzy hash do wyszukiwania"""
-        if not value:
-            return None
-        
-        salt = getattr(settings, 'PATIENT_SEARCH_SALT', 'default_salt')
-        hash_input = f"{salt}{value.lower().strip()}"
-        return hashlib.sha256(hash_input.encode()).hexdigest()
+        return create_search_hash(value)
     
     @staticmethod
     def validate_pesel(pesel):
@@ -370,6 +574,46 @@ class Patient(models.Model):
         return cls.objects.search_by_full_name(full_name)
 
 
+class PatientSearchToken(models.Model):
+    """Wpis indeksu ślepego - skrót HMAC fragmentu imienia, nazwiska lub PESEL"""
+    
+    FIELD_CHOICES = [
+        (blind_index.FIELD_FIRST_NAME, 'Imię'),
+        (blind_index.FIELD_LAST_NAME, 'Nazwisko'),
+        (blind_index.FIELD_PESEL, 'PESEL'),
+    ]
+    
+    patient = models.ForeignKey(
+        Patient,
+        on_delete=models.CASCADE,
+        related_name='search_tokens',
+        verbose_name='Pacjent'
+    )
+    
+    field = models.CharField(
+        max_length=10,
+        choices=FIELD_CHOICES,
+        verbose_name='Pole'
+    )
+    
+    token_hash = models.CharField(
+        max_length=blind_index.TOKEN_LENGTH,
+        verbose_name='Skrót fragmentu',
+        help_text='HMAC prefiksu lub n-gramu wartości pola'
+    )
+    
+    class Meta:
+        db_table = 'tenant_schema_patientsearchtokens'
+        verbose_name = 'Wpis indeksu wyszukiwania'
+        verbose_name_plural = 'Indeks wyszukiwania pacjentów'
+        indexes = [
+            models.Index(fields=['token_hash', 'field', 'patient']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_field_display()} #{self.patient_id}"
+
+
 class ProgramParticipationHistory(models.Model):
     """Historia uczestnictwa pacjentów w programach profilaktycznych"""
     
@@ -419,4 +663,53 @@ class ProgramParticipationHistory(models.Model):
     @property
     def years_since_participation(self):
         """Oblicza ile lat minęło od uczestnictwa"""
-        return timezone.now().year - self.participation_year
\ No newline at end of file
+        return timezone.now().year - self.participation_year
+
+
+class HashRebuildCheckpoint(models.Model):
+    """Postęp przebudowy haszy wyszukiwania - pozwala wznowić przerwany przebieg"""
+    
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Nazwa przebiegu'
+    )
+    
+    last_pk = models.BigIntegerField(
+        default=0,
+        verbose_name='Ostatni przetworzony pacjent',
+        help_text='Przebieg wznawiany jest od pacjentów o większym ID'
+    )
+    
+    processed = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Przetworzonych pacjentów'
+    )
+    
+    started_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Rozpoczęto'
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Ostatnia aktualizacja'
+    )
+    
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Zakończono'
+    )
+    
+    class Meta:
+        db_table = 'tenant_schema_hashrebuildcheckpoints'
+        verbose_name = 'Punkt kontrolny przebudowy haszy'
+        verbose_name_plural = 'Punkty kontrolne przebudowy haszy'
+    
+    def __str__(self):
+        return f"{self.name}: {self.processed} (ID > {self.last_pk})"
+    
+    @property
+    def is_finished(self):
+        return self.finished_at is not None
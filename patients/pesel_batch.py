@@ -0,0 +1,129 @@
+"""
+Wsadowa walidacja i dekodowanie numerów PESEL.
+
+Patient.validate_pesel i Patient.extract_pesel_data obsługują jeden numer
+w pętli Pythona. Przy imporcie, generowaniu danych i regeneracji haszy
+numery przetwarzamy całymi tablicami: PESEL-e zamieniane są na macierz
+cyfr (uint8, n x 11), a suma kontrolna, data urodzenia i płeć liczone są
+operacjami NumPy na kolumnach.
+
+Wyniki są zgodne ze ścieżką skalarną - numer jest poprawny wtedy i tylko
+wtedy, gdy Patient.extract_pesel_data nie zgłasza błędu. Komunikat błędu
+dla pojedynczego numeru daje error_message().
+"""
+from typing import NamedTuple
+
+import numpy as np
+from django.core.exceptions import ValidationError
+
+
+PESEL_LENGTH = 11
+WEIGHTS = np.array([1, 3, 7, 9, 1, 3, 7, 9, 1, 3], dtype=np.int32)
+
+_PLACEHOLDER = '0' * PESEL_LENGTH
+
+# Kodowanie stulecia w miesiącu: (miesiąc większy niż, rok bazowy)
+CENTURIES = ((80, 1800), (60, 2200), (40, 2100), (20, 2000), (0, 1900))
+
+
+class DecodedPesels(NamedTuple):
+    """Wynik decode_many - tablice tej samej długości co wejście"""
+    valid: np.ndarray  # bool - poprawny format, suma kontrolna i data
+    birth_dates: np.ndarray  # datetime64[D], NaT dla niepoprawnych
+    genders: np.ndarray  # 'K' / 'M', '' dla niepoprawnych
+
+    def birth_date(self, i):
+        """Data urodzenia i-tego numeru jako datetime.date (albo None)"""
+        return self.birth_dates[i].item() if self.valid[i] else None
+
+    def gender(self, i):
+        return str(self.genders[i]) if self.valid[i] else None
+
+
+def digit_matrix(pesels):
+    """
+    Zamienia listę PESEL-i na macierz cyfr
+
+    Returns:
+        (macierz uint8 n x 11, maska bool numerów złożonych z 11 cyfr)
+    """
+    pesels = ['' if p is None else str(p) for p in pesels]
+    lengths = np.fromiter(map(len, pesels), dtype=np.int64, count=len(pesels))
+    well_formed = lengths == PESEL_LENGTH
+    if not well_formed.all():
+        pesels = [p if ok else _PLACEHOLDER for p, ok in zip(pesels, well_formed)]
+
+    # latin-1 z zamianą daje dokładnie jeden bajt na znak, więc każdy wiersz ma 11 bajtów
+    buffer = ''.join(pesels).encode('latin-1', errors='replace')
+    digits = np.frombuffer(buffer, dtype=np.uint8).reshape(len(pesels), PESEL_LENGTH) - ord('0')
+    # Znaki spoza 0-9 po odjęciu '0' przekręcają się poza zakres 0..9
+    well_formed &= (digits <= 9).all(axis=1)
+    return digits, well_formed
+
+
+def _checksum_valid(digits, well_formed):
+    control = (10 - (digits[:, :10].astype(np.int32) @ WEIGHTS) % 10) % 10
+    return well_formed & (control == digits[:, 10])
+
+
+def validate_many(pesels):
+    """
+    Wsadowy odpowiednik Patient.validate_pesel
+
+    Returns:
+        Tablica bool - czy numer ma 11 cyfr i poprawną sumę kontrolną
+    """
+    if not len(pesels):
+        return np.zeros(0, dtype=bool)
+    return _checksum_valid(*digit_matrix(pesels))
+
+
+def decode_many(pesels):
+    """
+    Wsadowy odpowiednik Patient.extract_pesel_data
+
+    Returns:
+        DecodedPesels z maską poprawnych numerów, datami urodzenia i płcią
+    """
+    if not len(pesels):
+        return DecodedPesels(
+            np.zeros(0, dtype=bool), np.zeros(0, dtype='datetime64[D]'), np.zeros(0, dtype='<U1')
+        )
+
+    digits, well_formed = digit_matrix(pesels)
+    valid = _checksum_valid(digits, well_formed)
+
+    d = digits.astype(np.int32)
+    year = d[:, 0] * 10 + d[:, 1]
+    coded_month = d[:, 2] * 10 + d[:, 3]
+    day = d[:, 4] * 10 + d[:, 5]
+
+    conditions = [coded_month > threshold for threshold, _ in CENTURIES]
+    offset = np.select(conditions, [threshold for threshold, _ in CENTURIES])
+    full_year = year + np.select(conditions, [base for _, base in CENTURIES])
+    month = coded_month - offset
+
+    valid &= (month >= 1) & (month <= 12) & (day >= 1)
+    month_start = ((full_year - 1970) * 12 + np.clip(month, 1, 12) - 1).astype('datetime64[M]')
+    days_in_month = ((month_start + 1).astype('datetime64[D]') - month_start.astype('datetime64[D]')).astype(np.int32)
+    valid &= day <= days_in_month
+
+    birth_dates = month_start.astype('datetime64[D]') + (day - 1)
+    birth_dates[~valid] = np.datetime64('NaT')
+
+    # Parzysta przedostatnia cyfra = kobieta
+    genders = np.where(d[:, 9] % 2 == 0, 'K', 'M')
+    genders[~valid] = ''
+
+    return DecodedPesels(valid, birth_dates, genders)
+
+
+def error_message(pesel):
+    """Komunikat błędu ścieżki skalarnej dla niepoprawnego numeru (None dla poprawnego)"""
+    from .models import Patient
+
+    try:
+        Patient.extract_pesel_data(pesel)
+    except ValidationError as e:
+        return '; '.join(e.messages)
+    return None
@@ -0,0 +1,23 @@
+"""
+Podsumowanie operacji wsadowych na pacjentach (import, przebudowy haszy
+i aktywności) - wspólne dla wyników komend i zadań w tle.
+"""
+from dataclasses import dataclass
+
+
+@dataclass
+class BatchResult:
+    """Liczba przetworzonych wierszy i czas operacji wsadowej"""
+    processed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        """Wynik serializowalny do JSON (np. jako wynik zadania w tle)"""
+        return {
+            'count': self.processed,
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
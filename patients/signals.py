@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from examinations.models import Measurement
+from visits.models import VisitCard
+
+from . import activity
+
+
+@receiver(pre_save, sender=VisitCard)
+def remember_previous_patient(sender, instance, update_fields=None, **kwargs):
+    # Karta przepięta do innego pacjenta - poprzedni też wymaga przeliczenia
+    instance._previous_patient_id = None
+    if instance.pk and (update_fields is None or 'patient' in update_fields):
+        instance._previous_patient_id = (
+            VisitCard.objects.filter(pk=instance.pk).values_list('patient_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=VisitCard)
+@receiver(post_delete, sender=VisitCard)
+def refresh_visit_card_activity(sender, instance, **kwargs):
+    patient_ids = {instance.patient_id, getattr(instance, '_previous_patient_id', None)} - {None}
+    activity.refresh(patient_ids)
+
+
+@receiver(post_save, sender=Measurement)
+@receiver(post_delete, sender=Measurement)
+def refresh_measurement_activity(sender, instance, **kwargs):
+    activity.refresh(VisitCard.objects.filter(pk=instance.visit_card_id).values('patient_id'))
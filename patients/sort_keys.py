@@ -0,0 +1,146 @@
+"""
+Klucze sortowania dla zaszyfrowanych pól pacjenta.
+
+Szyfrogramy nie zachowują porządku. Obok nich w bazie przechowujemy tylko
+zgrubny kubełek sortowania nazwiska - kod jego pierwszej litery w polskim
+alfabecie. Kubełek ujawnia jedną literę, więc z kolumny nie da się odtworzyć
+nazwiska ani imienia. Baza porządkuje i dzieli listę po kubełkach, a dokładną
+kolejność w obrębie kubełka ustala SortedByBucket po odszyfrowaniu - dla
+strony listy odszyfrowywane są tylko kubełki, które ją obejmują.
+"""
+import unicodedata
+
+from django.db import models
+
+
+# Polska kolejność alfabetyczna
+ALPHABET = 'aąbcćdeęfghijklłmnńoópqrsśtuvwxyzźż'
+
+# Ile pierwszych liter nazwiska trafia do kubełka zapisywanego w bazie
+NAME_BUCKET_CHARS = 1
+
+# Każdy znak kodujemy jako dwie cyfry - porządek cyfr jest taki sam
+# niezależnie od kolacji bazy danych
+_SEPARATOR_CODE = '00'
+_OTHER_CODE = '99'
+_CODES = {letter: f"{i + 1:02d}" for i, letter in enumerate(ALPHABET)}
+
+NAME_SORT_KEY_LENGTH = NAME_BUCKET_CHARS * 2
+PESEL_SORT_KEY_LENGTH = 6
+
+
+def _char_code(char):
+    """Zwraca dwucyfrowy kod znaku zgodny z polską kolejnością"""
+    if char in _CODES:
+        return _CODES[char]
+    if char.isspace() or char in "-'":
+        return _SEPARATOR_CODE
+    # Litery spoza polskiego alfabetu (np. é, ü) sprowadzamy do litery bazowej
+    base = unicodedata.normalize('NFKD', char)[:1]
+    return _CODES.get(base, _OTHER_CODE)
+
+
+def collation_key(value, length=None):
+    """
+    Klucz kolacji wartości zgodny z polską kolejnością alfabetyczną
+
+    Przy podanym `length` klucz obejmuje tyle pierwszych znaków i ma stałą
+    długość (krótsze wartości są dopełniane separatorem).
+    """
+    value = ' '.join((value or '').lower().split())
+    if length is None:
+        return ''.join(_char_code(char) for char in value)
+    codes = [_char_code(char) for char in value[:length]]
+    codes.append(_SEPARATOR_CODE * (length - len(codes)))
+    return ''.join(codes)
+
+
+def name_sort_key(first_name, last_name):
+    """Kubełek sortowania 'nazwisko, imię' zapisywany w bazie - kod pierwszej litery nazwiska"""
+    return collation_key(last_name, NAME_BUCKET_CHARS)
+
+
+def name_collation_key(first_name, last_name):
+    """Pełny klucz 'nazwisko, imię' do sortowania odszyfrowanych danych (nie jest zapisywany)"""
+    return collation_key(last_name) + _SEPARATOR_CODE + collation_key(first_name)
+
+
+def pesel_sort_key(pesel):
+    """
+    Klucz sortowania PESEL - część z datą urodzenia (RRMMDD).
+    Nie ujawnia niczego ponad to, co już jest w kolumnie date_of_birth.
+    """
+    if not pesel:
+        return None
+    return str(pesel)[:PESEL_SORT_KEY_LENGTH]
+
+
+class SortedByBucket:
+    """
+    Wyniki querysetu posortowane kluczem liczonym po odszyfrowaniu
+
+    Baza zwraca liczności kubełków (GROUP BY po kolumnie kubełka), a dla
+    żądanego wycinka pobierane są tylko kubełki, które go obejmują; wiersze
+    tych kubełków sortowane są w Pythonie funkcją `key`. Obiekt udaje listę
+    na potrzeby django.core.paginator.Paginator (count() i wycinki).
+    """
+
+    def __init__(self, queryset, bucket_field, key, reverse=False):
+        self.queryset = queryset.order_by()
+        self.bucket_field = bucket_field
+        self.key = key
+        self.reverse = reverse
+        self._buckets = None
+
+    def buckets(self):
+        """Lista (kubełek, liczba wierszy) w kolejności sortowania"""
+        if self._buckets is None:
+            counts = dict(
+                self.queryset.values_list(self.bucket_field)
+                .annotate(rows=models.Count('pk'))
+                .values_list(self.bucket_field, 'rows')
+            )
+            # Pacjenci bez kubełka (brak nazwiska) na końcu, jak NULL w ORDER BY
+            order = sorted(bucket for bucket in counts if bucket is not None)
+            if None in counts:
+                order.append(None)
+            if self.reverse:
+                order.reverse()
+            self._buckets = [(bucket, counts[bucket]) for bucket in order]
+        return self._buckets
+
+    def count(self):
+        return sum(rows for bucket, rows in self.buckets())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+
+        selected, offset, position = [], None, 0
+        for bucket, rows in self.buckets():
+            if position + rows > start and position < stop:
+                selected.append(bucket)
+                if offset is None:
+                    offset = position
+            position += rows
+        if not selected:
+            return []
+
+        condition = models.Q(**{f'{self.bucket_field}__in': [b for b in selected if b is not None]})
+        if None in selected:
+            condition |= models.Q(**{f'{self.bucket_field}__isnull': True})
+        # Sortujemy rosnąco i ewentualnie odwracamy całość - kubełki i klucze razem
+        natural = selected[::-1] if self.reverse else selected
+        rank = {bucket: i for i, bucket in enumerate(natural)}
+        rows = sorted(
+            self.queryset.filter(condition),
+            key=lambda obj: (rank[getattr(obj, self.bucket_field)], self.key(obj), obj.pk),
+            reverse=self.reverse
+        )
+        return rows[start - offset:stop - offset]
@@ -1,3 +1,617 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.core.paginator import Paginator
+from django.test import RequestFactory, SimpleTestCase
+from unittest import skipUnless
+from django.test.utils import CaptureQueriesContext
+from django_tenants.test.cases import TenantTestCase
+from zrowie import decryption
+
+from . import blind_index, bulk_import, hash_rebuild, jobs as patient_jobs, sort_keys
+from .models import HashRebuildCheckpoint, Patient, PatientSearchToken, ProgramParticipationHistory
+
+
+def make_pesel(number, birth='800101'):
+    """PESEL z poprawną cyfrą kontrolną (number - numer porządkowy z płcią)"""
+    digits = f'{birth}{number:04d}'
+    weights = [1, 3, 7, 9, 1, 3, 7, 9, 1, 3]
+    checksum = sum(int(d) * w for d, w in zip(digits, weights)) % 10
+    return digits + str((10 - checksum) % 10)
+
+
+def create_patients(count, start=0):
+    return [
+        Patient.objects.create(
+            pesel_encrypted=make_pesel(start + i),
+            first_name_encrypted='Jan',
+            last_name_encrypted=f'Kowalski{start + i}',
+        )
+        for i in range(count)
+    ]
+
+
+class AdminQueryCountMixin:
+    """
+    Liczy zapytania wyrenderowanej listy admina.
+
+    Lista musi wykonywać stałą liczbę zapytań niezależnie od liczby wierszy
+    na stronie (brak N+1) i nie więcej niż ustalony limit.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        # OTPAdminSite wymaga sesji zweryfikowanej kodem 2FA
+        self.admin_user.is_verified = lambda: True
+
+    def changelist_queries(self, model, params=None):
+        request = RequestFactory().get('/admin/', params or {})
+        request.user = self.admin_user
+        model_admin = admin.site._registry[model]
+        with CaptureQueriesContext(connection) as queries:
+            model_admin.changelist_view(request).render()
+        # django-tenants ustawia search_path przed zapytaniami - nie liczymy tego
+        return len([query for query in queries if not query['sql'].startswith('SET search_path')])
+
+    def assertChangelistQueries(self, model, max_queries, add_rows, params=None):
+        add_rows(2)
+        few = self.changelist_queries(model, params)
+        add_rows(10)
+        many = self.changelist_queries(model, params)
+
+        self.assertEqual(few, many, f'Lista {model.__name__}: liczba zapytań rośnie z liczbą wierszy')
+        self.assertLessEqual(many, max_queries, f'Lista {model.__name__}: za dużo zapytań')
+
+
+class PatientAdminQueryCountTests(AdminQueryCountMixin, TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.created = 0
+
+    def add_patients(self, count):
+        create_patients(count, start=self.created)
+        self.created += count
+
+    def add_history(self, count):
+        year = 2000 + self.created
+        for patient in create_patients(count, start=self.created):
+            ProgramParticipationHistory.objects.create(
+                patient=patient, participation_year=year, program_type='40+'
+            )
+        self.created += count
+
+    def test_patient_changelist(self):
+        self.assertChangelistQueries(Patient, 3, self.add_patients)
+
+    def test_patient_changelist_search(self):
+        # Wyszukiwanie po danych zaszyfrowanych to jedno podzapytanie, a nie osobne sondy exists()
+        self.add_patients(3)
+        plain = self.changelist_queries(Patient)
+        searched = self.changelist_queries(Patient, {'q': 'Kowalski1'})
+        self.assertLessEqual(searched, plain + 1)
+
+    def test_search_matches_encrypted_and_plain_fields(self):
+        patients = create_patients(3)
+        patients[2].email = 'anna@example.com'
+        patients[2].save()
+        model_admin = admin.site._registry[Patient]
+        request = RequestFactory().get('/admin/')
+
+        by_name, _ = model_admin.get_search_results(request, Patient.objects.all(), 'kowalski1')
+        by_email, _ = model_admin.get_search_results(request, Patient.objects.all(), 'anna@')
+        self.assertEqual(list(by_name), [patients[1]])
+        self.assertEqual(list(by_email), [patients[2]])
+
+    def test_program_history_changelist(self):
+        self.assertChangelistQueries(ProgramParticipationHistory, 5, self.add_history)
+
+
+class EligibilityTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        from visits.models import VisitType
+        self.type_40plus = VisitType.objects.create(name='40+')
+        self.today = date.today()
+
+    def add_card(self, patient, **kwargs):
+        from visits.models import VisitCard
+        return VisitCard.objects.create(patient=patient, visit_type=self.type_40plus, **kwargs)
+
+    def test_eligible_for_40plus(self):
+        eligible, open_card, recent, old, cancelled, history = patients = create_patients(6)
+        young = Patient.objects.create(
+            pesel_encrypted=make_pesel(99, birth='102101'),
+            first_name_encrypted='Jan',
+            last_name_encrypted='Młody',
+        )
+        patients.append(young)
+
+        self.add_card(open_card, visit_status='badania_w_toku')
+        self.add_card(recent, visit_status='zakończone', visit_completed_date=self.today)
+        self.add_card(old, visit_status='zakończone', visit_completed_date=self.today - timedelta(days=400))
+        self.add_card(cancelled, visit_status='oczekiwanie', is_cancelled=True)
+        ProgramParticipationHistory.objects.create(
+            patient=history, participation_year=self.today.year, program_type='40+'
+        )
+
+        expected = {eligible.pk, old.pk, cancelled.pk}
+        self.assertEqual(set(Patient.objects.eligible_for_40plus().values_list('pk', flat=True)), expected)
+
+        flags = dict(Patient.objects.with_40plus_eligibility().values_list('pk', 'eligible_40plus'))
+        self.assertEqual({pk for pk, flag in flags.items() if flag}, expected)
+        for patient in patients:
+            self.assertEqual(patient.can_start_40plus_visit, patient.pk in expected)
+
+    def test_eligible_for_40plus_is_one_query(self):
+        for patient in create_patients(10):
+            self.add_card(patient, visit_status='zakończone', visit_completed_date=self.today)
+        with CaptureQueriesContext(connection) as queries:
+            list(Patient.objects.eligible_for_40plus())
+        self.assertEqual(
+            len([query for query in queries if not query['sql'].startswith('SET search_path')]), 1
+        )
+
+
+class PatientActivityTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        from visits.models import VisitType
+        self.patient = create_patients(1)[0]
+        self.type_40plus = VisitType.objects.create(name='40+')
+        self.other_type = VisitType.objects.create(name='Kontrola')
+
+    def activity(self):
+        return Patient.objects.values(
+            'last_visit_at', 'open_40plus_card', 'active_visit_count', 'last_measurement_date'
+        ).get(pk=self.patient.pk)
+
+    def test_columns_follow_visit_cards_and_measurements(self):
+        from examinations.models import Measurement
+        from visits.models import VisitCard
+        other = VisitCard.objects.create(patient=self.patient, visit_type=self.other_type)
+        card = VisitCard.objects.create(patient=self.patient, visit_type=self.type_40plus)
+        measurement = Measurement.objects.create(visit_card=card, measurement_date=date(2026, 1, 5), pulse=70)
+
+        self.assertEqual(self.activity(), {
+            'last_visit_at': card.created_at,
+            'open_40plus_card': card.pk,
+            'active_visit_count': 2,
+            'last_measurement_date': date(2026, 1, 5),
+        })
+
+
+        card.visit_status = 'zakończone'
+        card.save()
+        self.assertEqual(self.activity()['open_40plus_card'], None)
+        self.assertEqual(self.activity()['active_visit_count'], 1)
+
+        measurement.delete()
+        card.delete()
+        self.assertEqual(self.activity(), {
+            'last_visit_at': other.created_at,
+            'open_40plus_card': None,
+            'active_visit_count': 1,
+            'last_measurement_date': None,
+        })
+
+    def test_saving_stale_instance_keeps_activity(self):
+        from visits.models import VisitCard
+        # Instancja wczytana przed dodaniem karty (np. formularz admina otwarty wcześniej)
+        stale = Patient.objects.get(pk=self.patient.pk)
+        card = VisitCard.objects.create(patient=self.patient, visit_type=self.type_40plus)
+        self.assertEqual(stale.active_visit_count, 0)
+
+        stale.phone = '+48123456789'
+        stale.save()
+
+        expected = {
+            'last_visit_at': card.created_at,
+            'open_40plus_card': card.pk,
+            'active_visit_count': 1,
+            'last_measurement_date': None,
+        }
+        self.assertEqual(self.activity(), expected)
+        self.assertEqual(
+            {field: getattr(stale, field) for field in ('last_visit_at', 'active_visit_count')},
+            {'last_visit_at': card.created_at, 'active_visit_count': 1}
+        )
+        self.assertEqual(stale.open_40plus_card, card)
+
+        # Zapis wybranych pól bez kolumn aktywności ich nie dotyka
+        stale.save(update_fields=['phone'])
+        self.assertEqual(self.activity(), expected)
+
+    def test_save_keeps_django_semantics(self):
+        from django.db.models.signals import post_save
+        received = []
+
+        def receiver(sender, update_fields, **kwargs):
+            received.append(update_fields)
+
+        post_save.connect(receiver, sender=Patient)
+        self.addCleanup(post_save.disconnect, receiver, sender=Patient)
+
+        self.patient.save()
+        self.patient.save(update_fields=['phone'])
+        self.assertEqual(received, [None, frozenset({'phone'})])
+
+        # Zapis usuniętego pacjenta wstawia go ponownie, jak w każdym modelu Django
+        pk = self.patient.pk
+        Patient.objects.filter(pk=pk).delete()
+        self.patient.save()
+        self.assertTrue(Patient.objects.filter(pk=pk).exists())
+
+    def test_rebuild_fixes_changes_made_without_signals(self):
+        from visits.models import VisitCard
+        from . import activity
+        VisitCard.objects.create(patient=self.patient, visit_type=self.other_type)
+        VisitCard.objects.update(is_cancelled=True)
+        self.assertEqual(self.activity()['active_visit_count'], 1)
+
+        result = activity.rebuild(chunk_size=1)
+        self.assertEqual(result.processed, 1)
+        self.assertEqual(self.activity()['active_visit_count'], 0)
+
+
+class BlindIndexTests(SimpleTestCase):
+    def test_term_tokens_of_substring_are_indexed(self):
+        tokens = blind_index.value_tokens(blind_index.FIELD_LAST_NAME, 'Kowalska-Nowak')
+        for term in ['kow', 'wals', 'nowak', 'ko', 'k']:
+            with self.subTest(term=term):
+                self.assertLessEqual(blind_index.term_tokens(blind_index.FIELD_LAST_NAME, term), tokens)
+        self.assertFalse(blind_index.term_tokens(blind_index.FIELD_LAST_NAME, 'xyz') <= tokens)
+
+    def test_tokens_depend_on_field(self):
+        self.assertFalse(
+            blind_index.term_tokens(blind_index.FIELD_FIRST_NAME, 'jan')
+            & blind_index.term_tokens(blind_index.FIELD_LAST_NAME, 'jan')
+        )
+
+    def test_query_terms(self):
+        self.assertEqual(blind_index.query_terms('  Jan   KOWALSKI '), ['jan', 'kowalski'])
+        self.assertEqual(blind_index.query_terms('800 101-00'), ['80010100'])
+
+
+class PatientSearchTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.jan = Patient.objects.create(
+            pesel_encrypted=make_pesel(1), first_name_encrypted='Jan', last_name_encrypted='Kowalski'
+        )
+        self.anna = Patient.objects.create(
+            pesel_encrypted=make_pesel(2, birth='650312'),
+            first_name_encrypted='Anna',
+            last_name_encrypted='Nowakowska'
+        )
+
+    def search(self, query):
+        return set(Patient.objects.search(query))
+
+    def test_substring_match(self):
+        self.assertEqual(self.search('owal'), {self.jan})
+        self.assertEqual(self.search('ski'), {self.jan})
+        self.assertEqual(self.search('wak'), {self.anna})
+        self.assertEqual(self.search('NOWAK'), {self.anna})
+        self.assertEqual(self.search('zzz'), set())
+
+    def test_multi_word_query_requires_every_word(self):
+        self.assertEqual(self.search('jan kowal'), {self.jan})
+        self.assertEqual(self.search('anna nowak'), {self.anna})
+        self.assertEqual(self.search('jan nowak'), set())
+
+    def test_words_of_different_length(self):
+        # Słowa o różnej liczbie fragmentów w jednym zapytaniu
+        self.assertEqual(self.search('an nowakowska'), {self.anna})
+        self.assertEqual(self.search('ja ko'), {self.jan})
+
+    def test_pesel_prefix(self):
+        self.assertEqual(self.search('650312'), {self.anna})
+        self.assertEqual(self.search('80'), {self.jan})
+        self.assertEqual(self.search(make_pesel(1)), {self.jan})
+        self.assertEqual(self.search('8001 01'), {self.jan})
+
+    def test_rebuild_search_index(self):
+        PatientSearchToken.objects.all().delete()
+        self.assertEqual(self.search('kowal'), set())
+
+        call_command('rebuild_search_index', self.tenant.schema_name, batch_size=1, stdout=StringIO())
+        self.assertEqual(self.search('kowal'), {self.jan})
+        self.assertEqual(self.search('6503'), {self.anna})
+
+
+class WithDecryptedTests(TenantTestCase):
+    def test_iterator_decrypts_each_chunk(self):
+        create_patients(5)
+        queryset = Patient.objects.with_decrypted().order_by('pk')
+        with mock.patch.object(decryption, 'decrypt_many', wraps=decryption.decrypt_many) as decrypt_many:
+            names = [patient.last_name_encrypted for patient in queryset.iterator(chunk_size=2)]
+
+        self.assertEqual(names, [f'Kowalski{i}' for i in range(5)])
+        # 3 porcje (2 + 2 + 1) po 3 zaszyfrowane pola
+        self.assertEqual([len(call.args[0]) for call in decrypt_many.call_args_list], [6, 6, 3])
+
+    def test_list_decrypts_in_one_batch(self):
+        create_patients(5)
+        with mock.patch.object(decryption, 'decrypt_many', wraps=decryption.decrypt_many) as decrypt_many:
+            patients = list(Patient.objects.with_decrypted())
+        self.assertEqual(len(patients), 5)
+        self.assertEqual(decrypt_many.call_count, 1)
+
+
+def invalid_pesel(number):
+    pesel = make_pesel(number)
+    return pesel[:-1] + str((int(pesel[-1]) + 1) % 10)
+
+
+class FakeSheet:
+    """Arkusz z wartościami komórek tak, jak zwraca je openpyxl"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def iter_rows(self, values_only=True):
+        return iter(self.rows)
+
+
+class BulkImportParsingTests(SimpleTestCase):
+    def test_header_mapping(self):
+        columns = bulk_import._map_header([' PESEL ', 'Imię', 'nazwisko', 'E-mail', 'uwagi'])
+        self.assertEqual(columns, ['pesel', 'first_name', 'last_name', 'email', None])
+
+    def test_header_missing_required_columns(self):
+        with self.assertRaisesMessage(bulk_import.ImportFormatError, 'last_name'):
+            bulk_import._map_header(['pesel', 'imie'])
+        with self.assertRaises(bulk_import.ImportFormatError):
+            bulk_import._map_header(None)
+
+    def test_csv_sniffer_semicolon(self):
+        file = StringIO('pesel;imie;nazwisko\n80010100014;Jan;Kowalski\n\n')
+        rows = list(bulk_import._csv_rows(file))
+        self.assertEqual(rows, [(2, {'pesel': '80010100014', 'first_name': 'Jan', 'last_name': 'Kowalski'})])
+
+    def test_csv_sniffer_comma(self):
+        file = StringIO('nazwisko,imie,pesel\nKowalski,Jan,80010100014\n')
+        (line, row), = bulk_import._csv_rows(file)
+        self.assertEqual(row['last_name'], 'Kowalski')
+        self.assertEqual(row['pesel'], '80010100014')
+
+    def test_xlsx_pesel_zero_padding(self):
+        pesel = make_pesel(1, birth='052101')
+        self.assertTrue(pesel.startswith('0'))
+        sheet = FakeSheet([
+            ('PESEL', 'Imię', 'Nazwisko', 'Telefon'),
+            (int(pesel), 'Jan', 'Kowalski', 600100200.0),
+            (None, None, None, None),
+            (float(pesel), 'Anna', 'Nowak', None),
+        ])
+        rows = list(bulk_import._xlsx_rows(sheet))
+        self.assertEqual([line for line, row in rows], [2, 4])
+        self.assertEqual([row['pesel'] for line, row in rows], [pesel, pesel])
+        # Zera uzupełniane są tylko w kolumnie PESEL
+        self.assertEqual(rows[0][1]['phone'], '600100200')
+
+    def test_check_extension(self):
+        with self.assertRaises(bulk_import.ImportFormatError):
+            bulk_import.check_extension('pacjenci.txt')
+
+
+class BulkImportTests(TenantTestCase):
+    def import_csv(self, content, **kwargs):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return bulk_import.import_patients(file.name, workers=1, **kwargs)
+
+    def test_import_creates_patients_with_search_index(self):
+        result = self.import_csv(f'pesel,imie,nazwisko\n{make_pesel(1)},Jan,Kowalski\n')
+
+        self.assertEqual((result.processed, result.created), (1, 1))
+        patient = Patient.objects.search_by_pesel(make_pesel(1)).get()
+        self.assertEqual(patient.date_of_birth, date(1980, 1, 1))
+        self.assertEqual(set(Patient.objects.search('kowal')), {patient})
+
+    def test_duplicates_in_file_and_database(self):
+        create_patients(1, start=1)
+        result = self.import_csv(
+            'pesel,imie,nazwisko\n'
+            f'{make_pesel(1)},Jan,Kowalski\n'
+            f'{make_pesel(2)},Anna,Nowak\n'
+            f'{make_pesel(2)},Anna,Nowak\n',
+            batch_size=1
+        )
+
+        self.assertEqual((result.created, result.duplicates), (1, 2))
+        self.assertEqual([line for line, message in result.errors], [2, 4])
+        self.assertEqual(Patient.objects.count(), 2)
+
+    def test_row_errors_do_not_stop_import(self):
+        result = self.import_csv(
+            'pesel,imie,nazwisko,email\n'
+            f'{invalid_pesel(1)},Jan,Kowalski,\n'
+            f'{make_pesel(2)},,Nowak,\n'
+            f'{make_pesel(3)},Ewa,Nowak,nie-email\n'
+            f'{make_pesel(4)},Adam,Nowak,adam@example.com\n'
+        )
+
+        self.assertEqual((result.processed, result.created, result.invalid), (4, 1, 3))
+        self.assertEqual([line for line, message in result.errors], [2, 3, 4])
+        self.assertEqual(result.as_dict()['errors'][1], 'linia 3: Imię i nazwisko są wymagane')
+        self.assertEqual(Patient.objects.get().email, 'adam@example.com')
+
+    @skipUnless(bulk_import.openpyxl, 'openpyxl nie jest zainstalowany')
+    def test_xlsx_file(self):
+        pesel = make_pesel(1, birth='052101')
+        workbook = bulk_import.openpyxl.Workbook()
+        workbook.active.append(['PESEL', 'Imię', 'Nazwisko'])
+        workbook.active.append([int(pesel), 'Jan', 'Kowalski'])
+        with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as file:
+            workbook.save(file.name)
+        self.addCleanup(os.remove, file.name)
+
+        result = bulk_import.import_patients(file.name, workers=1)
+
+        self.assertEqual(result.created, 1)
+        self.assertTrue(Patient.objects.search_by_pesel(pesel).exists())
+
+
+class HashRebuildTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patients = create_patients(5)
+        self.expected = {patient.pk: patient.pesel_hash for patient in self.patients}
+        # Hasze jak po zmianie PATIENT_SEARCH_SALT
+        Patient.objects.update(pesel_hash='stary', first_name_hash='stary', last_name_hash='stary')
+
+    def rebuilt(self):
+        return {
+            pk for pk, pesel_hash in Patient.objects.values_list('pk', 'pesel_hash')
+            if pesel_hash == self.expected[pk]
+        }
+
+    def test_rebuild_in_chunks(self):
+        PatientSearchToken.objects.all().delete()
+        seen = []
+
+        result = hash_rebuild.rebuild_hashes(chunk_size=2, progress=lambda r: seen.append(r.processed))
+
+        self.assertEqual(seen, [2, 4, 5])
+        self.assertEqual(result.processed, 5)
+        self.assertEqual(self.rebuilt(), set(self.expected))
+        self.assertEqual(result.tokens, PatientSearchToken.objects.count())
+        self.assertEqual(set(Patient.objects.search('kowalski3')), {self.patients[3]})
+
+    def test_resume_from_checkpoint(self):
+        HashRebuildCheckpoint.objects.create(name='test', last_pk=self.patients[2].pk, processed=3)
+
+        result = hash_rebuild.rebuild_hashes(chunk_size=2, checkpoint='test', resume=True)
+
+        self.assertEqual(result.resumed_from, self.patients[2].pk)
+        self.assertEqual(result.processed, 5)
+        self.assertEqual(self.rebuilt(), {self.patients[3].pk, self.patients[4].pk})
+        state = HashRebuildCheckpoint.objects.get(name='test')
+        self.assertEqual((state.last_pk, state.processed), (self.patients[4].pk, 5))
+        self.assertTrue(state.is_finished)
+
+    def test_checkpoint_without_resume_starts_over(self):
+        HashRebuildCheckpoint.objects.create(name='test', last_pk=self.patients[2].pk, processed=3)
+
+        result = hash_rebuild.rebuild_hashes(checkpoint='test')
+
+        self.assertEqual(result.resumed_from, 0)
+        self.assertEqual(self.rebuilt(), set(self.expected))
+
+    def test_patient_ids(self):
+        selected = [self.patients[4].pk, self.patients[1].pk, self.patients[1].pk]
+
+        result = hash_rebuild.rebuild_hashes(patient_ids=selected, chunk_size=1)
+
+        self.assertEqual(result.processed, 2)
+        self.assertEqual(self.rebuilt(), {self.patients[1].pk, self.patients[4].pk})
+
+    def test_job_resumes_own_checkpoint(self):
+        from jobs import queue
+
+        job = queue.enqueue('patients.regenerate_hashes', {'patient_ids': list(self.expected)})
+        # Poprzednia próba zadania zapisała dwie paczki przed błędem
+        HashRebuildCheckpoint.objects.create(
+            name=patient_jobs.checkpoint_name(job), last_pk=self.patients[1].pk, processed=2
+        )
+        HashRebuildCheckpoint.objects.create(name='inne', last_pk=self.patients[4].pk, processed=5)
+
+        queue.run(queue.claim())
+
+        job.refresh_from_db()
+        self.assertEqual(job.result['count'], 5)
+        # Każda paczka odświeża sygnał życia zadania
+        self.assertGreater(job.heartbeat_at, job.started_at)
+        self.assertEqual(self.rebuilt(), {patient.pk for patient in self.patients[2:]})
+        self.assertTrue(HashRebuildCheckpoint.objects.get(name=patient_jobs.checkpoint_name(job)).is_finished)
+
+
+class SortKeyTests(SimpleTestCase):
+    NAMES = [
+        ('Jan', 'Żak'), ('Anna', 'Zając'), ('Ewa', 'Ślusarz'), ('Adam', 'Szymański'),
+        ('Piotr', 'Łata'), ('Zofia', 'Lis'), ('Marek', 'Ćwik'), ('Jan', 'Cebula'),
+        ('Ola', 'Nowakowska'), ('Ewa', 'Nowak'), ('Adam', 'Nowak'), ('Łucja', 'Ąbel'), ('Anna', 'Abel'),
+    ]
+
+    def test_polish_alphabetical_order(self):
+        ordered = sorted(self.NAMES, key=lambda name: sort_keys.name_collation_key(*name))
+        self.assertEqual(ordered, [
+            ('Anna', 'Abel'), ('Łucja', 'Ąbel'), ('Jan', 'Cebula'), ('Marek', 'Ćwik'),
+            ('Zofia', 'Lis'), ('Piotr', 'Łata'), ('Adam', 'Nowak'), ('Ewa', 'Nowak'),
+            ('Ola', 'Nowakowska'), ('Adam', 'Szymański'), ('Ewa', 'Ślusarz'),
+            ('Anna', 'Zając'), ('Jan', 'Żak'),
+        ])
+
+    def test_foreign_letters_sort_as_base_letter(self):
+        self.assertEqual(sort_keys.collation_key('Müller'), sort_keys.collation_key('Muller'))
+        self.assertLess(sort_keys.collation_key('Éluard'), sort_keys.collation_key('Ęcki'))
+
+    def test_stored_key_is_first_letter_bucket(self):
+        self.assertEqual(sort_keys.name_sort_key('Jan', 'Nowak'), sort_keys.name_sort_key('Ola', 'Nowakowska'))
+        self.assertEqual(len(sort_keys.name_sort_key('Jan', 'Kowalski')), sort_keys.NAME_SORT_KEY_LENGTH)
+        self.assertLess(sort_keys.name_sort_key('Piotr', 'Lis'), sort_keys.name_sort_key('Piotr', 'Łata'))
+        self.assertEqual(sort_keys.name_sort_key('Jan', ''), '00')
+
+
+class SortedByBucketTests(TenantTestCase):
+    NAMES = SortKeyTests.NAMES
+
+    def setUp(self):
+        super().setUp()
+        for i, (first_name, last_name) in enumerate(self.NAMES):
+            Patient.objects.create(
+                pesel_encrypted=make_pesel(i), first_name_encrypted=first_name, last_name_encrypted=last_name
+            )
+
+    def sorted_names(self, reverse=False, per_page=4):
+        patients = sort_keys.SortedByBucket(
+            Patient.objects.with_decrypted(),
+            'name_sort_key',
+            key=lambda p: sort_keys.name_collation_key(p.first_name_encrypted, p.last_name_encrypted),
+            reverse=reverse
+        )
+        paginator = Paginator(patients, per_page)
+        return [
+            (p.first_name_encrypted, p.last_name_encrypted)
+            for number in paginator.page_range
+            for p in paginator.page(number).object_list
+        ]
+
+    def test_pages_follow_polish_order(self):
+        expected = sorted(self.NAMES, key=lambda name: sort_keys.name_collation_key(*name))
+        self.assertEqual(self.sorted_names(), expected)
+        self.assertEqual(self.sorted_names(reverse=True, per_page=5), expected[::-1])
+
+    def test_slice_inside_one_bucket(self):
+        patients = sort_keys.SortedByBucket(
+            Patient.objects.all(), 'name_sort_key', key=lambda p: sort_keys.name_collation_key(
+                p.first_name_encrypted, p.last_name_encrypted
+            )
+        )
+        # Nowak, Nowak, Nowakowska - jeden kubełek 'N'
+        page = patients[6:8]
+        self.assertEqual([p.last_name_encrypted for p in page], ['Nowak', 'Nowak'])
+        self.assertEqual(patients.count(), len(self.NAMES))
+
+    def test_patient_list_sorted_by_name(self):
+        from .views import PatientListView
+        request = RequestFactory().get('/', {'sort': 'name'})
+        view = PatientListView()
+        view.setup(request)
+        queryset = view.get_queryset()
+        paginator, page, object_list, is_paginated = view.paginate_queryset(queryset, 5)
+        self.assertEqual(
+            [p.last_name_encrypted for p in object_list], ['Abel', 'Ąbel', 'Cebula', 'Ćwik', 'Lis']
+        )
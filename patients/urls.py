@@ -6,7 +6,11 @@ app_name = 'patients'
 urlpatterns = [
     path('', views.PatientListView.as_view(), name='list'),
     path('create/', views.PatientCreateView.as_view(), name='create'),
+    path('40plus/', views.Outreach40PlusView.as_view(), name='outreach_40plus'),
+    path('40plus/export/', views.export_40plus_campaign, name='export_40plus'),
     path('<int:pk>/', views.PatientDetailView.as_view(), name='detail'),
+    path('<int:pk>/insurance/', views.patient_insurance, name='insurance'),
+    path('<int:pk>/insurance/<uuid:job_id>/', views.patient_insurance, name='insurance_job'),
     path('<int:pk>/edit/', views.PatientUpdateView.as_view(), name='edit'),
     path('<int:pk>/start-40plus/', views.create_visit_40plus, name='start_40plus'),
 ]
\ No newline at end of file
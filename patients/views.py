@@ -1,27 +1,41 @@
+import csv
+import itertools
+
 from django.views.generic import ListView, CreateView, DetailView, UpdateView
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import get_object_or_404, redirect
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
 from .models import Patient
 from .forms import PatientForm
+from . import eligibility, sort_keys
 from django.db import models
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from visits.models import VisitCard, VisitType
+from visits.summary import visit_summary
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
-from ewus.utils.ewus_client import EWUSClient
+from django.utils import timezone
+from asgiref.sync import sync_to_async
+from ewus import insurance_cache, session_broker
+from ewus.models import InsuranceCheckRecord
+from ewus.utils.ewus_client import InsuranceStatus
+from jobs.models import Job
+from jobs.queue import enqueue
+from zrowie.pagination import CursorPaginationMixin
 
 
-class PatientListView(LoginRequiredMixin, ListView):
+class PatientListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Patient
     template_name = 'patients/patient_list.html'
     context_object_name = 'patients'
     paginate_by = 25
+    cursor_pagination = True
+    approximate_count = True
 
     def get_queryset(self):
-        qs = super().get_queryset()
+        qs = super().get_queryset().with_decrypted()
         q = self.request.GET.get('q', '').strip()
         gender_filters = self.request.GET.getlist('gender')
         
@@ -29,56 +43,49 @@ class PatientListView(LoginRequiredMixin, ListView):
         if gender_filters:
             qs = qs.filter(gender__in=gender_filters)
         
+        # Tylko pacjenci, którzy mogą rozpocząć wizytę 40+
+        if self.request.GET.get('eligible_40plus'):
+            qs = qs.eligible_for_40plus()
+        
         if q:
-            # Dla zaszyfrowanych danych musimy przeszukać wszystkie rekordy
-            # i filtrować w Pythonie (nieoptymalne, ale konieczne dla zaszyfrowanych danych)
-            matching_ids = []
-            for patient in qs:
-                try:
-                    # Sprawdzaj czy szukany tekst jest w imieniu, nazwisku lub PESEL
-                    full_name = patient.get_decrypted_full_name().lower()
-                    pesel = patient.get_decrypted_pesel()
-                    
-                    if (q.lower() in full_name or 
-                        q in pesel or 
-                        q.replace(' ', '') in pesel.replace(' ', '')):
-                        matching_ids.append(patient.id)
-                except:
-                    # Jeśli nie można odszyfrować, pomiń
-                    continue
-            
-            qs = qs.filter(id__in=matching_ids)
+            # Wyszukiwanie po indeksie ślepym - bez odszyfrowywania rekordów
+            qs = qs.filter(pk__in=Patient.objects.search(q).values('pk'))
+        
+        # Zapisany status ubezpieczenia z eWUS (bez zapytań SOAP)
+        insurance_checks = InsuranceCheckRecord.objects.filter(
+            pesel_hash=models.OuterRef('pesel_hash'),
+            expires_at__gt=timezone.now()
+        )
+        qs = qs.annotate(
+            insurance_status=models.Subquery(insurance_checks.values('insurance_status')[:1])
+        )
 
-        # Sortowanie - używamy domyślnego sortowania z bazy danych
+        # Sortowanie - zaszyfrowane pola sortujemy po kluczach sortowania,
+        # dzięki czemu paginacja (LIMIT/OFFSET) działa po stronie bazy
         sort = self.request.GET.get('sort', '').strip()
-        if sort:
-            # Mapowanie sortowania (bo nie możemy sortować po zaszyfrowanych polach)
-            if sort in ['name', '-name', 'pesel', '-pesel', 'email', '-email']:
-                # Te pola są zaszyfrowane, więc sortujemy w Pythonie
-                patients_list = list(qs)
-                if sort == 'name':
-                    patients_list.sort(key=lambda p: p.get_decrypted_full_name().lower())
-                elif sort == '-name':
-                    patients_list.sort(key=lambda p: p.get_decrypted_full_name().lower(), reverse=True)
-                elif sort == 'pesel':
-                    patients_list.sort(key=lambda p: p.get_decrypted_pesel())
-                elif sort == '-pesel':
-                    patients_list.sort(key=lambda p: p.get_decrypted_pesel(), reverse=True)
-                elif sort == 'email':
-                    patients_list.sort(key=lambda p: p.get_decrypted_email().lower())
-                elif sort == '-email':
-                    patients_list.sort(key=lambda p: p.get_decrypted_email().lower(), reverse=True)
-                return patients_list
-            elif sort in ['date_of_birth', '-date_of_birth', 'age', '-age']:
-                # Te pola można sortować normalnie
-                if sort == 'age':
-                    qs = qs.order_by('date_of_birth')  # młodsi = nowsza data urodzenia
-                elif sort == '-age':
-                    qs = qs.order_by('-date_of_birth')  # starsi = starsza data urodzenia
-                else:
-                    qs = qs.order_by(sort)
-            else:
-                qs = qs.order_by('-created_at')
+        if sort.lstrip('-') == 'name':
+            # W bazie jest tylko kubełek pierwszej litery nazwiska - kolejność
+            # w kubełku ustalana po odszyfrowaniu, tylko dla kubełków strony
+            return sort_keys.SortedByBucket(
+                qs,
+                'name_sort_key',
+                key=lambda p: sort_keys.name_collation_key(p.first_name_encrypted, p.last_name_encrypted),
+                reverse=sort.startswith('-')
+            )
+        sort_mapping = {
+            'pesel': 'pesel_sort_key',
+            'email': 'email',
+            'date_of_birth': 'date_of_birth',
+            'age': 'date_of_birth',  # młodsi = nowsza data urodzenia
+            'last_visit': 'last_visit_at',
+        }
+        sort_field = sort_mapping.get(sort.lstrip('-'))
+        if sort_field == 'last_visit_at' and sort.startswith('-'):
+            # Pacjenci bez wizyt na końcu - zgodnie z indeksem na last_visit_at
+            qs = qs.order_by(models.F(sort_field).desc(nulls_last=True), '-pk')
+        elif sort_field:
+            direction = '-' if sort.startswith('-') else ''
+            qs = qs.order_by(f'{direction}{sort_field}', f'{direction}pk')
         else:
             qs = qs.order_by('-created_at')
             
@@ -89,9 +96,51 @@ class PatientListView(LoginRequiredMixin, ListView):
         ctx['q'] = self.request.GET.get('q', '')
         ctx['sort'] = self.request.GET.get('sort', '')
         ctx['gender_filters'] = self.request.GET.getlist('gender')
+        ctx['eligible_40plus'] = bool(self.request.GET.get('eligible_40plus'))
         return ctx
 
 
+class Outreach40PlusView(LoginRequiredMixin, CursorPaginationMixin, ListView):
+    """Lista pacjentów do zaproszenia na Profilaktykę 40+ w tym roku"""
+    model = Patient
+    template_name = 'patients/outreach_40plus.html'
+    context_object_name = 'patients'
+    paginate_by = 50
+    cursor_pagination = True
+    approximate_count = True
+
+    def get_queryset(self):
+        return Patient.objects.eligible_for_40plus().with_decrypted().order_by('-created_at')
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx['page_title'] = 'Profilaktyka 40+ - do zaproszenia'
+        return ctx
+
+
+class _Echo:
+    """Bufor dla csv.writer zwracający zapisany wiersz zamiast go przechowywać"""
+
+    def write(self, value):
+        return value
+
+
+@login_required
+def export_40plus_campaign(request):
+    """Eksport CSV pacjentów kwalifikujących się do 40+ (strumieniowo, paczkami)"""
+    writer = csv.writer(_Echo(), delimiter=';')
+    # BOM - Excel poprawnie rozpoznaje polskie znaki
+    header = '\ufeff' + writer.writerow(eligibility.CAMPAIGN_COLUMNS)
+    rows = (writer.writerow(row) for row in eligibility.campaign_rows(Patient.objects.all()))
+
+    filename = f'kampania_40plus_{timezone.localdate():%Y%m%d}.csv'
+    response = StreamingHttpResponse(
+        itertools.chain([header], rows), content_type='text/csv; charset=utf-8'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 class PatientDetailView(LoginRequiredMixin, DetailView):
     model = Patient
     template_name = 'patients/patient_detail.html'
@@ -99,93 +148,192 @@ class PatientDetailView(LoginRequiredMixin, DetailView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        patient = self.get_object()
+        patient = self.object
         
-        # Sprawdź wizytę 40+
-        current_visit_40plus = patient.current_40plus_visit
+        # Wizyty pacjenta i stan wizyty 40+ - jedno zapytanie
+        summary = visit_summary(patient)
         
-        visit_40plus_status = None
-        if current_visit_40plus:
-            visit_40plus_status = {
-                'has_questionnaire': current_visit_40plus.questionnaire_date is not None,
-                'has_examinations': current_visit_40plus.examinations.filter(status='completed').exists(),
-                'has_measurements': current_visit_40plus.measurements.exists(),
-                'can_refer_to_ipz': (
-                    current_visit_40plus.examinations.filter(status='completed').exists() and 
-                    current_visit_40plus.measurements.exists()
-                ),
-                'visit_card': current_visit_40plus
-            }
-        
-        # Sprawdź ubezpieczenie TYLKO gdy refresh=1
-        insurance_info = None
+        # Sprawdź ubezpieczenie w eWUS TYLKO gdy refresh=1,
+        # w pozostałych przypadkach pokazujemy zapisany wynik (bez zapytania SOAP)
         if self.request.GET.get('refresh') == '1':
             insurance_info = self._check_insurance(patient)
         else:
-            insurance_info = {
-                'status': 'not_checked',
-                'message': 'Kliknij "Sprawdź ubezpieczenie" aby zaktualizować dane'
-            }
+            record = insurance_cache.get_record(patient.pesel_hash)
+            if record is not None:
+                insurance_info = _insurance_info(
+                    insurance_cache.record_to_result(record, patient.get_decrypted_pesel()),
+                    record
+                )
+            else:
+                insurance_info = INSURANCE_NOT_CHECKED
         
         context.update({
             'page_title': f'Pacjent: {patient.get_decrypted_full_name()}',
-            'recent_visits': patient.visit_cards.all().order_by('-created_at')[:5],
-            'visit_40plus_status': visit_40plus_status,
+            'recent_visits': summary.recent_visits,
+            'visit_count': summary.visit_count,
+            'last_visit': summary.last_visit,
+            'current_visit_40plus': summary.current_40plus,
+            'can_start_40plus': summary.can_start_40plus,
+            'visit_40plus_status': summary.status_40plus,
             'insurance_info': insurance_info,
         })
         return context
     
     def _check_insurance(self, patient):
-        """Sprawdza ubezpieczenie pacjenta"""
-        if not self.request.session.get('ewus_session'):
-            return {
-                'status': 'no_session',
-                'message': 'Brak sesji eWUS',
-                'badge_class': 'badge-warning',
-                'icon': '⚠️'
-            }
+        """Sprawdza ubezpieczenie pacjenta (aktualny zapisany wynik nie wymaga zapytania do eWUS)"""
+        pesel = patient.get_decrypted_pesel()
+        record = insurance_cache.get_record(patient.pesel_hash)
+        if record is not None and record.is_fresh:
+            return _insurance_info(insurance_cache.record_to_result(record, pesel), record)
+        
+        account = session_broker.get_account(self.request.user)
+        if account is None:
+            return INSURANCE_NO_SESSION
         
         try:
-            from ewus.utils.ewus_client import EWUSClient, InsuranceStatus
-            client = EWUSClient(test_environment=True, debug=False)
-            print(self.request.session['ewus_session'])
-            client.restore_session(self.request.session['ewus_session'])
-            
-            pesel = patient.get_decrypted_pesel()
-            result = client.check_insurance(pesel)
-            
-            if result.patient.insurance_status == InsuranceStatus.AKTYWNY:
-                return {
-                    'status': 'active',
-                    'message': 'Ubezpieczenie aktywne',
-                    'badge_class': 'badge-success',
-                    'icon': '✅',
-                    'details': result
-                }
-            elif result.patient.insurance_status == InsuranceStatus.NIEAKTYWNY:
-                return {
-                    'status': 'inactive',
-                    'message': 'Ubezpieczenie nieaktywne',
-                    'badge_class': 'badge-error',
-                    'icon': '❌',
-                    'details': result
-                }
-            else:
-                return {
-                    'status': 'unknown',
-                    'message': 'Status nieznany',
-                    'badge_class': 'badge-warning',
-                    'icon': '⚠️',
-                    'details': result
-                }
+            result, record, _ = session_broker.get_broker().call(
+                account,
+                lambda client: insurance_cache.check_insurance_cached(client, pesel, patient.pesel_hash)
+            )
+            return _insurance_info(result, record)
                 
         except Exception as e:
-            return {
-                'status': 'error',
-                'message': f"Błąd sprawdzania ubezpieczenia: {str(e)}",
-                'badge_class': 'badge-error',
-                'icon': '❌'
-            }
+            return _insurance_error(e)
+
+
+INSURANCE_NOT_CHECKED = {
+    'status': 'not_checked',
+    'message': 'Kliknij "Sprawdź ubezpieczenie" aby zaktualizować dane'
+}
+
+INSURANCE_PENDING = {
+    'status': 'pending',
+    'message': 'Sprawdzanie w eWUS...',
+    'badge_class': 'badge-info',
+    'icon': '⏳'
+}
+
+INSURANCE_NO_SESSION = {
+    'status': 'no_session',
+    'message': 'Brak konta eWUS',
+    'badge_class': 'badge-warning',
+    'icon': '⚠️'
+}
+
+
+def _insurance_info(result, record):
+    """Dane do wyświetlenia statusu ubezpieczenia"""
+    if result.patient.insurance_status == InsuranceStatus.AKTYWNY:
+        info = {
+            'status': 'active',
+            'message': 'Ubezpieczenie aktywne',
+            'badge_class': 'badge-success',
+            'icon': '✅',
+        }
+    elif result.patient.insurance_status == InsuranceStatus.NIEAKTYWNY:
+        info = {
+            'status': 'inactive',
+            'message': 'Ubezpieczenie nieaktywne',
+            'badge_class': 'badge-error',
+            'icon': '❌',
+        }
+    else:
+        info = {
+            'status': 'unknown',
+            'message': 'Status nieznany',
+            'badge_class': 'badge-warning',
+            'icon': '⚠️',
+        }
+    info['details'] = result
+    info['checked_at'] = record.checked_at
+    return info
+
+
+def _insurance_error(error):
+    return {
+        'status': 'error',
+        'message': f"Błąd sprawdzania ubezpieczenia: {str(error)}",
+        'badge_class': 'badge-error',
+        'icon': '❌'
+    }
+
+
+@login_required
+async def patient_insurance(request, pk, job_id=None):
+    """
+    Status ubezpieczenia pacjenta (fragment htmx).
+
+    POST zleca sprawdzenie w eWUS kolejce zadań i zwraca fragment, który
+    odpytuje stan zadania (job_id) aż do jego zakończenia - żądanie HTTP
+    nie czeka na NFZ. GET z refresh=1 sprawdza od razu; widok jest
+    asynchroniczny, więc przy wdrożeniu ASGI nie blokuje workera.
+    Przeterminowany wynik (w oknie EWUS_INSURANCE_STALE_TTL) jest zwracany
+    od razu, a odświeża go zadanie w kolejce.
+    """
+    patient = await aget_object_or_404(Patient, pk=pk)
+    pesel = patient.get_decrypted_pesel()
+    user = await request.auser()
+
+    if job_id is not None:
+        job = await aget_object_or_404(
+            Job, pk=job_id, name='ewus.check_insurance', created_by_id=user.pk
+        )
+        if job.status == Job.FAILED:
+            return await _render_insurance(request, patient, _insurance_error(job.error))
+        if not job.is_finished:
+            # Podczas odświeżania pokazujemy zapisany (przeterminowany) wynik, jeśli jest
+            record = await sync_to_async(insurance_cache.get_record)(patient.pesel_hash)
+            if record is not None:
+                insurance_info = _insurance_info(insurance_cache.record_to_result(record, pesel), record)
+            else:
+                insurance_info = INSURANCE_PENDING
+            return await _render_insurance(request, patient, insurance_info, job)
+        # Zadanie zakończone - wynik jest już zapisany w InsuranceCheckRecord
+
+    refresh = request.method == 'POST' or request.GET.get('refresh') == '1'
+    record = await sync_to_async(insurance_cache.get_record)(patient.pesel_hash)
+
+    if record is not None and (record.is_fresh or not refresh):
+        return await _render_insurance(
+            request, patient, _insurance_info(insurance_cache.record_to_result(record, pesel), record)
+        )
+    if not refresh:
+        return await _render_insurance(request, patient, INSURANCE_NOT_CHECKED)
+
+    account = await sync_to_async(session_broker.get_account)(user)
+    if account is None:
+        return await _render_insurance(request, patient, INSURANCE_NO_SESSION)
+
+    if request.method == 'POST':
+        job = await sync_to_async(enqueue)(
+            'ewus.check_insurance', {'patient_id': patient.pk, 'user_id': user.pk}, user=user
+        )
+        return await _render_insurance(request, patient, INSURANCE_PENDING, job)
+
+    if record is not None and insurance_cache.can_serve_stale(record):
+        # Zadanie w pętli async_to_sync zginęłoby po odpowiedzi - odświeża kolejka zadań
+        job = await sync_to_async(insurance_cache.enqueue_refresh)(patient.pk, user)
+        return await _render_insurance(
+            request, patient, _insurance_info(insurance_cache.record_to_result(record, pesel), record), job
+        )
+
+    try:
+        result, record, _ = await session_broker.get_broker().acall(
+            account,
+            lambda client: insurance_cache.acheck_insurance_cached(client, pesel, patient.pesel_hash)
+        )
+        insurance_info = _insurance_info(result, record)
+    except Exception as e:
+        insurance_info = _insurance_error(e)
+    return await _render_insurance(request, patient, insurance_info)
+
+
+async def _render_insurance(request, patient, insurance_info, job=None):
+    return await sync_to_async(render)(request, 'patients/insurance_status.html', {
+        'patient': patient,
+        'insurance_info': insurance_info,
+        'job': job,
+    })
 
 
 class PatientCreateView(LoginRequiredMixin, CreateView):
@@ -243,13 +391,21 @@ def create_visit_40plus(request, patient_id):
     try:
         patient = get_object_or_404(Patient, id=patient_id)
         
+        summary = visit_summary(patient)
+        
         # Sprawdź czy pacjent ma już aktywną wizytę 40+
-        if patient.current_40plus_visit:
+        if summary.current_40plus:
             return JsonResponse({
                 'success': False,
                 'error': 'Pacjent ma już aktywną wizytę 40+. Zakończ poprzednią wizytę przed utworzeniem nowej.'
             }, status=400)
         
+        if not summary.can_start_40plus:
+            return JsonResponse({
+                'success': False,
+                'error': 'Pacjent nie może przystąpić do programu 40+.'
+            }, status=400)
+        
         # Pobierz typ wizyty 40+
         visit_type_40plus = VisitType.objects.filter(name__icontains='40+').first()
         if not visit_type_40plus:
@@ -261,9 +417,8 @@ def create_visit_40plus(request, patient_id):
         # Utwórz nową kartę wizyty
         visit_card = VisitCard.objects.create(
             patient=patient,
-            visit_type=visit_type_40plus.name,
+            visit_type=visit_type_40plus,
             visit_status='oczekiwanie',
-            created_by=request.user
         )
         
         return JsonResponse({
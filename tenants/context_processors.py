@@ -1,15 +1,7 @@
-def tenant_features(request):
-    features = {}
-    tenant = getattr(request, 'tenant', None)
+from .features import get_features
 
-    if tenant:
-        try:
-            subscription = tenant.subscriptions.filter(is_active=True).latest('start_date')
-            package = subscription.package
-            features = package.features or {}
-        except Exception:
-            pass
 
+def tenant_features(request):
     return {
-        'package_features': features
+        'package_features': get_features(getattr(request, 'tenant', None))
     }
@@ -0,0 +1,73 @@
+"""
+Flagi funkcji tenanta (Package.features aktywnej subskrypcji).
+
+Mapa funkcji jest zapamiętywana na dwóch poziomach: krótko w pamięci
+procesu (zero zapytań i zero odwołań do cache na gorącej ścieżce) oraz
+dłużej we wspólnym cache Django. Zapis Subscription lub Package usuwa
+wpisy przez sygnały (tenants/signals.py); w innych procesach kopia
+lokalna wygasa najpóźniej po LOCAL_TTL sekundach.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+
+from .models import Subscription
+
+
+LOCAL_TTL = 30
+SHARED_TTL = 10 * 60
+
+_local = {}
+_local_lock = threading.Lock()
+
+
+def _cache_key(tenant_id):
+    return f"tenant:features:{tenant_id}"
+
+
+def get_features(tenant):
+    """Mapa funkcji pakietu aktywnej subskrypcji tenanta (pusta, gdy brak subskrypcji)"""
+    if tenant is None or tenant.pk is None:
+        return {}
+    
+    now = time.monotonic()
+    entry = _local.get(tenant.pk)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    
+    features = cache.get(_cache_key(tenant.pk))
+    if features is None:
+        features = load_features(tenant.pk)
+        cache.set(_cache_key(tenant.pk), features, SHARED_TTL)
+    
+    with _local_lock:
+        _local[tenant.pk] = (now + LOCAL_TTL, features)
+    return features
+
+
+def has_feature(tenant, feature_key):
+    return bool(get_features(tenant).get(feature_key, False))
+
+
+def load_features(tenant_id):
+    """Odczyt z bazy - jedno zapytanie (subskrypcja razem z pakietem)"""
+    subscription = (
+        Subscription.objects
+        .filter(tenant_id=tenant_id, is_active=True)
+        .select_related('package')
+        .order_by('-start_date')
+        .first()
+    )
+    if subscription is None:
+        return {}
+    return dict(subscription.package.features or {})
+
+
+def invalidate(tenant_ids):
+    """Usuwa zapamiętane mapy funkcji wskazanych tenantów"""
+    tenant_ids = list(tenant_ids)
+    with _local_lock:
+        for tenant_id in tenant_ids:
+            _local.pop(tenant_id, None)
+    cache.delete_many([_cache_key(tenant_id) for tenant_id in tenant_ids])
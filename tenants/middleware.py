@@ -0,0 +1,70 @@
+"""
+TenantMainMiddleware z pamięcią podręczną rozwiązywania domeny na tenanta.
+
+django-tenants przy każdym żądaniu szuka Domain -> Tenant w schemacie
+public. Wynik zapamiętujemy w ograniczonym LRU procesu (nazwa hosta ->
+tenant) na TENANT_CACHE_TTL sekund; zmiana Domain lub Tenant usuwa wpisy
+przez sygnały (tenants/signals.py), a w innych procesach wpis wygasa po TTL.
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django_tenants.middleware.main import TenantMainMiddleware
+
+from zrowie.decryption import LRUCache
+
+
+_cache = None
+_stats = {'lookups': 0, 'lookups_avoided': 0}
+_stats_lock = threading.Lock()
+
+
+def get_tenant_cache():
+    global _cache
+    if _cache is None:
+        _cache = LRUCache(getattr(settings, 'TENANT_CACHE_SIZE', 256))
+    return _cache
+
+
+def tenant_cache_info():
+    """Liczba zapytań o domenę wykonanych i uniknionych dzięki pamięci oraz jej rozmiar"""
+    with _stats_lock:
+        stats = dict(_stats)
+    return dict(stats, size=get_tenant_cache().info().currsize)
+
+
+def _count(name):
+    # Środowisko wątkowe (runserver, gunicorn --threads) - += na słowniku nie jest atomowe
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def invalidate_tenant(tenant_id):
+    """Usuwa z pamięci wszystkie nazwy hostów wskazujące na tenanta"""
+    get_tenant_cache().pop_matching(lambda hostname, entry: entry[1].pk == tenant_id)
+
+
+class CachedTenantMainMiddleware(TenantMainMiddleware):
+    """TenantMainMiddleware, który pyta bazę o domenę tylko przy braku w pamięci"""
+
+    def get_tenant(self, domain_model, hostname):
+        cache = get_tenant_cache()
+        entry = cache.get(hostname)
+        now = time.monotonic()
+        if entry is not None and entry[0] > now:
+            _count('lookups_avoided')
+            # Kopia - middleware ustawia na obiekcie atrybuty żądania (domain_url)
+            return copy.copy(entry[1])
+
+        _count('lookups')
+        tenant = super().get_tenant(domain_model, hostname)
+        cache.set(hostname, (now + getattr(settings, 'TENANT_CACHE_TTL', 60), tenant))
+        return copy.copy(tenant)
+
+    def process_response(self, request, response):
+        if settings.DEBUG:
+            info = tenant_cache_info()
+            response['X-Tenant-Cache'] = f"lookups={info['lookups']}; avoided={info['lookups_avoided']}"
+        return response
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import features
+from .middleware import invalidate_tenant
+from .models import Domain, Package, Subscription, Tenant
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_subscription_features(sender, instance, **kwargs):
+    features.invalidate([instance.tenant_id])
+
+
+@receiver(post_save, sender=Package)
+def invalidate_package_features(sender, instance, **kwargs):
+    # Pakiet może być używany przez wielu tenantów
+    features.invalidate(
+        Subscription.objects.filter(package=instance).values_list('tenant_id', flat=True).distinct()
+    )
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def invalidate_tenant_resolution(sender, instance, **kwargs):
+    invalidate_tenant(instance.pk)
+
+
+@receiver(post_save, sender=Domain)
+@receiver(post_delete, sender=Domain)
+def invalidate_domain_resolution(sender, instance, **kwargs):
+    # Zmiana nazwy domeny - stara nazwa hosta też musi zniknąć z pamięci
+    invalidate_tenant(instance.tenant_id)
@@ -1,3 +1,25 @@
-from django.test import TestCase
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from . import middleware
+
+
+class TenantCacheStatsTests(SimpleTestCase):
+
+    def test_counters_are_exact_under_threads(self):
+        threads_count, increments = 8, 5000
+
+        def work():
+            for _ in range(increments):
+                middleware._count('lookups')
+
+        with mock.patch.dict(middleware._stats, {'lookups': 0, 'lookups_avoided': 0}):
+            threads = [threading.Thread(target=work) for _ in range(threads_count)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(middleware.tenant_cache_info()['lookups'], threads_count * increments)
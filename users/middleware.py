@@ -1,4 +1,8 @@
 # users/middleware.py
+import re
+
+from django.core.cache import cache
+from django.db import connection
 from django.shortcuts import redirect
 from django.urls import reverse
 from django_otp import user_has_device
@@ -6,35 +10,73 @@ from django_otp.plugins.otp_totp.models import TOTPDevice
 from django.contrib import messages
 
 
+# URLs które nie wymagają 2FA (prefiksy)
+EXEMPT_PREFIXES = [
+    '/login/',
+    '/verify-2fa/',
+    '/setup-2fa-required/',
+    '/logout/',
+    '/static/',
+    '/media/',
+]
+
+# Strona główna zwalniana tylko dokładnie - jako prefiks '/' pasowałby do każdego adresu
+EXEMPT_EXACT = ['/']
+
+# Potwierdzanie nowego urządzenia (po regeneracji) - dostępne bez potwierdzonego urządzenia
+DEVICE_SETUP_PREFIXES = [
+    '/confirm-2fa/',
+]
+
+# Jedno wyrażenie zamiast liniowego sprawdzania startswith dla każdej ścieżki
+EXEMPT_PATH = re.compile(
+    '|'.join([re.escape(prefix) for prefix in EXEMPT_PREFIXES] +
+             [re.escape(path) + r'\Z' for path in EXEMPT_EXACT])
+)
+DEVICE_SETUP_PATH = re.compile('|'.join(re.escape(prefix) for prefix in DEVICE_SETUP_PREFIXES))
+
+# Potwierdzone urządzenie zapamiętujemy na tyle sekund (tylko wynik pozytywny -
+# potwierdzenie nowego urządzenia działa od razu, także w innych procesach)
+CONFIRMED_DEVICE_CACHE_TIMEOUT = 5 * 60
+
+
+def _confirmed_device_cache_key(user_id):
+    return f"2fa:confirmed:{connection.schema_name}:{user_id}"
+
+
+def has_confirmed_device(user):
+    """Czy użytkownik ma potwierdzone urządzenie TOTP (z pamięci podręcznej)"""
+    key = _confirmed_device_cache_key(user.pk)
+    if cache.get(key):
+        return True
+    
+    confirmed = TOTPDevice.objects.filter(user=user, confirmed=True).exists()
+    if confirmed:
+        cache.set(key, True, CONFIRMED_DEVICE_CACHE_TIMEOUT)
+    return confirmed
+
+
+def invalidate_confirmed_device(user_id):
+    """Usuwa zapamiętany stan urządzenia (po potwierdzeniu lub usunięciu urządzenia)"""
+    cache.delete(_confirmed_device_cache_key(user_id))
+
+
 class Require2FAMiddleware:
     """Middleware wymuszający 2FA dla wszystkich użytkowników"""
     
     def __init__(self, get_response):
         self.get_response = get_response
-        
-        # URLs które nie wymagają 2FA
-        self.exempt_urls = [
-            '/login/',
-            '/verify-2fa/',
-            '/setup-2fa-required/',
-            '/logout/',
-            '/',
-            '/static/',  
-            '/media/',  
-        ]
     
     def __call__(self, request):
         
         if hasattr(request, 'user') and request.user.is_authenticated:
             
-            if not any(request.path.startswith(url) for url in self.exempt_urls):
+            if not EXEMPT_PATH.match(request.path):
                 
-                has_confirmed_device = TOTPDevice.objects.filter(
-                    user=request.user, 
-                    confirmed=True
-                ).exists()
-                
-                if not has_confirmed_device:
+                if not has_confirmed_device(request.user):
+                    if DEVICE_SETUP_PATH.match(request.path):
+                        return self.get_response(request)
+                    
                     # Dla dostępu do admin, wymagaj natychmiastowej konfiguracji 2FA
                     if request.path.startswith('/admin/'):
                         messages.warning(request, 'Panel administratora wymaga aktywacji 2FA')
@@ -53,4 +95,4 @@ class Require2FAMiddleware:
                     return redirect('users:verify_2fa')  # ← POPRAWIONE z 'accounts:'
         
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django_otp.plugins.otp_totp.models import TOTPDevice
+
+from .middleware import invalidate_confirmed_device
+
+
+@receiver(post_save, sender=TOTPDevice)
+@receiver(post_delete, sender=TOTPDevice)
+def invalidate_2fa_state(sender, instance, **kwargs):
+    """Zmiana urządzenia TOTP (potwierdzenie, regeneracja, usunięcie) unieważnia stan w middleware"""
+    invalidate_confirmed_device(instance.user_id)
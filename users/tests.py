@@ -1,3 +1,107 @@
-from django.test import TestCase
+import base64
 
-# Create your tests here.
+import pyotp
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.urls import reverse
+from django_otp.plugins.otp_totp.models import TOTPDevice
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.test.client import TenantClient
+
+from ewus.models import EwusAccount
+from jobs.models import Job
+
+
+def current_token(device):
+    return pyotp.TOTP(base64.b32encode(device.bin_key).decode()).now()
+
+
+class TwoFactorTestCase(TenantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = TenantClient(self.tenant)
+        self.user = get_user_model().objects.create_user(
+            username='lekarz', email='lekarz@example.com', password='haslo-testowe'
+        )
+
+    def log_in(self):
+        return self.client.post(reverse('users:login'), {
+            'username': 'lekarz', 'password': 'haslo-testowe'
+        })
+
+
+class VerifyTwoFactorTests(TwoFactorTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.device = TOTPDevice.objects.create(user=self.user, name='lekarz_totp', confirmed=True)
+        EwusAccount.objects.create(userId=self.user, login='l', password='p', regionId='07')
+
+    def test_invalid_token_does_not_enqueue_ewus_login(self):
+        self.assertRedirects(self.log_in(), reverse('users:verify_2fa'), fetch_redirect_response=False)
+
+        response = self.client.post(reverse('users:verify_2fa'), {'token': '000000'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Nieprawidłowy kod 2FA', [str(m) for m in get_messages(response.wsgi_request)])
+        self.assertFalse(Job.objects.filter(name='ewus.open_session').exists())
+        self.assertIn('pre_2fa_user_id', self.client.session)
+
+    def test_valid_token_logs_in_and_enqueues_ewus_login(self):
+        self.log_in()
+
+        response = self.client.post(reverse('users:verify_2fa'), {'token': current_token(self.device)})
+
+        self.assertRedirects(response, reverse('users:dashboard'), fetch_redirect_response=False)
+        self.assertTrue(Job.objects.filter(name='ewus.open_session', created_by=self.user).exists())
+        self.assertNotIn('pre_2fa_user_id', self.client.session)
+
+
+class TwoFactorFlowTests(TwoFactorTestCase):
+    """Logowanie -> konfiguracja -> weryfikacja -> regeneracja bez pętli przekierowań"""
+
+    def assertRedirectsTo(self, response, name):
+        self.assertRedirects(response, reverse(name), fetch_redirect_response=False)
+
+    def test_login_and_setup_device(self):
+        self.assertRedirectsTo(self.log_in(), 'users:setup_2fa_required')
+        self.assertEqual(self.client.get(reverse('users:setup_2fa_required')).status_code, 200)
+
+        device = TOTPDevice.objects.get(user=self.user, confirmed=False)
+        response = self.client.post(reverse('users:setup_2fa_required'), {'token': current_token(device)})
+
+        self.assertRedirectsTo(response, 'users:dashboard')
+        self.assertEqual(self.client.get(reverse('users:dashboard')).status_code, 200)
+
+    def test_verify_and_regenerate_device(self):
+        device = TOTPDevice.objects.create(user=self.user, name='lekarz_totp', confirmed=True)
+        self.assertRedirectsTo(self.log_in(), 'users:verify_2fa')
+        response = self.client.post(reverse('users:verify_2fa'), {'token': current_token(device)})
+        self.assertRedirectsTo(response, 'users:dashboard')
+        self.assertEqual(self.client.get(reverse('users:setup_2fa')).status_code, 200)
+
+        response = self.client.post(reverse('users:setup_2fa'), {'regenerate': '1'})
+        self.assertRedirectsTo(response, 'users:confirm_2fa')
+        self.assertEqual(self.client.get(reverse('users:confirm_2fa')).status_code, 200)
+        # Do potwierdzenia nowego urządzenia pozostałe strony prowadzą do konfiguracji
+        self.assertRedirectsTo(self.client.get(reverse('users:dashboard')), 'users:setup_2fa_required')
+        self.assertEqual(self.client.get(reverse('users:setup_2fa_required')).status_code, 200)
+
+        new_device = TOTPDevice.objects.get(user=self.user, confirmed=False)
+        response = self.client.post(reverse('users:confirm_2fa'), {'token': current_token(new_device)})
+        self.assertRedirectsTo(response, 'users:setup_2fa')
+        self.assertEqual(self.client.get(reverse('users:setup_2fa')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('users:dashboard')).status_code, 200)
+
+    def test_authenticated_unverified_session_is_verified(self):
+        device = TOTPDevice.objects.create(user=self.user, name='lekarz_totp', confirmed=True)
+        # Sesja zalogowana bez potwierdzenia kodem
+        self.client.force_login(self.user)
+
+        self.assertRedirectsTo(self.client.get(reverse('users:dashboard')), 'users:verify_2fa')
+        self.assertEqual(self.client.get(reverse('users:verify_2fa')).status_code, 200)
+
+        response = self.client.post(reverse('users:verify_2fa'), {'token': current_token(device)})
+        self.assertRedirectsTo(response, 'users:dashboard')
+        self.assertEqual(self.client.get(reverse('users:dashboard')).status_code, 200)
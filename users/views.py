@@ -12,9 +12,10 @@ from .forms import CustomAuthenticationForm
 import qrcode
 from io import BytesIO
 import base64
+from .middleware import has_confirmed_device
 from .models import User
 import pyotp
-from ewus.utils.ewus_client import EWUSClient, LoginStatus
+from jobs.queue import enqueue
 
 
 class TwoFactorLoginView(LoginView):
@@ -49,15 +50,25 @@ def setup_2fa_required(request):
     else:
         tenant_label = 'Moje Zdrowie'
     
-    user_id = request.session.get('pre_2fa_user_id')
     if request.user.is_authenticated:
-        return redirect('users:dashboard')
-    if not user_id:
-        return redirect('users:login')
+        # Zalogowany bez potwierdzonego urządzenia (np. po regeneracji) konfiguruje 2FA tutaj
+        if has_confirmed_device(request.user):
+            return redirect('users:dashboard')
+        user = request.user
+    else:
+        user_id = request.session.get('pre_2fa_user_id')
+        if not user_id:
+            return redirect('users:login')
+        User = get_user_model()
+        user = User.objects.get(id=user_id)
     
-    User = get_user_model()
-    user = User.objects.get(id=user_id)
     device = TOTPDevice.objects.filter(user=user, confirmed=False).first()
+    if not device and request.user.is_authenticated:
+        device = TOTPDevice.objects.create(
+            user=user,
+            name=f'{user.username}_totp',
+            confirmed=False
+        )
     
     if request.method == 'POST':
         token = request.POST.get('token')
@@ -66,12 +77,13 @@ def setup_2fa_required(request):
             device.save()
             
             # Zaloguj użytkownika z 2FA
-            login(request, user)
+            if not request.user.is_authenticated:
+                login(request, user)
             otp_login(request, device)
 
             request.session.set_expiry(8 * 60 * 60)
             
-            del request.session['pre_2fa_user_id']
+            request.session.pop('pre_2fa_user_id', None)
             messages.success(request, '2FA zostało skonfigurowane i aktywowane!')
             return redirect('users:dashboard')
         else:
@@ -108,15 +120,17 @@ def logout_view(request):
 
 def verify_2fa(request):
     """Weryfikacja kodu 2FA przy logowaniu"""
-    user_id = request.session.get('pre_2fa_user_id')
-    if not user_id:
-        return redirect('users:login')
     if request.user.is_authenticated:
-        return redirect('users:dashboard')
-    
-    from django.contrib.auth import get_user_model
-    User = get_user_model()
-    user = User.objects.get(id=user_id)
+        # Zalogowany, ale sesja bez potwierdzenia kodem (np. po wygaśnięciu weryfikacji)
+        if request.user.is_verified():
+            return redirect('users:dashboard')
+        user = request.user
+    else:
+        user_id = request.session.get('pre_2fa_user_id')
+        if not user_id:
+            return redirect('users:login')
+        User = get_user_model()
+        user = User.objects.get(id=user_id)
     
     if request.method == 'POST':
         token = request.POST.get('token')
@@ -124,30 +138,20 @@ def verify_2fa(request):
         
         if device and device.verify_token(token):
             # Zaloguj użytkownika z 2FA
-            login(request, user)
+            if not request.user.is_authenticated:
+                login(request, user)
             otp_login(request, device)
-           
-        if hasattr(user, 'ewuscreds'):
-            ewus_creds = user.ewuscreds
-            try:
-                from ewus.utils.ewus_client import EWUSClient
-                client = EWUSClient(test_environment=True)
-                credentials = EWUSClient.create_doctor_credentials(
-                    domain=ewus_creds.regionId,
-                    login=ewus_creds.login,
-                    password=ewus_creds.password,
-                    doctor_id=ewus_creds.doctorId if ewus_creds.isDoctorIdRequired else None
-                )
-                session_info, status = client.login(credentials)
-                if status == LoginStatus.SUCCESS:
-                    request.session['ewus_session'] = client.save_session_to_dict()
-                    print(request.session['ewus_session'])
-                    messages.success(request, 'połączono z ewus')
-                else: 
-                    messages.successE(request, f'połączono z ewus {status}')
-            except Exception as e:
-                messages.error(request, f'nie udało sie ewus {e}')
-            del request.session['pre_2fa_user_id']
+            
+            if hasattr(user, 'ewuscreds'):
+                ewus_creds = user.ewuscreds
+                try:
+                    # Logowanie do eWUS w tle - sesja trafia do wspólnej puli brokera
+                    enqueue('ewus.open_session', {'user_id': ewus_creds.userId_id}, user=user)
+                    messages.success(request, 'łączenie z ewus w tle')
+                except Exception as e:
+                    messages.error(request, f'nie udało sie ewus {e}')
+            
+            request.session.pop('pre_2fa_user_id', None)
             return redirect('users:dashboard')
         else:
             messages.error(request, 'Nieprawidłowy kod 2FA')
@@ -191,6 +195,8 @@ def confirm_2fa(request):
         if device.verify_token(token):
             device.confirmed = True
             device.save()
+            # Sesja była potwierdzona usuniętym urządzeniem - potwierdza ją nowe
+            otp_login(request, device)
             messages.success(request, '2FA zostało zaktualizowane!')
             return redirect('users:setup_2fa')
         else:
@@ -1,7 +1,9 @@
 # visits/admin.py
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.html import format_html
 from django.core.exceptions import ValidationError
+from patients.admin import CustomPatientSearchMixin, prefetch_patients
 from .models import VisitType, VisitCard
 
 
@@ -11,14 +13,21 @@ class VisitTypeAdmin(admin.ModelAdmin):
     list_filter = ['is_active']
     search_fields = ['name', 'description']
     
+    def get_queryset(self, request):
+        """Liczba wizyt policzona w zapytaniu listy zamiast COUNT dla każdego wiersza"""
+        return super().get_queryset(request).annotate(_visit_count=Count('visit_cards'))
+    
     def visit_count(self, obj):
-        return obj.visit_cards.count()
+        return obj._visit_count
     visit_count.short_description = 'Liczba wizyt'
+    visit_count.admin_order_field = '_visit_count'
 
 
 
 @admin.register(VisitCard)
-class VisitCardAdmin(admin.ModelAdmin):
+class VisitCardAdmin(CustomPatientSearchMixin, admin.ModelAdmin):
+    patient_lookup = 'patient'
+    
     list_display = [
         'id',
         'get_patient_name',
@@ -38,10 +47,11 @@ class VisitCardAdmin(admin.ModelAdmin):
         'created_at'
     ]
     
+    # Pacjent ładowany przez prefetch_patients - JOIN odszyfrowywałby go wiersz po wierszu
+    list_select_related = ['visit_type']
+    
+    # Imię, nazwisko i PESEL pacjenta wyszukuje CustomPatientSearchMixin
     search_fields = [
-        'patient__pesel_search',
-        'patient__first_name_search',
-        'patient__last_name_search',
         'patient__email'
     ]
     
@@ -99,6 +109,9 @@ class VisitCardAdmin(admin.ModelAdmin):
         })
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(prefetch_patients())
+    
     def get_patient_name(self, obj):
         return obj.patient.get_decrypted_full_name()
     get_patient_name.short_description = 'Pacjent'
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-17 03:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0006_patient_tenant_sche_created_6d9a05_idx'),
+        ('visits', '0003_remove_visitcard_status_visitcard_visit_status_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='visitcard',
+            index=models.Index(fields=['created_at', 'id'], name='tenant_sche_created_7c34c5_idx'),
+        ),
+    ]
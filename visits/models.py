@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -168,10 +168,18 @@ class VisitCard(models.Model):
         verbose_name = 'Karta wizyty'
         verbose_name_plural = 'Karty wizyt'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.patient.get_decrypted_full_name()} - {self.visit_type} ({self.get_visit_status_display()})"
     
+    def save(self, *args, **kwargs):
+        # Zapis karty i przeliczenie aktywności pacjenta (patients/signals.py) w jednej transakcji
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     @property
     def is_active(self):
         return not self.is_cancelled and self.visit_status not in ['zakończone', 'odwołane']
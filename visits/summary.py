@@ -0,0 +1,115 @@
+"""
+Podsumowanie wizyt pacjenta dla karty pacjenta.
+
+Karta pacjenta potrzebuje ostatnich wizyt, liczby wizyt, bieżącej wizyty 40+
+z postępem (badania zakończone, pomiary) i informacji, czy można rozpocząć
+nową wizytę 40+. Zamiast osobnych zapytań (current_40plus_visit,
+can_start_40plus_visit, exists() na badaniach i pomiarach, ostatnie wizyty)
+wszystko liczone jest jednym zapytaniem:
+
+- flagi postępu i kwalifikacja do 40+ (patients.eligibility) to
+  podzapytania Exists,
+- numer wiersza i liczba wizyt to funkcje okna liczone po wszystkich
+  kartach pacjenta,
+- pobierane są tylko ostatnie wizyty i otwarte karty 40+.
+"""
+from dataclasses import dataclass, field
+
+from django.db import models
+from django.db.models.functions import RowNumber
+
+from examinations.models import Examination, Measurement
+from patients.eligibility import VISIT_TYPE_40PLUS
+from patients.models import Patient
+from .models import VisitCard
+
+
+
+# Statusy, w których wizyta 40+ jest w toku (Patient.current_40plus_visit)
+CURRENT_40PLUS_STATUSES = ['oczekiwanie', 'przyjęte_do_realizacji', 'badania_w_toku']
+
+RECENT_VISITS = 5
+
+
+@dataclass
+class VisitSummary:
+    """Wizyty pacjenta potrzebne na karcie pacjenta"""
+    recent_visits: list = field(default_factory=list)
+    visit_count: int = 0
+    current_40plus: VisitCard = None
+    can_start_40plus: bool = False
+
+    @property
+    def last_visit(self):
+        return self.recent_visits[0] if self.recent_visits else None
+
+    @property
+    def status_40plus(self):
+        """Postęp bieżącej wizyty 40+ (None gdy brak)"""
+        card = self.current_40plus
+        if card is None:
+            return None
+        return {
+            'has_questionnaire': card.questionnaire_date is not None,
+            'has_examinations': card.has_completed_examinations,
+            'has_measurements': card.has_measurements,
+            'can_refer_to_ipz': card.has_completed_examinations and card.has_measurements,
+            'visit_card': card,
+        }
+
+
+def visit_summary(patient, recent=RECENT_VISITS):
+    """
+    Buduje VisitSummary pacjenta jednym zapytaniem
+
+    Args:
+        patient: Pacjent
+        recent: Liczba ostatnich wizyt
+
+    Returns:
+        VisitSummary
+    """
+    is_current_40plus = models.Q(
+        visit_type__name=VISIT_TYPE_40PLUS,
+        is_cancelled=False,
+        visit_status__in=CURRENT_40PLUS_STATUSES
+    )
+
+    cards = (
+        VisitCard.objects
+        .filter(patient=patient)
+        .select_related('visit_type')
+        .annotate(
+            has_completed_examinations=models.Exists(
+                Examination.objects.filter(visit_card=models.OuterRef('pk'), status='completed')
+            ),
+            has_measurements=models.Exists(
+                Measurement.objects.filter(visit_card=models.OuterRef('pk'))
+            ),
+            is_current_40plus=models.ExpressionWrapper(
+                is_current_40plus, output_field=models.BooleanField()
+            ),
+            position=models.Window(
+                RowNumber(), order_by=[models.F('created_at').desc(), models.F('pk').desc()]
+            ),
+            total=models.Window(models.Count('pk')),
+            can_start_40plus=models.Exists(
+                Patient.objects.filter(pk=models.OuterRef('patient')).eligible_for_40plus()
+            ),
+        )
+        .filter(models.Q(position__lte=recent) | models.Q(is_current_40plus=True))
+        .order_by('position')
+    )
+    cards = list(cards)
+
+    if not cards:
+        # Bez kart kwalifikację rozstrzyga wiek i historia uczestnictwa
+        return VisitSummary(can_start_40plus=patient.can_start_40plus_visit)
+
+    # Liczba wizyt i kwalifikacja są takie same w każdym wierszu
+    return VisitSummary(
+        recent_visits=[card for card in cards if card.position <= recent],
+        visit_count=cards[0].total,
+        current_40plus=next((card for card in cards if card.is_current_40plus), None),
+        can_start_40plus=cards[0].can_start_40plus,
+    )
@@ -1,3 +1,146 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django_tenants.test.cases import TenantTestCase
+
+from examinations.models import Examination, ExaminationType, Measurement
+from patients.tests import AdminQueryCountMixin, create_patients
+from .models import VisitCard, VisitType
+from .summary import visit_summary
+from .views import VisitCardDetailView
+
+
+class VisitAdminQueryCountTests(AdminQueryCountMixin, TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.visit_type = VisitType.objects.create(name='Profilaktyka 40+')
+        self.created = 0
+
+    def add_visit_cards(self, count):
+        for patient in create_patients(count, start=self.created):
+            VisitCard.objects.create(patient=patient, visit_type=self.visit_type)
+        self.created += count
+
+    def add_visit_types(self, count):
+        for patient in create_patients(count, start=self.created):
+            visit_type = VisitType.objects.create(name=f'Typ {patient.pk}')
+            VisitCard.objects.create(patient=patient, visit_type=visit_type)
+        self.created += count
+
+    def test_visit_type_changelist(self):
+        self.assertChangelistQueries(VisitType, 3, self.add_visit_types)
+
+    def test_visit_card_changelist(self):
+        self.assertChangelistQueries(VisitCard, 5, self.add_visit_cards)
+
+    def test_visit_card_changelist_search(self):
+        self.assertChangelistQueries(VisitCard, 5, self.add_visit_cards, {'q': 'kowalski'})
+
+
+class VisitSummaryTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patient = create_patients(1)[0]
+        self.other_type = VisitType.objects.create(name='Kontrola')
+        self.type_40plus = VisitType.objects.create(name='40+')
+        for _ in range(6):
+            VisitCard.objects.create(patient=self.patient, visit_type=self.other_type)
+        self.card_40plus = VisitCard.objects.create(
+            patient=self.patient, visit_type=self.type_40plus, visit_status='badania_w_toku'
+        )
+        for _ in range(5):
+            VisitCard.objects.create(patient=self.patient, visit_type=self.other_type)
+
+    def test_summary_is_one_query(self):
+        Measurement.objects.create(visit_card=self.card_40plus, measurement_date=date.today(), pulse=70)
+
+        with CaptureQueriesContext(connection) as queries:
+            summary = visit_summary(self.patient)
+            status = summary.status_40plus
+            [str(visit.visit_type) for visit in summary.recent_visits]
+        self.assertEqual(
+            len([query for query in queries if not query['sql'].startswith('SET search_path')]), 1
+        )
+
+        self.assertEqual(summary.visit_count, 12)
+        self.assertEqual(len(summary.recent_visits), 5)
+        self.assertEqual(summary.current_40plus, self.card_40plus)
+        self.assertNotIn(self.card_40plus, summary.recent_visits)
+        self.assertFalse(summary.can_start_40plus)
+        self.assertTrue(status['has_measurements'])
+        self.assertFalse(status['has_examinations'])
+        self.assertFalse(status['can_refer_to_ipz'])
+
+    def test_summary_matches_patient_properties(self):
+        self.card_40plus.is_cancelled = True
+        self.card_40plus.save()
+
+        summary = visit_summary(self.patient)
+        self.assertIsNone(summary.current_40plus)
+        self.assertEqual(summary.current_40plus, self.patient.current_40plus_visit)
+        self.assertEqual(summary.can_start_40plus, self.patient.can_start_40plus_visit)
+        self.assertTrue(summary.can_start_40plus)
+
+
+class VisitCardDetailQueryCountTests(TenantTestCase):
+    """Karta wizyty renderuje się stałą liczbą zapytań niezależnie od liczby badań i pomiarów"""
+
+    MAX_QUERIES = 3
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(
+            username='lekarz', email='lekarz@example.com', password='lekarz'
+        )
+        self.visit_card = VisitCard.objects.create(
+            patient=create_patients(1)[0],
+            visit_type=VisitType.objects.create(name='40+'),
+            coordinator=self.user,
+            current_responsible_person=self.user,
+            questionnaire_completed_by=self.user,
+            questionnaire_date=date.today(),
+        )
+        self.created = 0
+
+    def add_rows(self, count):
+        for i in range(self.created, self.created + count):
+            staff = get_user_model().objects.create_user(
+                username=f'personel{i}', email=f'personel{i}@example.com', password='x'
+            )
+            Examination.objects.create(
+                visit_card=self.visit_card,
+                examination_type=ExaminationType.objects.create(name=f'Badanie {i}'),
+                performed_by=staff,
+            )
+            Measurement.objects.create(
+                visit_card=self.visit_card, measurement_date=date.today(), pulse=70, measured_by=staff
+            )
+        self.created += count
+
+    def detail_queries(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        request.tenant = self.tenant
+        with CaptureQueriesContext(connection) as queries:
+            response = VisitCardDetailView.as_view()(request, pk=self.visit_card.pk)
+            response.render()
+            # Personel badań i pomiarów też musi być już załadowany
+            for exam in response.context_data['examinations']:
+                str(exam.examination_type), str(exam.performed_by)
+            for measurement in response.context_data['measurements']:
+                str(measurement.measured_by)
+        return len([query for query in queries if not query['sql'].startswith('SET search_path')])
+
+    def test_query_budget(self):
+        # Pierwsze renderowanie ładuje subskrypcję tenanta (szablon bazowy) - nie liczymy go
+        self.detail_queries()
+        self.add_rows(2)
+        few = self.detail_queries()
+        self.add_rows(10)
+        many = self.detail_queries()
+
+        self.assertEqual(few, many, 'Karta wizyty: liczba zapytań rośnie z liczbą badań i pomiarów')
+        self.assertLessEqual(many, self.MAX_QUERIES, 'Karta wizyty: za dużo zapytań')
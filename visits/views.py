@@ -1,7 +1,11 @@
 from django.views.generic import DetailView, ListView
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import Prefetch
+from examinations.models import Examination, Measurement
 from .models import VisitCard
+from patients.models import Patient
 from django.urls import reverse
+from zrowie.pagination import CursorPaginationMixin
 
 
 
@@ -10,9 +14,31 @@ class VisitCardDetailView(LoginRequiredMixin, DetailView):
     template_name = 'visits/visit_card_detail.html'
     context_object_name = 'visit_card'
     
+    def get_queryset(self):
+        # Karta z powiązaniami jednym zapytaniem, badania i pomiary (z typami
+        # badań i personelem) po jednym zapytaniu - bez zapytań na każdy wiersz
+        return super().get_queryset().select_related(
+            'patient',
+            'visit_type',
+            'coordinator',
+            'current_responsible_person',
+            'questionnaire_completed_by',
+        ).prefetch_related(
+            Prefetch(
+                'examinations',
+                queryset=Examination.objects.select_related(
+                    'examination_type', 'performed_by'
+                ).order_by('-created_at')
+            ),
+            Prefetch(
+                'measurements',
+                queryset=Measurement.objects.select_related('measured_by').order_by('-measurement_date')
+            ),
+        )
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        visit_card = self.get_object()
+        visit_card = self.object
         
         # Ustal URL powrotu na podstawie parametru 'from'
         from_page = self.request.GET.get('from', 'patient_detail')
@@ -26,8 +52,8 @@ class VisitCardDetailView(LoginRequiredMixin, DetailView):
         
         context.update({
             'page_title': f'Wizyta {visit_card.visit_type} - {visit_card.patient.get_decrypted_full_name()}',
-            'examinations': visit_card.examinations.all().order_by('-created_at'),
-            'measurements': visit_card.measurements.all().order_by('-measurement_date'),
+            'examinations': visit_card.examinations.all(),
+            'measurements': visit_card.measurements.all(),
             'back_url': back_url,
             'back_text': back_text,
             'status_badge_class': {
@@ -44,11 +70,13 @@ class VisitCardDetailView(LoginRequiredMixin, DetailView):
 
 
 
-class VisitCardListView(LoginRequiredMixin, ListView):
+class VisitCardListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = VisitCard
     template_name = 'visits/visit_card_list.html'
     context_object_name = 'visit_cards'
     paginate_by = 25
+    cursor_pagination = True
+    approximate_count = True
 
     def get_queryset(self):
         qs = super().get_queryset().select_related('patient')
@@ -61,18 +89,7 @@ class VisitCardListView(LoginRequiredMixin, ListView):
             qs = qs.filter(visit_status__in=status_filters)
         
         if q:
-            matching_ids = []
-            for visit_card in qs:
-                try:
-                    full_name = visit_card.patient.get_decrypted_full_name().lower()
-                    pesel = visit_card.patient.get_decrypted_pesel()
-                    
-                    if (q.lower() in full_name or q in pesel):
-                        matching_ids.append(visit_card.pk)
-                except:
-                    continue
-            
-            qs = qs.filter(pk__in=matching_ids)
+            qs = qs.filter(patient__in=Patient.objects.search(q).values('pk'))
         
         # Sortowanie
         if sort:
@@ -0,0 +1,302 @@
+"""
+Pamięć podręczna odszyfrowanych wartości pól EncryptedCharField.
+
+Ten sam szyfrogram bywa odszyfrowywany wielokrotnie w jednym żądaniu
+(np. pacjent ładowany osobno dla każdej wizyty na liście w adminie).
+Wynik odszyfrowania zapamiętujemy pod skrótem szyfrogramu:
+
+- zawsze w obrębie jednego żądania (DecryptionCacheMiddleware),
+- opcjonalnie w ograniczonym LRU na poziomie procesu
+  (settings.DECRYPTION_CACHE_SIZE, domyślnie wyłączone - dane osobowe
+  nie powinny bez potrzeby żyć w pamięci dłużej niż żądanie).
+"""
+import contextvars
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import cryptography.fernet
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from encrypted_model_fields.fields import CRYPTER, EncryptedCharField, EncryptedMixin, decrypt_str, encrypt_str
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class DecryptionStats:
+    """Liczniki trafień i chybień pamięci podręcznej"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+class LRUCache:
+    """Prosty, bezpieczny wątkowo cache LRU o ograniczonym rozmiarze"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def pop_matching(self, predicate):
+        """Usuwa wpisy, dla których predicate(klucz, wartość) jest prawdziwe"""
+        with self._lock:
+            for key in [key for key, value in self._data.items() if predicate(key, value)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+
+_process_cache = None
+_process_cache_lock = threading.Lock()
+
+# (słownik skrót -> wartość, liczniki) dla bieżącego żądania
+_request_cache = contextvars.ContextVar('decryption_request_cache', default=None)
+
+
+def get_process_cache():
+    """Zwraca procesowy LRU albo None, jeśli jest wyłączony"""
+    global _process_cache
+    maxsize = getattr(settings, 'DECRYPTION_CACHE_SIZE', 0)
+    if maxsize <= 0:
+        return None
+    if _process_cache is None or _process_cache.maxsize != maxsize:
+        with _process_cache_lock:
+            if _process_cache is None or _process_cache.maxsize != maxsize:
+                _process_cache = LRUCache(maxsize)
+    return _process_cache
+
+
+def cache_info():
+    """Statystyki procesowego LRU (jak functools.lru_cache)"""
+    cache = get_process_cache()
+    if cache is None:
+        return CacheInfo(0, 0, 0, 0)
+    return cache.info()
+
+
+def cache_clear():
+    """Czyści procesowy LRU (np. po rotacji kluczy)"""
+    cache = get_process_cache()
+    if cache is not None:
+        cache.clear()
+
+
+def start_request_cache():
+    """Włącza cache dla bieżącego żądania; zwraca token do reset_request_cache"""
+    return _request_cache.set(({}, DecryptionStats()))
+
+
+def reset_request_cache(token):
+    _request_cache.reset(token)
+
+
+def request_stats():
+    """Liczniki bieżącego żądania albo None poza żądaniem"""
+    state = _request_cache.get()
+    return state[1] if state else None
+
+
+def decrypt(ciphertext):
+    """
+    Odszyfrowuje wartość z użyciem pamięci podręcznej.
+
+    Wartości, które nie są poprawnym szyfrogramem (np. tekst jawny
+    z formularza), zwracane są bez zmian - tak jak w EncryptedMixin.
+    """
+    digest = hashlib.blake2b(ciphertext.encode('utf-8'), digest_size=16).digest()
+
+    state = _request_cache.get()
+    if state is not None:
+        values, stats = state
+        if digest in values:
+            stats.hits += 1
+            return values[digest]
+
+    process_cache = get_process_cache()
+    value = process_cache.get(digest) if process_cache is not None else None
+
+    if value is None:
+        try:
+            value = decrypt_str(ciphertext)
+        except cryptography.fernet.InvalidToken:
+            return ciphertext
+        if process_cache is not None:
+            process_cache.set(digest, value)
+        if state is not None:
+            stats.misses += 1
+    elif state is not None:
+        stats.hits += 1
+
+    if state is not None:
+        values[digest] = value
+    return value
+
+
+def _decrypt_or_passthrough(ciphertext):
+    try:
+        return CRYPTER.decrypt(ciphertext.encode('utf-8')).decode('utf-8')
+    except cryptography.fernet.InvalidToken:
+        return ciphertext
+
+
+def decrypt_many(ciphertexts, workers=None, parallel_threshold=500):
+    """
+    Odszyfrowuje listę wartości w jednym przebiegu.
+
+    Powtarzające się szyfrogramy odszyfrowywane są raz, trafienia
+    w pamięci podręcznej są pomijane, a przy dużych paczkach (eksporty)
+    pozostałe wartości mogą być odszyfrowane w puli wątków.
+
+    Args:
+        ciphertexts: Lista szyfrogramów (None przechodzi bez zmian)
+        workers: Liczba wątków (None lub 1 = bez puli)
+        parallel_threshold: Minimalna liczba wartości do użycia puli
+
+    Returns:
+        Lista odszyfrowanych wartości w tej samej kolejności
+    """
+    state = _request_cache.get()
+    values, stats = state if state is not None else ({}, None)
+    process_cache = get_process_cache()
+
+    digests = [
+        hashlib.blake2b(c.encode('utf-8'), digest_size=16).digest() if c is not None else None
+        for c in ciphertexts
+    ]
+
+    pending = {}
+    for digest, ciphertext in zip(digests, ciphertexts):
+        if digest is None or digest in values or digest in pending:
+            continue
+        cached = process_cache.get(digest) if process_cache is not None else None
+        if cached is not None:
+            values[digest] = cached
+        else:
+            pending[digest] = ciphertext
+
+    if stats is not None:
+        stats.misses += len(pending)
+        stats.hits += sum(1 for d in digests if d is not None) - len(pending)
+
+    if pending:
+        if workers and workers > 1 and len(pending) >= parallel_threshold:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                plain = list(executor.map(_decrypt_or_passthrough, pending.values(), chunksize=256))
+        else:
+            plain = [_decrypt_or_passthrough(c) for c in pending.values()]
+
+        for digest, ciphertext, value in zip(pending, pending.values(), plain):
+            values[digest] = value
+            if process_cache is not None and value is not ciphertext:
+                process_cache.set(digest, value)
+
+    return [values[d] if d is not None else None for d in digests]
+
+
+class Ciphertext(str):
+    """
+    Wartość już zaszyfrowana - zapisywana przez CachedEncryptedCharField bez
+    ponownego szyfrowania (np. szyfrogramy przygotowane w puli procesów importu)
+    """
+
+
+def encrypt(value):
+    """Szyfruje wartość tak samo jak pole przy zapisie"""
+    if value is None:
+        return None
+    return Ciphertext(encrypt_str(str(value)).decode('utf-8'))
+
+
+class CachedEncryptedCharField(EncryptedCharField):
+    """EncryptedCharField odszyfrowujący przez pamięć podręczną"""
+
+    def get_db_prep_save(self, value, connection):
+        if isinstance(value, Ciphertext):
+            return str(value)
+        return super().get_db_prep_save(value, connection)
+
+    def to_python(self, value):
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        if isinstance(value, str):
+            value = decrypt(value)
+        return super(EncryptedMixin, self).to_python(value)
+
+
+class DecryptionCacheMiddleware:
+    """
+    Middleware włączający cache odszyfrowania na czas żądania.
+
+    Przy DEBUG=True dopisuje liczniki do nagłówka X-Decryption-Cache.
+    Obsługuje zarówno widoki synchroniczne, jak i asynchroniczne.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = start_request_cache()
+        try:
+            return self._finish(request, self.get_response(request))
+        finally:
+            reset_request_cache(token)
+
+    async def __acall__(self, request):
+        token = start_request_cache()
+        try:
+            return self._finish(request, await self.get_response(request))
+        finally:
+            reset_request_cache(token)
+
+    def _finish(self, request, response):
+        stats = request_stats()
+        request.decryption_stats = stats
+        if settings.DEBUG:
+            response['X-Decryption-Cache'] = f"hits={stats.hits}; misses={stats.misses}"
+        return response
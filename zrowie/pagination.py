@@ -0,0 +1,186 @@
+"""
+Paginacja kursorowa (keyset) dla list opartych o ListView.
+
+Zamiast OFFSET i COUNT(*) kolejna strona jest wybierana warunkiem
+(created_at, id) < (ostatni element poprzedniej strony), co korzysta
+z indeksu i kosztuje tyle samo niezależnie od numeru strony.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db import connection
+from django.db.models import Q
+from django.http import Http404
+
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+def encode_cursor(direction, created_at, pk):
+    """Tworzy nieprzezroczysty kursor dla pozycji (created_at, pk)"""
+    raw = f"{direction}|{created_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Odczytuje kursor
+
+    Returns:
+        Tuple (kierunek, created_at, pk)
+
+    Raises:
+        ValueError: Jeśli kursor jest nieprawidłowy
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS):
+            raise ValueError(direction)
+        return direction, datetime.fromisoformat(created_at), int(pk)
+    except Exception as e:
+        raise ValueError(f"Nieprawidłowy kursor: {e}")
+
+
+def estimate_count(queryset):
+    """
+    Przybliżona liczba wierszy na podstawie statystyk Postgresa.
+
+    Dla zapytania bez filtrów używa pg_class.reltuples, w pozostałych
+    przypadkach szacunku planera (EXPLAIN).
+    """
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+            if row and row[0] is not None and row[0] >= 0:
+                return int(row[0])
+
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CursorPage:
+    """Strona wyników paginacji kursorowej"""
+
+    def __init__(self, object_list, has_next, has_previous,
+                 next_cursor=None, previous_cursor=None,
+                 count=None, count_is_approximate=False):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+        self.count_is_approximate = count_is_approximate
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class CursorPaginationMixin:
+    """
+    Opcjonalna paginacja kursorowa dla ListView.
+
+    Włączana atrybutem `cursor_pagination = True`. Działa tylko przy
+    domyślnym sortowaniu (-created_at); dla innych sortowań oraz gdy
+    w adresie jest parametr `page` używana jest zwykła paginacja Django.
+    """
+
+    cursor_pagination = False
+    cursor_query_param = 'cursor'
+    approximate_count = False
+    exact_count_threshold = 1000
+
+    CURSOR_ORDERINGS = (('-created_at',), ('-created_at', '-id'), ('-created_at', '-pk'))
+
+    def use_cursor_pagination(self, queryset):
+        if not self.cursor_pagination or self.page_kwarg in self.request.GET:
+            return False
+        if not hasattr(queryset, 'query'):
+            # Lista sortowana poza bazą (np. patients.sort_keys.SortedByBucket)
+            return False
+        ordering = tuple(queryset.query.order_by) or tuple(queryset.model._meta.ordering)
+        return ordering in self.CURSOR_ORDERINGS
+
+    def get_cursor_count(self, queryset):
+        """Liczba wyników: przybliżona ze statystyk lub None (bez COUNT(*))"""
+        if not self.approximate_count:
+            return None, False
+        estimate = estimate_count(queryset)
+        if estimate < self.exact_count_threshold:
+            return queryset.count(), False
+        return estimate, True
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination(queryset):
+            return super().paginate_queryset(queryset, page_size)
+
+        direction, position = CURSOR_NEXT, None
+        token = self.request.GET.get(self.cursor_query_param)
+        if token:
+            try:
+                direction, created_at, pk = decode_cursor(token)
+            except ValueError as e:
+                raise Http404(str(e))
+            position = (created_at, pk)
+
+        count, count_is_approximate = self.get_cursor_count(queryset)
+
+        qs = queryset.order_by('-created_at', '-pk')
+        if position:
+            created_at, pk = position
+            if direction == CURSOR_NEXT:
+                qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+            else:
+                qs = qs.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+                ).order_by('created_at', 'pk')
+
+        # Pobieramy jeden element więcej, żeby wiedzieć czy jest kolejna strona
+        rows = list(qs[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if direction == CURSOR_PREVIOUS:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        page = CursorPage(
+            rows,
+            has_next=has_next,
+            has_previous=has_previous,
+            next_cursor=encode_cursor(CURSOR_NEXT, rows[-1].created_at, rows[-1].pk) if has_next and rows else None,
+            previous_cursor=encode_cursor(CURSOR_PREVIOUS, rows[0].created_at, rows[0].pk) if has_previous and rows else None,
+            count=count,
+            count_is_approximate=count_is_approximate,
+        )
+        return (None, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cursor_pagination'] = isinstance(context.get('page_obj'), CursorPage)
+        return context
@@ -76,19 +76,21 @@ TENANT_APPS = [
     'django_otp.plugins.otp_static',
     'tailwind',
     'theme',
-    'ewus'
+    'ewus',
+    'jobs',
 ]
 
 INSTALLED_APPS = list(SHARED_APPS) + [app for app in TENANT_APPS if app not in SHARED_APPS]
 
 MIDDLEWARE = [
-    'django_tenants.middleware.main.TenantMainMiddleware',
+    'tenants.middleware.CachedTenantMainMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django_htmx.middleware.HtmxMiddleware',
     'django.middleware.common.CommonMiddleware',
     "django_browser_reload.middleware.BrowserReloadMiddleware",
     'django.middleware.csrf.CsrfViewMiddleware',
+    'zrowie.decryption.DecryptionCacheMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django_otp.middleware.OTPMiddleware',  
     'users.middleware.Require2FAMiddleware',  
@@ -190,6 +192,38 @@ FIELD_ENCRYPTION_HASH_SALT = os.environ.get('PATIENT_SEARCH_SALT')
 
 # PATIENT_SEARCH_SALT = 
 
+# Klucz HMAC indeksu ślepego (domyślnie PATIENT_SEARCH_SALT)
+PATIENT_BLIND_INDEX_KEY = os.environ.get('PATIENT_BLIND_INDEX_KEY')
+
+# Ważność zapisanego wyniku eWUS w sekundach (brak = do końca dnia)
+EWUS_INSURANCE_CACHE_TTL = os.environ.get('EWUS_INSURANCE_CACHE_TTL') and int(os.environ['EWUS_INSURANCE_CACHE_TTL'])
+
+# Jak długo po wygaśnięciu wynik jest pokazywany podczas odświeżania w tle (sekundy)
+EWUS_INSURANCE_STALE_TTL = int(os.environ.get('EWUS_INSURANCE_STALE_TTL', 900))
+
+# Przerwa po nieudanym logowaniu konta do eWUS (sekundy) - chroni przed blokadą konta
+EWUS_LOGIN_BACKOFF = int(os.environ.get('EWUS_LOGIN_BACKOFF', 300))
+
+# Własny adres środowiska testowego eWUS, np. lokalnego serwera zaślepkowego (manage.py ewus_stub_server)
+EWUS_TEST_BASE_URL = os.environ.get('EWUS_TEST_BASE_URL')
+
+# Kolejka zadań w tle: opóźnienie pierwszego ponowienia (podwajane przy kolejnych)
+# i czas bez sygnału życia (queue.heartbeat), po którym zadanie "w trakcie" uznaje się
+# za porzucone przez worker (sekundy)
+JOBS_RETRY_BACKOFF = int(os.environ.get('JOBS_RETRY_BACKOFF', 10))
+JOBS_STALE_TIMEOUT = int(os.environ.get('JOBS_STALE_TIMEOUT', 600))
+
+# Pamięć rozwiązywania nazwy hosta na tenanta: liczba hostów i czas ważności (sekundy)
+TENANT_CACHE_SIZE = int(os.environ.get('TENANT_CACHE_SIZE', 256))
+TENANT_CACHE_TTL = int(os.environ.get('TENANT_CACHE_TTL', 60))
+
+# Katalog plików importu pacjentów przesłanych w adminie - musi być widoczny dla workera zadań
+# (brak = katalog tymczasowy systemu)
+PATIENT_IMPORT_DIR = os.environ.get('PATIENT_IMPORT_DIR')
+
+# Rozmiar procesowego LRU odszyfrowanych wartości (0 = tylko cache na czas żądania)
+DECRYPTION_CACHE_SIZE = int(os.environ.get('DECRYPTION_CACHE_SIZE', 0))
+
 CRYPTOGRAPHY_KEY = os.environ.get('FIELD_ENCRYPTION_KEY')
 
 CRYPTOGRAPHY_SALT = os.environ.get('PATIENT_SEARCH_SALT')
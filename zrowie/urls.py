@@ -12,5 +12,6 @@ urlpatterns = [
     path('', include('users.urls')),
     path("__reload__/", include("django_browser_reload.urls")),
     path('wizyty/', include('visits.urls')),
-    path('ewus/', include('ewus.urls'))
+    path('ewus/', include('ewus.urls')),
+    path('zadania/', include('jobs.urls')),
 ]
\ No newline at end of file